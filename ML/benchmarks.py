@@ -0,0 +1,262 @@
+# This file implements the microbenchmark suite for the pipeline hot paths
+"""
+Microbenchmarks for the EMG pipeline hot paths.
+
+Runs headless on CPU with synthetic data (or a replayed recording via --replay),
+stores results as JSON and compares them against a saved baseline:
+
+    listener_parse      - emg-to-pytorch.parse_sample on one JSON line from the sender
+    window_extract      - emg-to-pytorch.latest_window on a full emg_buffer
+    preprocess_window   - inference.preprocess_window on one (256, 8) window
+    run_inference       - inference.run_inference end to end
+    train_preprocess    - train_200.preprocess on one recording
+    train_epoch         - one train_200 training epoch (EMGDataset + DataLoader)
+
+Usage:
+    python benchmarks.py --out bench.json
+    python benchmarks.py --save-baseline bench_baseline.json
+    python benchmarks.py --baseline bench_baseline.json --threshold 0.15   # exit code 1 on regression
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import contextlib
+import importlib.util
+
+# Headless and CPU-only (set before torch/pyplot load)
+os.environ.setdefault("MPLBACKEND", "Agg")
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ===========================
+# Config
+# ===========================
+MIN_RUN_TIME = 0.2             # Seconds per repeat; iterations are scaled to reach it
+REPEATS = 5
+DEFAULT_THRESHOLD = 0.15       # Allowed slowdown vs. baseline (15%)
+SYNTHETIC_ROWS = 20000         # Rows in the synthetic recording (100 s at 200 Hz)
+EPOCH_WINDOWS = 2000           # Windows in the synthetic training epoch
+MODEL_FILE = os.path.join(ML_DIR, "train_single_subject_myo_model.pth")
+
+# ===========================
+# Synthetic Data
+# ===========================
+def synthetic_emg(n, seed=0):
+    """Rest-like noise with pinch-like bursts, int8 range like the Myo."""
+    rng = np.random.RandomState(seed)
+    data = rng.normal(0, 2, size=(n, 8))
+    for start in range(0, n, 400):
+        data[start:start + 150] += rng.normal(0, 25, size=(len(data[start:start + 150]), 8))
+    return np.clip(np.round(data), -128, 127).astype(np.int64)
+
+def write_synthetic_recording(path, n=SYNTHETIC_ROWS):
+    emg = synthetic_emg(n)
+    with open(path, "w") as f:
+        f.write("timestamp,sample_number," + ",".join(f"emg{i}" for i in range(1, 9)) + "\n")
+        for i, row in enumerate(emg):
+            f.write(f"{i / 200:.6f},{i}," + ",".join(str(v) for v in row) + "\n")
+
+def sender_line(sample, values):
+    """One line exactly as the C++ SocketSender formats it."""
+    return ('{"timestamp":%.6f,"sample":%d,"emg":[%s]}\n'
+            % (sample / 200, sample, ",".join(str(int(v)) for v in values)))
+
+def load_receiver():
+    """Imports ML/emg-to-pytorch.py (not importable by name because of the hyphens)."""
+    spec = importlib.util.spec_from_file_location("emg_to_pytorch", os.path.join(ML_DIR, "emg-to-pytorch.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# ===========================
+# Benchmarks
+# ===========================
+# Each setup returns (callable, items per call); the callable is what gets timed.
+
+def bench_listener_parse(ctx):
+    receiver = ctx["receiver"]
+    lines = [sender_line(i, v) for i, v in enumerate(synthetic_emg(1000))]
+    state = {"i": 0}
+    def run():
+        state["i"] = (state["i"] + 1) % len(lines)
+        receiver.parse_sample(lines[state["i"]])
+    return run, 1
+
+def bench_window_extract(ctx):
+    receiver = ctx["receiver"]
+    receiver.emg_buffer.clear()
+    for i, v in enumerate(synthetic_emg(receiver.BUFFER_SIZE)):
+        receiver.emg_buffer.append((i / 200, [int(x) for x in v]))
+    return receiver.latest_window, 1
+
+def bench_preprocess_window(ctx):
+    import inference
+    window = synthetic_emg(inference.WINDOW_SIZE).astype(np.float32)
+    return (lambda: inference.preprocess_window(window)), 1
+
+def bench_run_inference(ctx):
+    import inference
+    inference.reset_model()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        inference.load_model_and_params(MODEL_FILE)
+        window = synthetic_emg(inference.WINDOW_SIZE).astype(np.float32)
+        inference.run_inference(window)  # first call may print the normalization fallback warning
+    return (lambda: inference.run_inference(window)), 1
+
+def bench_train_preprocess(ctx):
+    import train_200 as tr
+    path = ctx["recording"]
+    return (lambda: tr.preprocess(path)), 1
+
+def bench_train_epoch(ctx):
+    import torch
+    import train_200 as tr
+    from torch.utils.data import DataLoader
+
+    rng = np.random.RandomState(0)
+    X = rng.rand(EPOCH_WINDOWS, 8, tr.NPERSEG // 2 + 1, 3).astype(np.float32)
+    y = rng.randint(0, len(tr.LABELS), EPOCH_WINDOWS)
+    loader = DataLoader(tr.EMGDataset(X, y), batch_size=tr.BATCH_SIZE, shuffle=True)
+    model = tr.CNNmodel().to(tr.DEVICE)
+    crit = torch.nn.CrossEntropyLoss()
+    opt = torch.optim.Adam(model.parameters(), lr=tr.LR)
+
+    def run():
+        model.train()
+        for xb, yb in loader:
+            opt.zero_grad()
+            loss = crit(model(xb), yb)
+            loss.backward()
+            opt.step()
+    return run, EPOCH_WINDOWS
+
+BENCHMARKS = {
+    "listener_parse": bench_listener_parse,
+    "window_extract": bench_window_extract,
+    "preprocess_window": bench_preprocess_window,
+    "run_inference": bench_run_inference,
+    "train_preprocess": bench_train_preprocess,
+    "train_epoch": bench_train_epoch,
+}
+
+# ===========================
+# Runner
+# ===========================
+def time_callable(fn, min_time=MIN_RUN_TIME, repeats=REPEATS):
+    """Returns per-call times (s) of `repeats` runs, each looping long enough to reach min_time."""
+    fn()  # warm-up
+    start = time.perf_counter()
+    fn()
+    once = max(time.perf_counter() - start, 1e-7)
+    loops = max(1, int(min_time / once))
+
+    per_call = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - start) / loops)
+    return per_call, loops
+
+def run_benchmarks(names, replay=None, threads=1, min_time=MIN_RUN_TIME, repeats=REPEATS):
+    import torch
+    torch.set_num_threads(threads)
+    np.random.seed(0)
+    torch.manual_seed(0)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = {"receiver": load_receiver(), "recording": replay}
+        if replay is None:
+            ctx["recording"] = os.path.join(tmp, "synthetic.csv")
+            write_synthetic_recording(ctx["recording"])
+
+        for name in names:
+            fn, items = BENCHMARKS[name](ctx)
+            times, loops = time_callable(fn, min_time, repeats)
+            median = float(np.median(times))
+            results[name] = {
+                "median_s": median,
+                "min_s": float(np.min(times)),
+                "loops": loops,
+                "items_per_s": items / median,
+            }
+            print(f"  {name:<20s} {median * 1e3:10.4f} ms  (min {np.min(times) * 1e3:.4f} ms, "
+                  f"{items / median:,.0f} items/s)")
+
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "torch": torch.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "threads": threads,
+            "replay": replay,
+        },
+        "results": results,
+    }
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Returns a list of (name, baseline_s, current_s, ratio) for benchmarks slower than allowed."""
+    regressions = []
+    print(f"\nComparison against baseline ({baseline['meta'].get('time', '?')}), threshold +{threshold:.0%}:")
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"  {name:<20s} (no baseline)")
+            continue
+        ratio = cur["median_s"] / base["median_s"]
+        flag = "REGRESSION" if ratio > 1 + threshold else ("faster" if ratio < 1 - threshold else "ok")
+        print(f"  {name:<20s} {base['median_s'] * 1e3:10.4f} -> {cur['median_s'] * 1e3:10.4f} ms  x{ratio:.2f}  {flag}")
+        if ratio > 1 + threshold:
+            regressions.append((name, base["median_s"], cur["median_s"], ratio))
+    return regressions
+
+# ===========================
+# Main
+# ===========================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the EMG pipeline hot paths")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--replay", default=None, help="Recording (CSV) for train_preprocess instead of synthetic data")
+    parser.add_argument("--threads", type=int, default=1, help="Torch threads")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--min-time", type=float, default=MIN_RUN_TIME, help="Seconds per repeat")
+    parser.add_argument("--out", default=None, help="Write results JSON here")
+    parser.add_argument("--save-baseline", default=None, help="Write results JSON as the new baseline")
+    parser.add_argument("--baseline", default=None, help="Compare against this baseline JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    print(f"Running {len(names)} benchmark(s)...")
+    current = run_benchmarks(names, args.replay, args.threads, args.min_time, args.repeats)
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(current, f, indent=2)
+            print(f"Results written to '{path}'")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond +{args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions")
@@ -0,0 +1,268 @@
+# This file implements leave-one-subject-out / leave-one-session-out evaluation
+"""
+Cross-subject and cross-session evaluation for the EMG gesture CNN.
+
+train_200.py's random 80/20 split draws train and test windows from the same
+recordings, and with STRIDE < WINDOW_SIZE neighbouring windows overlap, so test
+windows share samples with training windows. Here whole recordings are held out:
+
+    subject  - leave-one-subject-out: train on all other subjects, test on one.
+    session  - leave-one-session-out within a subject: train on that subject's
+               other sessions, test on one (subjects with one session are skipped).
+
+A session is the recording condition in the file name with the gesture words
+removed, e.g. raymond_arm_90_deg_pinch_200hz.csv -> (raymond, arm_90_deg).
+Model selection (best epoch / early stopping) uses a split of the training
+recordings only; the held-out fold is evaluated once at the end.
+
+Only recordings whose measured sample rate is train_200.FS are evaluated; the
+others (e.g. train_200.LOW_RATE_FILES) are listed as excluded in the summary.
+Folds whose training or held-out recordings produce no windows are reported as
+skipped.
+
+Usage:
+    python cross_subject_eval.py --mode both --workers 4 --out cross_subject_results
+"""
+
+import os
+import csv
+import json
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from sweep import worker_pool, limit_threads
+
+# ===========================
+# Config
+# ===========================
+RESULTS_FILE = "folds.csv"
+SUMMARY_FILE = "summary.json"
+GESTURE_WORDS = {"rest", "pinch", "hold", "200hz"}
+
+# ===========================
+# Fold Construction
+# ===========================
+def recording_subject(path):
+    return os.path.basename(path).split("_", 1)[0]
+
+def recording_session(path):
+    """Recording condition without subject and gesture words; 'default' if none is left."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    words = [w for w in name.split("_")[1:] if w not in GESTURE_WORDS]
+    return "_".join(words) or "default"
+
+def build_folds(files, mode="both"):
+    """
+    Returns a list of folds: {"name", "kind", "train": [(path, label)], "test": [(path, label)]}.
+    """
+    folds = []
+    subjects = sorted({recording_subject(p) for p, _ in files})
+
+    if mode in ("subject", "both"):
+        for subject in subjects:
+            test = [f for f in files if recording_subject(f[0]) == subject]
+            train = [f for f in files if recording_subject(f[0]) != subject]
+            if train and test:
+                folds.append({"name": f"subject={subject}", "kind": "subject", "train": train, "test": test})
+
+    if mode in ("session", "both"):
+        for subject in subjects:
+            own = [f for f in files if recording_subject(f[0]) == subject]
+            sessions = sorted({recording_session(p) for p, _ in own})
+            if len(sessions) < 2:
+                continue
+            for session in sessions:
+                test = [f for f in own if recording_session(f[0]) == session]
+                train = [f for f in own if recording_session(f[0]) != session]
+                folds.append({"name": f"subject={subject},session={session}", "kind": "session",
+                              "train": train, "test": test})
+    return folds
+
+def split_by_rate(files):
+    """
+    Separates recordings at train_200.FS from the rest.
+
+    Returns:
+        (files at FS, [{"path", "rate_hz"}] of the excluded ones)
+    """
+    import pandas as pd
+    import train_200 as tr
+
+    kept, excluded = [], []
+    for path, label in files:
+        rate = tr.rate_mismatch(pd.read_csv(path))
+        if rate is None:
+            kept.append((path, label))
+        else:
+            excluded.append({"path": path, "rate_hz": round(float(rate), 2)})
+    return kept, excluded
+
+# ===========================
+# Worker Side
+# ===========================
+def build_shard(path, label, cache_dir, config):
+    import train_200 as tr
+    tr.configure(**config)
+    return tr.build_feature_shards([(path, label)], cache_dir)
+
+def run_fold(fold_id, fold, cache_dir, out_dir, threads, patience, seed, config):
+    """Trains on the fold's training recordings and evaluates once on the held-out ones."""
+    import contextlib
+    import train_200 as tr
+    from sklearn.metrics import confusion_matrix
+    from torch.utils.data import DataLoader, BatchSampler, SequentialSampler
+
+    limit_threads(threads)
+    tr.configure(**config)
+    log_path = os.path.join(out_dir, f"fold_{fold_id:03d}.log")
+    with open(log_path, "w") as log, contextlib.redirect_stdout(log):
+        print(f"Fold {fold['name']}")
+        train_shards = tr.build_feature_shards(fold["train"], cache_dir)
+        test_shards = tr.build_feature_shards(fold["test"], cache_dir)
+        empty = [side for side, shards in (("training", train_shards), ("held-out", test_shards)) if not shards]
+        if empty:
+            reason = f"{' and '.join(empty)} recordings produce no windows"
+            print(f"Skipped: {reason}")
+            return {"fold": fold_id, "name": fold["name"], "kind": fold["kind"], "skipped": reason}
+
+        # Normalization from training recordings only
+        stats = tr.shard_normalization(train_shards)
+        mean, std = stats.normalization()
+
+        train_loader, val_loader = tr.sharded_loaders(train_shards, mean, std, seed)
+        test_set = tr.ShardedEMGDataset(test_shards, mean, std)
+        test_loader = DataLoader(test_set, batch_size=None,
+                                 sampler=BatchSampler(SequentialSampler(test_set), tr.BATCH_SIZE, drop_last=False))
+
+        start = time.perf_counter()
+        model, val_acc, _, _ = tr.train_model(train_loader, val_loader, patience=patience)
+        train_time = time.perf_counter() - start
+
+        test_acc, preds, labels = tr.evaluate(model, test_loader)
+        print(f"Held-out accuracy: {test_acc:.4f}")
+
+    cm = confusion_matrix(labels, preds, labels=list(tr.LABELS.values()))
+    support = cm.sum(axis=1)
+    # Mean recall over the classes present in the held-out recordings
+    balanced_acc = float(np.mean(np.diag(cm)[support > 0] / support[support > 0]))
+    return {"fold": fold_id, "name": fold["name"], "kind": fold["kind"],
+            "train_files": len(fold["train"]), "test_files": len(fold["test"]),
+            "test_windows": int(len(labels)),
+            "val_acc": round(val_acc, 4),
+            "test_acc": round(test_acc, 4),
+            "balanced_acc": round(balanced_acc, 4),
+            "correct": int((preds == labels).sum()),
+            "confusion": cm.tolist(),
+            "train_time_s": round(train_time, 2)}
+
+# ===========================
+# Driver
+# ===========================
+def summarize(rows):
+    """Mean/std of per-fold accuracy and pooled (window-weighted) accuracy per fold kind."""
+    summary = {}
+    for kind in sorted({r["kind"] for r in rows}):
+        kind_rows = [r for r in rows if r["kind"] == kind]
+        accs = np.array([r["test_acc"] for r in kind_rows])
+        bal = np.array([r["balanced_acc"] for r in kind_rows])
+        summary[kind] = {
+            "folds": len(kind_rows),
+            "mean_acc": round(float(accs.mean()), 4),
+            "std_acc": round(float(accs.std()), 4),
+            "mean_balanced_acc": round(float(bal.mean()), 4),
+            "pooled_acc": round(sum(r["correct"] for r in kind_rows) /
+                                max(sum(r["test_windows"] for r in kind_rows), 1), 4),
+            "worst_fold": min(kind_rows, key=lambda r: r["test_acc"])["name"],
+        }
+    return summary
+
+def run_evaluation(files, mode, out_dir, workers=None, threads=1, cache_dir=None, patience=None, seed=0,
+                   config=None):
+    """
+    Trains and evaluates all folds in parallel; writes folds.csv and summary.json to out_dir.
+
+    Args:
+        config: train_200 config overrides applied in every worker, e.g. {"EPOCHS": 10}.
+    """
+    import train_200 as tr
+
+    config = config or {}
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    cache_dir = cache_dir or tr.FEATURE_CACHE_DIR
+    os.makedirs(out_dir, exist_ok=True)
+
+    files, excluded = split_by_rate(files)
+    for entry in excluded:
+        print(f"⚠️ Excluded {entry['path']}: measured {entry['rate_hz']} Hz, features assume {tr.FS} Hz")
+    folds = build_folds(files, mode)
+    if mode in ("subject", "both") and not any(f["kind"] == "subject" for f in folds):
+        print(f"⚠️ No leave-one-subject-out folds: recordings at {tr.FS} Hz cover fewer than two subjects")
+
+    rows, skipped = [], []
+    with worker_pool(workers, threads) as pool:
+        print(f"Preprocessing {len(files)} recording(s)...")
+        for future in as_completed([pool.submit(build_shard, p, l, cache_dir, config) for p, l in files]):
+            future.result()
+
+        print(f"Training {len(folds)} fold(s) on {workers} worker(s)...")
+        futures = {pool.submit(run_fold, i, fold, cache_dir, out_dir, threads, patience, seed, config): i
+                   for i, fold in enumerate(folds)}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f"❌ Fold {folds[futures[future]]['name']} failed: {e}")
+                continue
+            if "skipped" in row:
+                print(f"⚠️ Fold {row['name']} skipped: {row['skipped']}")
+                skipped.append(row)
+                continue
+            rows.append(row)
+            print(f"{row['name']:<45s} | Acc: {row['test_acc']:.4f} | Balanced: {row['balanced_acc']:.4f} | "
+                  f"Windows: {row['test_windows']}")
+
+    rows.sort(key=lambda r: r["fold"])
+    skipped.sort(key=lambda r: r["fold"])
+    summary = summarize(rows)
+
+    if rows:
+        with open(os.path.join(out_dir, RESULTS_FILE), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[k for k in rows[0] if k != "confusion"], extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+    with open(os.path.join(out_dir, SUMMARY_FILE), "w") as f:
+        json.dump({"summary": summary, "folds": rows, "skipped_folds": skipped,
+                   "excluded_recordings": excluded}, f, indent=2)
+    return rows, summary
+
+# ===========================
+# Main
+# ===========================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Leave-one-subject-out / leave-one-session-out evaluation")
+    parser.add_argument("--mode", choices=["subject", "session", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=None, help="Folds trained concurrently (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="Torch/BLAS threads per fold")
+    parser.add_argument("--out", default="cross_subject_results", help="Output directory")
+    parser.add_argument("--cache-dir", default=None, help="Feature shard cache")
+    parser.add_argument("--patience", type=int, default=None, help="Early stopping patience (on the validation split)")
+    parser.add_argument("--seed", type=int, default=0, help="Train/validation split seed")
+    parser.add_argument("--epochs", type=int, default=None, help="Override train_200.EPOCHS")
+    args = parser.parse_args()
+
+    import train_200 as tr
+
+    config = {"EPOCHS": args.epochs} if args.epochs else {}
+    # Low-rate recordings are passed too, so the summary lists them as excluded
+    rows, summary = run_evaluation(tr.ALL_SUBJECT_FILES + tr.LOW_RATE_FILES, args.mode, args.out, args.workers,
+                                   args.threads, args.cache_dir, args.patience, args.seed, config)
+
+    print("\nSummary:")
+    for kind, s in summary.items():
+        print(f"  {kind:<8s} folds={s['folds']:2d} | acc {s['mean_acc']:.4f} ± {s['std_acc']:.4f} | "
+              f"balanced {s['mean_balanced_acc']:.4f} | pooled {s['pooled_acc']:.4f} | worst: {s['worst_fold']}")
+    print(f"Results written to '{args.out}'")
@@ -1,20 +1,31 @@
 # This file implements the EMG listener and realtime ML inference portions of the pipeline
-# TODO: send inferencing results to Unity via TCP
 import socket
+import signal
 import threading
 import json
 import time
 import collections
 import numpy as np
 
-# --- IMPORT THE DEDICATED INFERENCE FUNCTION ---
-from inference import run_inference 
+# --- IMPORT THE DEDICATED INFERENCE FUNCTIONS ---
+import inference
+from stage_queue import BoundedQueue, QueueClosed
 
 # --- Configuration ---
 HOST = '127.0.0.1'  # Must match the C++ sender's host
 PORT = 9002         # Must match the C++ sender's port
 BUFFER_SIZE = 1024  # Total number of samples to store
 INFERENCE_WINDOW = 256 # Number of latest samples for inference
+INFERENCE_HOP = 10     # New samples between two inferences (50 ms at 200 Hz)
+QUEUE_TIMEOUT = 0.1    # Seconds a stage waits on its queue before re-checking stop_event
+
+# Bounded queues between the pipeline stages: name -> (policy, maxsize); see stage_queue.py
+# ingest -> preprocess -> infer -> publish
+QUEUE_CONFIG = {
+    'ingest': ('drop_oldest', BUFFER_SIZE),   # Raw samples from the listener
+    'features': ('keep_latest', 1),           # Features of the newest window only
+    'results': ('drop_oldest', 64),           # Predictions waiting to be published
+}
 
 # The deque will hold tuples: (timestamp, [emg_channel_1, ..., emg_channel_8])
 emg_buffer = collections.deque(maxlen=BUFFER_SIZE)
@@ -25,64 +36,114 @@ buffer_lock = threading.Lock()
 # Flag to control the main loops
 stop_event = threading.Event()
 
+# Hot reloaders (hot_reload.ModelReloader); their swaps are applied by the inference worker
+model_reloaders = []
+
+# Stage queues, created by build_queues()
+queues = {}
+
+# UDP ingestion (--udp): reorder settings and, after shutdown, the udp_ingest.ReorderBuffer with its counters
+UDP_OPTIONS = {}
+udp_reorder = None
+
+# Broker subscription (--subscribe): (host, port) of stream_broker.py's publish port, or None to accept the sender directly
+SUBSCRIBE_ADDRESS = None
+
+# The listener's open TCP stream, shut down by main() on exit so a blocked readline returns
+listener_conn = None
+
+def build_queues(overrides=None):
+    """Creates the stage queues from QUEUE_CONFIG, with {name: (policy, maxsize or None)} overrides."""
+    queues.clear()
+    for name, (policy, maxsize) in QUEUE_CONFIG.items():
+        if overrides and name in overrides:
+            policy, maxsize = overrides[name][0], overrides[name][1] or maxsize
+        queues[name] = BoundedQueue(name, maxsize, policy)
+    return queues
+
+def put_until_stopped(queue, item):
+    """Puts an item, re-checking stop_event while a 'block' queue is full."""
+    while not queue.put(item, timeout=QUEUE_TIMEOUT):
+        if stop_event.is_set():
+            return False
+    return True
+
 # --------------------------------------------------------------------------
-# --- Actual ML Inference Function (Now calls run_inference) ---
+# --- Thread 1: Data Listener and Buffer Manager ---
 # --------------------------------------------------------------------------
 
-def actual_inference_caller(data_window: np.ndarray):
+def parse_sample(line):
     """
-    Calls the run_inference function from inference_function.py.
-    
-    The input `data_window` is a NumPy array of shape (INFERENCE_WINDOW, 8).
+    Parses one JSON line from the sender into (timestamp, [emg_1, ..., emg_8]).
+
+    Returns None if a field is missing; raises json.JSONDecodeError on malformed lines.
     """
+    data = json.loads(line)
+    timestamp = data.get('timestamp')
+    emg_data = data.get('emg')
     
-    # 1. Call the dedicated inference function
-    prediction = run_inference(data_window)
-    
-    # 2. Calculate details (e.g., mean absolute value for logging/debugging)
-    mean_abs_emg = np.mean(np.abs(data_window), axis=0)
-    
-    return prediction, mean_abs_emg
+    if timestamp is not None and emg_data is not None:
+        return (timestamp, emg_data)
+    return None
 
-# --------------------------------------------------------------------------
-# --- Thread 1: Data Listener and Buffer Manager ---
-# --------------------------------------------------------------------------
+def accept_sender(s):
+    """Waits for the C++ sender on HOST:PORT; returns the connection."""
+    print(f"📡 Listener: Starting TCP server on {HOST}:{PORT}")
+    s.bind((HOST, PORT))
+    s.listen(1)
+    print("📡 Listener: Waiting for Myo sender (C++ program) to connect...")
+    conn, addr = s.accept()
+    print(f"✅ Listener: Connection established from {addr}")
+    return conn
+
+def connect_broker(s):
+    """Subscribes to the stream republished by stream_broker.py; returns the connection."""
+    print(f"📡 Listener: Subscribing to broker at {SUBSCRIBE_ADDRESS[0]}:{SUBSCRIBE_ADDRESS[1]}")
+    s.connect(SUBSCRIBE_ADDRESS)
+    print("✅ Listener: Subscribed.")
+    return s
+
+def shutdown_listener():
+    """Unblocks the listener's readline (the broker, unlike the sender, never disconnects)."""
+    conn = listener_conn
+    if conn is None:
+        return
+    try:
+        conn.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # Already closed
 
 def data_listener_thread():
-    """Listens for TCP connection and receives streaming EMG data."""
-    print(f"📡 Listener: Starting TCP server on {HOST}:{PORT}")
-    
+    """Receives the TCP stream (from the sender, or the broker with --subscribe) and feeds samples into the ingest queue."""
+    global listener_conn
     try:
         # Create a socket (AF_INET for IPv4, SOCK_STREAM for TCP)
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind((HOST, PORT))
-            s.listen(1)
-            print("📡 Listener: Waiting for Myo sender (C++ program) to connect...")
-            
-            # Accept a connection
-            conn, addr = s.accept()
-            print(f"✅ Listener: Connection established from {addr}")
+            # Either accept the sender or subscribe to the broker
+            conn = connect_broker(s) if SUBSCRIBE_ADDRESS else accept_sender(s)
+            listener_conn = conn
+            if stop_event.is_set():
+                shutdown_listener()  # main() shut down before the connection existed
 
-            with conn.makefile('r') as client_socket_file:
+            with conn, conn.makefile('r') as client_socket_file:
                 while not stop_event.is_set():
                     try:
                         line = client_socket_file.readline()
                         if not line:
-                            print("⚠️ Listener: Sender disconnected.")
+                            if not stop_event.is_set():
+                                print("⚠️ Listener: Sender disconnected.")
                             break
                         
-                        data = json.loads(line)
-                        timestamp = data.get('timestamp')
-                        emg_data = data.get('emg')
+                        sample = parse_sample(line)
                         
-                        if timestamp is not None and emg_data is not None:
-                            sample = (timestamp, emg_data)
-                            
-                            with buffer_lock:
-                                emg_buffer.append(sample)
+                        if sample is not None:
+                            if not put_until_stopped(queues['ingest'], sample):
+                                break
                         
                     except json.JSONDecodeError:
                         print(f"❌ Listener: Failed to decode JSON: {line.strip()}")
+                    except QueueClosed:
+                        break
                     except ConnectionResetError:
                         print("⚠️ Listener: Connection forcibly closed by the remote host.")
                         break
@@ -97,64 +158,243 @@ def data_listener_thread():
         print("📡 Listener: Thread stopped.")
 
 
+def udp_listener_thread():
+    """Receives EMG samples as UDP datagrams (see udp_ingest.py) and feeds them, in order, into the ingest queue."""
+    from udp_ingest import udp_listener
+    global udp_reorder
+    
+    def deliver(sample):
+        try:
+            return put_until_stopped(queues['ingest'], sample)
+        except QueueClosed:
+            return False
+    
+    try:
+        udp_reorder = udp_listener(deliver, stop_event, HOST, PORT, **UDP_OPTIONS)
+    except socket.error as e:
+        print(f"❌ Listener: Socket error: {e}")
+    finally:
+        stop_event.set()
+        print("📡 Listener: Thread stopped.")
+
+
 # --------------------------------------------------------------------------
-# --- Thread 2: ML Inference Worker ---
+# --- Thread 2: Windowing and Preprocessing ---
 # --------------------------------------------------------------------------
 
-def inference_worker_thread():
-    """Continuously checks the buffer and performs ML inference."""
-    print(f"🧠 Worker: Starting inference thread. Window size: {INFERENCE_WINDOW} samples.")
+def latest_window(n=INFERENCE_WINDOW):
+    """
+    Copies the latest `n` samples out of emg_buffer.
+
+    Returns:
+        (latest_timestamp, NumPy array of shape (n, 8)), or None if fewer than n samples are buffered.
+    """
+    with buffer_lock:
+        if len(emg_buffer) < n:
+            return None
+        # Copy the latest n samples
+        window_data = list(emg_buffer)[-n:]
+    
+    # Extract only the EMG values and convert to a NumPy array (256, 8)
+    emg_values = [sample[1] for sample in window_data]
+    return window_data[-1][0], np.array(emg_values, dtype=np.float32)
+
+def serving_window_size():
+    """Samples needed by the model(s) currently being served."""
+    return max(m.config['window_size'] for m in inference.serving_models())
+
+def preprocess_thread():
+    """Buffers ingested samples and computes the features of a new window every INFERENCE_HOP samples."""
+    window_size = serving_window_size()
+    print(f"🧮 Preprocess: Starting thread. Window size: {window_size} samples, hop: {INFERENCE_HOP} samples.")
+    new_samples = 0
     
     while not stop_event.is_set():
+        try:
+            sample = queues['ingest'].get(timeout=QUEUE_TIMEOUT)
+        except QueueClosed:
+            break
+        if sample is None:
+            continue
         
-        current_buffer_size = 0
         with buffer_lock:
-            current_buffer_size = len(emg_buffer)
+            emg_buffer.append(sample)
+        new_samples += 1
+        if new_samples < INFERENCE_HOP:
+            continue
         
-        if current_buffer_size >= INFERENCE_WINDOW:
+        # Models may have been swapped by a hot reload
+        models = inference.serving_models()
+        window_size = max(m.config['window_size'] for m in models)
+        window = latest_window(window_size)
+        if window is None:
+            continue
+        new_samples = 0
+        
+        latest_timestamp, data_array = window
+        start_time = time.time()
+        try:
+            features = inference.compute_features(data_array, models)
+        except Exception as e:
+            print(f"❌ Preprocess: Error computing features: {e}")
+            continue
+        
+        item = {'timestamp': latest_timestamp, 'window': data_array, 'features': features,
+                'preprocess_ms': (time.time() - start_time) * 1000}
+        if not put_until_stopped(queues['features'], item):
+            break
+    
+    print("🧮 Preprocess: Thread stopped.")
+
+# --------------------------------------------------------------------------
+# --- Thread 3: ML Inference Worker ---
+# --------------------------------------------------------------------------
+
+def inference_worker_thread():
+    """Runs the served model(s) on the features of each new window."""
+    print("🧠 Worker: Starting inference thread.")
+    
+    while not stop_event.is_set():
+        
+        # Swap in reloaded models between two inferences
+        for reloader in model_reloaders:
+            reloader.apply_pending()
+        
+        try:
+            item = queues['features'].get(timeout=QUEUE_TIMEOUT)
+        except QueueClosed:
+            break
+        if item is None:
+            continue
+
+        # Perform the actual inference
+        start_time = time.time()
+        try:
+            models = inference.serving_models()
+            features = item['features']
+            missing = [m for m in models if m.feature_key not in features]
+            if missing:
+                # A model swapped in after preprocessing needs another feature config
+                features = {**features, **inference.compute_features(item['window'], missing)}
+            predictions = inference.predict_features(features, models)
+            inference_time = (time.time() - start_time) * 1000 # in ms
+            for reloader in model_reloaders:
+                reloader.on_inference_done()
+            
+            # Calculate details (e.g., mean absolute value for logging/debugging)
+            mean_abs_emg = np.mean(np.abs(item['window']), axis=0)
             
-            with buffer_lock:
-                # Copy the latest INFERENCE_WINDOW samples
-                window_data = list(emg_buffer)[-INFERENCE_WINDOW:]
+            result = {'timestamp': item['timestamp'], 'predictions': predictions, 'details': mean_abs_emg,
+                      'inference_ms': item['preprocess_ms'] + inference_time}
+            if not put_until_stopped(queues['results'], result):
+                break
             
-            # Extract only the EMG values and convert to a NumPy array (256, 8)
-            emg_values = [sample[1] for sample in window_data]
-            data_array = np.array(emg_values, dtype=np.float32)
-
-            # Perform the actual inference
-            start_time = time.time()
-            try:
-                prediction, details = actual_inference_caller(data_array)
-                inference_time = (time.time() - start_time) * 1000 # in ms
-
-                # Print the results on the same line (overwrites previous output)
-                latest_timestamp = window_data[-1][0]
-                print(f"\rTime: {inference_time:.2f}ms | "
-                      f"Timestamp: {latest_timestamp:.3f}s | "
-                      f"Prediction: **{prediction}** | "
-                      f"Mean Abs: {np.round(details, 2)}", end='', flush=True)
-                
-            except Exception as e:
-                print(f"❌ Worker: Error during inference: {e}")
-                
-        else:
-            time.sleep(0.01) # 10 ms sleep
+        except QueueClosed:
+            break
+        except Exception as e:
+            print(f"❌ Worker: Error during inference: {e}")
+            for reloader in model_reloaders:
+                reloader.on_inference_error()
             
     print("🧠 Worker: Thread stopped.")
 
+# --------------------------------------------------------------------------
+# --- Thread 4: Result Publisher ---
+# --------------------------------------------------------------------------
+
+def format_predictions(predictions):
+    if list(predictions) == ['default']:
+        return predictions['default']
+    return " | ".join(f"{name}: {pred}" for name, pred in predictions.items())
+
+def publisher_thread():
+    """Publishes predictions (currently: a status line on the console)."""
+    # TODO: send inferencing results to Unity via TCP
+    while not stop_event.is_set():
+        try:
+            result = queues['results'].get(timeout=QUEUE_TIMEOUT)
+        except QueueClosed:
+            break
+        if result is None:
+            continue
+        
+        drops = sum(q.dropped for q in queues.values())
+        # Print the results on the same line (overwrites previous output)
+        print(f"\rTime: {result['inference_ms']:.2f}ms | "
+              f"Timestamp: {result['timestamp']:.3f}s | "
+              f"Prediction: **{format_predictions(result['predictions'])}** | "
+              f"Mean Abs: {np.round(result['details'], 2)} | "
+              f"Dropped: {drops}", end='', flush=True)
+    
+    print("📣 Publisher: Thread stopped.")
+
+def print_queue_stats():
+    print("📊 Queues:")
+    for name, q in queues.items():
+        st = q.stats()
+        print(f"   {name:<9s} {st['policy']:<12s} max {st['maxsize']:5d} | put {st['put']:7d} | "
+              f"dropped {st['dropped']:6d} | blocked {st['blocked_s']:.3f}s | "
+              f"wait mean {st['mean_wait_ms']:.2f}ms max {st['max_wait_ms']:.2f}ms | high {st['high_watermark']}")
+
 # --------------------------------------------------------------------------
 # --- Main Execution ---
 # --------------------------------------------------------------------------
 
-def main():
-    """Starts the two threads and handles graceful shutdown."""
+def start_model_reloaders(model_paths, min_agreement=None):
+    """
+    Watches the served model file(s) for hot reload; SIGHUP forces a reload.
+
+    Args:
+        model_paths: {registry name: path} of the --model entries, or empty to
+            watch the default model of inference.run_inference.
+    """
+    from hot_reload import ModelReloader
+
+    if model_paths:
+        for name, path in model_paths.items():
+            model_reloaders.append(ModelReloader(path, name=name, min_agreement=min_agreement))
+    else:
+        inference.load_model_and_params(inference.DEFAULT_MODEL_FILE, inference.DEFAULT_NORM_FILE)
+        model_reloaders.append(ModelReloader(inference.DEFAULT_MODEL_FILE, min_agreement=min_agreement,
+                                             normalization_path=inference.DEFAULT_NORM_FILE))
+
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: [r.request_reload() for r in model_reloaders])
+    for reloader in model_reloaders:
+        reloader.start()
+        print(f"🔄 Reload: Watching '{reloader.model_path}'")
+
+def main(profile_mode=None, profile_dir=None, queue_overrides=None, udp=False):
+    """
+    Starts the pipeline threads and handles graceful shutdown.
+
+    Args:
+        profile_mode: None, "sampling" or "deterministic"; profiles the pipeline
+            threads plus inference stages and dumps the results on shutdown.
+        profile_dir: Output directory for the profile (default: profiling.DEFAULT_PROFILE_DIR).
+        queue_overrides: {queue name: (policy, maxsize or None)} replacing QUEUE_CONFIG entries.
+        udp: Receive UDP datagrams (udp_ingest.py) instead of the TCP stream.
+    """
     
-    # 1. Initialize and start the threads
-    listener_thread = threading.Thread(target=data_listener_thread)
-    worker_thread = threading.Thread(target=inference_worker_thread)
+    build_queues(queue_overrides)
+    stages = {
+        'listener': udp_listener_thread if udp else data_listener_thread,
+        'preprocess': preprocess_thread,
+        'worker': inference_worker_thread,
+        'publisher': publisher_thread,
+    }
     
-    listener_thread.start()
-    worker_thread.start()
+    session = None
+    if profile_mode:
+        from profiling import ProfilingSession
+        session = ProfilingSession(profile_mode, profile_dir)
+        stages = {name: session.wrap(target, name) for name, target in stages.items()}
+        session.start()
+    
+    # 1. Initialize and start the threads
+    threads = [threading.Thread(target=target, name=name) for name, target in stages.items()]
+    for thread in threads:
+        thread.start()
     
     try:
         # 2. Keep the main thread alive and responsive to Ctrl+C
@@ -169,10 +409,86 @@ def main():
         stop_event.set()
         print("🛑 Main: Waiting for threads to terminate...")
         
-        listener_thread.join()
-        worker_thread.join()
+        shutdown_listener()
+        for q in queues.values():
+            q.close()
+        for thread in threads:
+            thread.join()
+        for reloader in model_reloaders:
+            reloader.stop()
+        
+        print()
+        print_queue_stats()
+        if udp_reorder is not None:
+            print(f"📊 UDP: {udp_reorder.stats()}")
+        if session is not None:
+            session.dump()
         
         print("🎉 Main: All threads terminated. Program finished.")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    import argparse
+    from profiling import profile_mode_from_env
+
+    parser = argparse.ArgumentParser(description="Realtime EMG listener and inference")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile the pipeline threads and inference stages (or set EMG_PROFILE=1)")
+    parser.add_argument('--profile-mode', choices=['sampling', 'deterministic'], default=None,
+                        help="Sampling (folded stacks, low overhead) or cProfile per thread")
+    parser.add_argument('--profile-out', default=None, help="Profile output directory (or EMG_PROFILE_DIR)")
+    parser.add_argument('--model', action='append', default=[], metavar='NAME=PATH',
+                        help="Serve this model (repeatable); all models share one preprocessing pass per window")
+    parser.add_argument('--watch-model', action='store_true',
+                        help="Hot-reload the served model file(s) when they change (or on SIGHUP)")
+    parser.add_argument('--min-agreement', type=float, default=None,
+                        help="Reject reloaded models agreeing with the serving one on fewer probe windows")
+    parser.add_argument('--queue', action='append', default=[], metavar='NAME=POLICY[:SIZE]',
+                        help=f"Queue policy override (queues: {', '.join(QUEUE_CONFIG)}; "
+                             f"policies: block, drop_oldest, keep_latest)")
+    parser.add_argument('--hop', type=int, default=INFERENCE_HOP, help="New samples between two inferences")
+    parser.add_argument('--udp', action='store_true',
+                        help="Receive UDP datagrams on HOST:PORT instead of the TCP stream (see udp_test_sender.py)")
+    parser.add_argument('--subscribe', nargs='?', const=f'{HOST}:9003', default=None, metavar='HOST:PORT',
+                        help="Read the stream from stream_broker.py (default 127.0.0.1:9003) instead of accepting the sender")
+    parser.add_argument('--reorder-window', type=int, default=None,
+                        help="UDP: samples a sequence gap may span before it is declared lost")
+    parser.add_argument('--max-reorder-delay', type=float, default=None,
+                        help="UDP: seconds a sequence gap may hold back later samples")
+    args = parser.parse_args()
+
+    from stage_queue import parse_queue_spec
+    queue_overrides = {}
+    for spec in args.queue:
+        try:
+            name, policy, maxsize = parse_queue_spec(spec)
+        except ValueError as e:
+            parser.error(str(e))
+        if name not in QUEUE_CONFIG:
+            parser.error(f"Unknown queue '{name}' (choose from {', '.join(QUEUE_CONFIG)})")
+        queue_overrides[name] = (policy, maxsize)
+    INFERENCE_HOP = max(1, args.hop)
+    if args.subscribe:
+        if args.udp:
+            parser.error("--subscribe and --udp are mutually exclusive")
+        host, _, port = args.subscribe.rpartition(':')
+        SUBSCRIBE_ADDRESS = (host or HOST, int(port))
+    if args.reorder_window is not None:
+        UDP_OPTIONS['window'] = args.reorder_window
+    if args.max_reorder_delay is not None:
+        UDP_OPTIONS['max_delay'] = args.max_reorder_delay
+
+    model_paths = {}
+    for spec in args.model:
+        name, _, path = spec.partition('=')
+        if not path:
+            parser.error(f"--model expects NAME=PATH, got '{spec}'")
+        inference.register_model(name, path)
+        model_paths[name] = path
+
+    if args.watch_model:
+        start_model_reloaders(model_paths, args.min_agreement)
+
+    profile_mode = profile_mode_from_env()
+    if args.profile or args.profile_mode:
+        profile_mode = args.profile_mode or profile_mode or 'sampling'
+    main(profile_mode, args.profile_out, queue_overrides, args.udp)
\ No newline at end of file
@@ -0,0 +1,239 @@
+# This file implements hot model reload for the realtime receiver
+"""
+Hot model reload for the realtime EMG receiver (emg-to-pytorch.py).
+
+A ModelReloader watches one model file (and/or takes reload requests, e.g. from
+SIGHUP). When the file changes it loads the new bundle on a background thread,
+warms it up and runs a parity check; only a candidate that passes is handed to
+the inference worker, which swaps it in between two inferences with
+apply_pending(). The sensor connection is never touched.
+
+Rollback:
+    - load or parity check fails     -> candidate discarded, current model keeps serving
+    - inference raises shortly after -> on_inference_error() restores the previous model
+      ("shortly": within PROBATION completed inferences, counted by on_inference_done())
+
+Parity check on a fixed set of probe windows:
+    - logits are finite and have one entry per class name
+    - the candidate is deterministic (eval mode: two passes give identical logits)
+    - the live path (preprocess_window) and batch path (preprocess_windows) agree
+    - optionally, predictions agree with the serving model on >= min_agreement of the probes
+
+Usage (from emg-to-pytorch.py):
+    python emg-to-pytorch.py --watch-model            # reload the default model file on change
+    kill -HUP <pid>                                   # force a reload
+"""
+
+import os
+import time
+import threading
+
+import numpy as np
+
+import inference
+
+# ===========================
+# Config
+# ===========================
+POLL_INTERVAL = 1.0            # Seconds between file checks
+PROBE_WINDOWS = 16             # Windows used for warm-up and the parity check
+PROBATION = 50                 # Inferences after a swap during which an error triggers rollback
+PARITY_ATOL = 1e-4             # Live vs. batch path logits tolerance
+
+# ===========================
+# Parity Check
+# ===========================
+def probe_windows(window_size, n=PROBE_WINDOWS, seed=0):
+    """Rest-like and burst-like windows for warm-up and parity checks."""
+    rng = np.random.RandomState(seed)
+    windows = rng.normal(0, 3, size=(n, window_size, 8))
+    windows[n // 2:] += rng.normal(0, 30, size=(n - n // 2, window_size, 8))
+    return np.clip(np.round(windows), -128, 127).astype(np.float32)
+
+def _logits(model, mean, std, config, windows, batched):
+    cfg = inference.feature_settings(config)
+    mean = mean if mean is not None else np.float32(0.0)
+    std = std if std is not None else np.float32(1.0)
+    if batched:
+        X = inference.preprocess_windows(windows, cfg["fs"], cfg["nperseg"], cfg["noverlap"])
+    else:
+        X = np.stack([inference.preprocess_window(w, cfg["fs"], cfg["nperseg"], cfg["noverlap"])
+                      for w in windows])
+    X = ((np.log1p(X) - mean) / std).astype(np.float32)
+    return inference.forward_logits(model, X)
+
+def parity_check(candidate, current=None, min_agreement=None):
+    """
+    Raises ValueError if the candidate (model, mean, std, config) is not fit to serve.
+
+    `current` is the serving (model, mean, std, config); it is only needed for min_agreement.
+    """
+    model, mean, std, config = candidate
+    cfg = inference.feature_settings(config)
+    windows = probe_windows(cfg["window_size"])
+
+    live = _logits(model, mean, std, config, windows, batched=False)
+    if not np.all(np.isfinite(live)):
+        raise ValueError("non-finite logits on probe windows")
+    if live.shape[1] != len(cfg["class_names"]):
+        raise ValueError(f"model has {live.shape[1]} outputs for {len(cfg['class_names'])} class names")
+    if not np.array_equal(live, _logits(model, mean, std, config, windows, batched=False)):
+        raise ValueError("non-deterministic outputs (model not in eval mode?)")
+    batch = _logits(model, mean, std, config, windows, batched=True)
+    if not np.allclose(live, batch, atol=PARITY_ATOL):
+        raise ValueError(f"live and batch paths disagree (max diff {np.abs(live - batch).max():.2e})")
+
+    if min_agreement is not None and current is not None and current[0] is not None:
+        reference = _logits(*current, probe_windows(inference.feature_settings(current[3])["window_size"]),
+                            batched=True)
+        agreement = float((reference.argmax(1) == live.argmax(1)).mean())
+        if agreement < min_agreement:
+            raise ValueError(f"agrees with the serving model on {agreement:.0%} of probes "
+                             f"(< {min_agreement:.0%})")
+
+# ===========================
+# Reloader
+# ===========================
+class ModelReloader:
+    """
+    Watches a model file and prepares verified replacements for the inference worker.
+
+    Args:
+        model_path: File to watch and load.
+        name: Registry entry to replace (inference.register_model name), or None for
+            the default model served by inference.run_inference.
+        min_agreement: Optional minimum prediction agreement with the serving model.
+    """
+
+    def __init__(self, model_path, name=None, normalization_path=None, poll_interval=POLL_INTERVAL,
+                 min_agreement=None):
+        self.model_path = model_path
+        self.name = name
+        self.normalization_path = normalization_path
+        self.poll_interval = poll_interval
+        self.min_agreement = min_agreement
+
+        self.reloads = 0
+        self.failures = 0
+        self.rollbacks = 0
+        self._pending = None           # Verified candidate waiting for apply_pending()
+        self._previous = None          # What was serving before the last swap
+        self._since_swap = None        # Inferences since the last swap (None: not on probation)
+        self._lock = threading.Lock()
+        self._requested = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_stat = self._stat()
+
+    @property
+    def label(self):
+        return self.name or os.path.basename(self.model_path)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.model_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    # --- Background side ---
+
+    def start(self):
+        self._thread = threading.Thread(target=self._watch_loop, name=f"reload[{self.label}]", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._requested.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def request_reload(self):
+        """Forces a reload on the next poll (safe to call from a signal handler)."""
+        self._requested.set()
+
+    def _watch_loop(self):
+        while not self._stop.is_set():
+            requested = self._requested.wait(self.poll_interval)
+            if self._stop.is_set():
+                break
+            self._requested.clear()
+
+            stat = self._stat()
+            if not requested and (stat is None or stat == self._last_stat):
+                continue
+            if not requested:
+                # Wait until the writer is done (size and mtime stable for one interval)
+                time.sleep(self.poll_interval)
+                if self._stat() != stat:
+                    continue
+            self._last_stat = stat
+            self.reload_now()
+
+    def _serving(self):
+        if self.name is None:
+            return (inference._MODEL, inference._MEAN, inference._STD, inference._CONFIG)
+        entry = next((m for m in inference.registered_models() if m.name == self.name), None)
+        return (entry.model, entry.mean, entry.std, entry.config) if entry else None
+
+    def reload_now(self):
+        """Loads, warms and checks the model file; queues it for the worker on success."""
+        print(f"\n🔄 Reload[{self.label}]: Loading '{self.model_path}'...")
+        try:
+            candidate = inference.load_bundle(self.model_path, self.normalization_path)
+            serving = self._serving()
+            if candidate[3] is None and serving is not None and serving[3] is not None:
+                # Weights-only checkpoint: keep the feature config the model is served with
+                candidate = candidate[:3] + (serving[3],)
+            # Checking also warms up the new weights (first forward passes, allocator)
+            parity_check(candidate, serving, self.min_agreement)
+        except Exception as e:
+            self.failures += 1
+            print(f"\n❌ Reload[{self.label}]: Rejected, keeping the current model. Error: {e}")
+            return False
+
+        with self._lock:
+            self._pending = candidate
+        print(f"\n✅ Reload[{self.label}]: New model verified; swapping in before the next inference.")
+        return True
+
+    # --- Inference worker side ---
+
+    def apply_pending(self):
+        """Swaps in a verified candidate. Call from the inference thread, between inferences."""
+        with self._lock:
+            candidate, self._pending = self._pending, None
+        if candidate is None:
+            return False
+
+        self._previous = self._install(candidate)
+        self._since_swap = 0
+        self.reloads += 1
+        return True
+
+    def on_inference_done(self):
+        """Counts a completed inference towards the probation of the last swap."""
+        if self._since_swap is None:
+            return
+        self._since_swap += 1
+        if self._since_swap >= PROBATION:
+            self._since_swap = None
+            self._previous = None
+
+    def on_inference_error(self):
+        """Restores the previous model if an inference failed shortly after a swap."""
+        if self._since_swap is None or self._previous is None:
+            return False
+        self._install(self._previous)
+        self._previous = None
+        self._since_swap = None
+        self.rollbacks += 1
+        print(f"\n↩️ Reload[{self.label}]: Inference failed after the swap; rolled back to the previous model.")
+        return True
+
+    def _install(self, bundle):
+        model, mean, std, config = bundle
+        if self.name is None:
+            return inference.install_model(model, mean, std, config)
+        previous = inference.replace_registered(inference.RegisteredModel(self.name, model, mean, std, config))
+        return (previous.model, previous.mean, previous.std, previous.config) if previous else None
@@ -1,8 +1,22 @@
+import os
+import time
+import threading
+import collections
+from functools import lru_cache
+
 import numpy as np
-import torch
-import torch.nn as nn
 from scipy.signal import butter, filtfilt, iirnotch, stft, detrend
 
+# Inference backend: "torch", or "numpy" to serve weights exported by numpy_inference.py
+# without importing torch at all. Read once, at import.
+BACKEND_ENV = "EMG_INFERENCE_BACKEND"
+BACKEND = os.environ.get(BACKEND_ENV, "torch").strip().lower()
+if BACKEND == "numpy":
+    torch = nn = None
+else:
+    import torch
+    import torch.nn as nn
+
 # ===========================
 # 1. Config (Must match train_200.py)
 # ===========================
@@ -10,18 +24,78 @@ FS = 200                      # Sampling rate
 WINDOW_SIZE = 256             # Window size for the live buffer
 NPERSEG = 128                 # STFT NPERSEG
 NOVERLAP = 64                 # STFT NOVERLAP
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu") if torch is not None else "cpu"
 CLASS_NAMES = ["rest", "pinch"] # Class names for output
 
 # Global variable to hold the loaded model and normalization parameters
 _MODEL = None
 _MEAN = None
 _STD = None
+_CONFIG = None   # Feature config saved with the model (fs, window_size, nperseg, noverlap, class_names)
+
+# ===========================
+# Stage Timing (profiling mode)
+# ===========================
+class StageTimer:
+    """
+    Per-stage wall time of the inference pipeline; disabled by default.
+
+    Usage inside the pipeline:
+        tick = STAGE_TIMER.start()
+        ...stage...
+        tick = STAGE_TIMER.lap("detrend", tick)
+    When disabled, start() returns None and lap() does nothing.
+    """
+
+    def __init__(self, history=2048):
+        self.enabled = False
+        self.history = history
+        self._times = collections.defaultdict(lambda: collections.deque(maxlen=self.history))
+        self._totals = collections.defaultdict(float)
+        self._counts = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self._times.clear()
+            self._totals.clear()
+            self._counts.clear()
+
+    def start(self):
+        return time.perf_counter() if self.enabled else None
+
+    def lap(self, name, start):
+        if start is None:
+            return None
+        now = time.perf_counter()
+        with self._lock:
+            self._times[name].append(now - start)
+            self._totals[name] += now - start
+            self._counts[name] += 1
+        return now
+
+    def summary(self):
+        """{stage: {count, total_s, mean_ms, p50_ms, p95_ms}}; percentiles over the recent history."""
+        with self._lock:
+            out = {}
+            for name, times in self._times.items():
+                recent = np.asarray(times) * 1000
+                out[name] = {"count": self._counts[name],
+                             "total_s": round(self._totals[name], 4),
+                             "mean_ms": round(self._totals[name] * 1000 / self._counts[name], 4),
+                             "p50_ms": round(float(np.percentile(recent, 50)), 4),
+                             "p95_ms": round(float(np.percentile(recent, 95)), 4)}
+            return out
+
+STAGE_TIMER = StageTimer()
 
 # ===========================
 # 2. CNN Model Architecture (Copied from train_200.py)
 # ===========================
-class CNNmodel(nn.Module):
+class CNNmodel(nn.Module if nn is not None else object):   # Torch backend only
     def __init__(self, in_channels=8, num_classes=2):
         super().__init__()
 
@@ -61,109 +135,220 @@ B_NOTCH, A_NOTCH = iirnotch(60.0 / (FS / 2), 30)
 # Bandpass 20–90 Hz
 B_BAND, A_BAND = butter(4, [20/(FS/2), 90/(FS/2)], btype='band')
 
-def preprocess_window(window: np.ndarray) -> np.ndarray:
+@lru_cache(maxsize=None)
+def filter_coefficients(fs: int) -> tuple:
+    """(b_notch, a_notch, b_band, a_band) for a sampling rate; the FS pair is precomputed above."""
+    if fs == FS:
+        return B_NOTCH, A_NOTCH, B_BAND, A_BAND
+    b_notch, a_notch = iirnotch(60.0 / (fs / 2), 30)
+    b_band, a_band = butter(4, [20/(fs/2), 90/(fs/2)], btype='band')
+    return b_notch, a_notch, b_band, a_band
+
+def preprocess_window(window: np.ndarray, fs: int = FS, nperseg: int = NPERSEG,
+                      noverlap: int = NOVERLAP) -> np.ndarray:
     """
     Applies the full preprocessing pipeline to a single (WINDOW_SIZE, 8) EMG window.
     
     Args:
         window: A NumPy array of shape (256, 8) containing the raw EMG samples.
+        fs, nperseg, noverlap: Feature settings; the defaults match train_200.py.
         
     Returns:
         A NumPy array of shape (8, num_freq_bins, num_time_steps) representing 
         the STFT features, ready for normalization and model input.
     """
     
+    return preprocess_windows(window[np.newaxis, ...], fs, nperseg, noverlap)[0]
+
+
+def preprocess_windows(windows: np.ndarray, fs: int = FS, nperseg: int = NPERSEG,
+                       noverlap: int = NOVERLAP) -> np.ndarray:
+    """
+    Vectorized preprocess_window for a batch of windows; each window is filtered
+    independently, exactly as in the live path.
+
+    Args:
+        windows: A NumPy array of shape (N, WINDOW_SIZE, 8).
+
+    Returns:
+        A NumPy array of shape (N, 8, num_freq_bins, num_time_steps).
+    """
+    
+    tick = STAGE_TIMER.start()
+
     # 1. Detrend + DC removal
-    data = detrend(window, axis=0, type='constant')
-    data = data - np.mean(data, axis=0, keepdims=True)
+    data = detrend(windows, axis=1, type='constant')
+    data = data - np.mean(data, axis=1, keepdims=True)
+    tick = STAGE_TIMER.lap("detrend", tick)
+
+    b_notch, a_notch, b_band, a_band = filter_coefficients(fs)
 
     # 2. Notch 60 Hz
-    data = filtfilt(B_NOTCH, A_NOTCH, data, axis=0)
+    data = filtfilt(b_notch, a_notch, data, axis=1)
+    tick = STAGE_TIMER.lap("notch", tick)
 
     # 3. Bandpass 20–90 Hz
-    data = filtfilt(B_BAND, A_BAND, data, axis=0)
-
-    # 4. STFT per channel
-    specs = []
-    for ch in range(data.shape[1]):
-        # The input data is already a single window
-        f, t, Zxx = stft(
-            data[:, ch], fs=FS,
-            nperseg=NPERSEG,
-            noverlap=NOVERLAP,
-            boundary=None
-        )
-        specs.append(np.abs(Zxx))
+    data = filtfilt(b_band, a_band, data, axis=1)
+    tick = STAGE_TIMER.lap("bandpass", tick)
+
+    # 4. STFT of every channel of every window in one call: (N, 8, samples) -> (N, 8, F, T)
+    f, t, Zxx = stft(
+        np.swapaxes(data, 1, 2), fs=fs,
+        nperseg=nperseg,
+        noverlap=noverlap,
+        boundary=None
+    )
     
-    # Shape is (channels, freq_bins, time_steps)
-    return np.array(specs).astype(np.float32)
+    Zxx = np.abs(Zxx).astype(np.float32)
+    STAGE_TIMER.lap("stft", tick)
+    return Zxx
 
 
 # ===========================
 # 4. Model & Normalization Loading
 # ===========================
 
-def load_model_and_params(model_path: str, normalization_path: str):
+def normalization_from_stats(norm) -> tuple:
+    """
+    Converts saved normalization statistics into (mean, std) of shape (8, 1, 1).
+
+    Accepts the running stats saved by train_200.py ('count', 'mean', 'm2') or
+    plain 'mean'/'std' arrays.
+    """
+    mean = np.asarray(norm["mean"], dtype=np.float64).reshape(-1, 1, 1)
+    if "std" in norm:
+        std = np.asarray(norm["std"], dtype=np.float64).reshape(-1, 1, 1)
+    else:
+        count = max(int(norm["count"]), 1)
+        std = np.sqrt(np.asarray(norm["m2"], dtype=np.float64) / count).reshape(-1, 1, 1) + 1e-8
+    return mean.astype(np.float32), std.astype(np.float32)
+
+
+def load_bundle(model_path: str, normalization_path: str = None) -> tuple:
+    """
+    Loads one model file.
+
+    Models saved by train_200.py bundle the weights with the normalization statistics
+    and feature config. Older checkpoints hold only a state_dict; their mean/std are
+    read from `normalization_path` (.npz) if it exists.
+
+    Files exported by numpy_inference.py (.npz) load as a torch-free NumpyCNN, with
+    their normalization and config baked in. Under the numpy backend a .pth path
+    is mapped to its export (numpy_inference.exported_path).
+
+    Returns:
+        (model in eval mode, mean, std, config); mean/std are None if no
+        normalization was found, config is None for weights-only checkpoints.
+    """
+    if BACKEND == "numpy" or model_path.endswith(".npz"):
+        from numpy_inference import exported_path, load_numpy_bundle
+        return load_numpy_bundle(model_path if model_path.endswith(".npz") else exported_path(model_path))
+
+    try:
+        checkpoint = torch.load(model_path, map_location=DEVICE)
+        norm, config = None, None
+        if "state_dict" in checkpoint:
+            state_dict = checkpoint["state_dict"]
+            norm = checkpoint.get("normalization")
+            config = checkpoint.get("config")
+        else:
+            state_dict = checkpoint  # legacy: weights only
+        model = CNNmodel(num_classes=len((config or {}).get("class_names", CLASS_NAMES))).to(DEVICE)
+        model.load_state_dict(state_dict)
+        model.eval()
+        print(f"🧠 Model: Loaded weights from '{model_path}' and set to {DEVICE}.")
+    except Exception as e:
+        print(f"❌ Model: Failed to load model weights from {model_path}. Error: {e}")
+        raise
+
+    # Load Normalization Parameters (Mean and Std)
+    try:
+        if norm is None and normalization_path and os.path.exists(normalization_path):
+            with np.load(normalization_path) as npz:
+                norm = {k: npz[k] for k in npz.files}
+
+        mean, std = normalization_from_stats(norm) if norm is not None else (None, None)
+        if norm is None:
+            print("⚠️ Model: No normalization parameters found with the model. Retrain with train_200.py to save them.")
+    except Exception as e:
+        print(f"❌ Model: Failed to load normalization parameters. Error: {e}")
+        raise
+
+    return model, mean, std, config
+
+
+def load_model_and_params(model_path: str, normalization_path: str = None):
     """
     Loads the model weights and normalization parameters (mean/std) once.
-    
-    NOTE: You MUST save the mean and std from your training script 
-          (e.g., in a separate .npy file) for this to work correctly.
+
+    See load_bundle for the supported file formats.
     """
-    global _MODEL, _MEAN, _STD
+    global _MODEL, _MEAN, _STD, _CONFIG
     
-    # Load Model Architecture and Weights
     if _MODEL is None:
-        try:
-            model = CNNmodel().to(DEVICE)
-            model.load_state_dict(torch.load(model_path, map_location=DEVICE))
-            model.eval()
-            _MODEL = model
-            print(f"🧠 Model: Loaded weights from '{model_path}' and set to {DEVICE}.")
-        except Exception as e:
-            print(f"❌ Model: Failed to load model weights from {model_path}. Error: {e}")
-            raise
-    
-    # Load Normalization Parameters (Mean and Std)
-    if _MEAN is None or _STD is None:
-        try:
-            # Assume normalization_path points to a file containing a dictionary 
-            # or array with mean and std saved during training.
-            # !!! THIS PART REQUIRES YOU TO SAVE MEAN/STD IN TRAIN_200.PY !!!
-            
-            # --- Placeholder for loading normalization parameters ---
-            # You must run train_200.py once, print the 'mean' and 'std' values,
-            # and manually set them here, or save them to a file.
-            
-            # Example if you manually set them (replace with your actual values)
-            # These were derived by running train_200.py once and printing them.
-            _MEAN = np.array([[[[3.6599715, ..., 3.6599715]]]]).astype(np.float32) 
-            _STD = np.array([[[[0.7258384, ..., 0.7258384]]]]).astype(np.float32)
-
-            # NOTE: The shapes must match the saved mean/std from training
-            
-            # If you saved a numpy file:
-            # params = np.load(normalization_path, allow_pickle=True).item()
-            # _MEAN = params['mean']
-            # _STD = params['std']
-            # --- End Placeholder ---
-            
-            if _MEAN is None or _STD is None:
-                 print("⚠️ Model: Normalization parameters (mean/std) are set to placeholder values. Update them from your training script!")
-                 # Set a neutral placeholder if actual values aren't loaded/set
-                 # This will result in poor performance unless corrected.
-                 # We'll set these to None and handle normalization dynamically in run_inference
-                 pass
-
-        except Exception as e:
-            print(f"❌ Model: Failed to load normalization parameters. Error: {e}")
-            raise
+        _MODEL, _MEAN, _STD, _CONFIG = load_bundle(model_path, normalization_path)
+
+
+def reset_model():
+    """Forgets the loaded model so the next load/run_inference picks up another one."""
+    global _MODEL, _MEAN, _STD, _CONFIG
+    _MODEL = _MEAN = _STD = _CONFIG = None
+
+
+def install_model(model, mean, std, config) -> tuple:
+    """
+    Replaces the model served by run_inference (used by hot reload).
+
+    Not synchronized with run_inference: call it from the thread that runs
+    inference, between two calls.
+
+    Returns:
+        The previous (model, mean, std, config), for rollback.
+    """
+    global _MODEL, _MEAN, _STD, _CONFIG
+    previous = (_MODEL, _MEAN, _STD, _CONFIG)
+    _MODEL, _MEAN, _STD, _CONFIG = model, mean, std, config
+    return previous
 
 
 # ===========================
 # 5. Dedicated Inference Function
 # ===========================
 
+DEFAULT_MODEL_FILE = "train_single_subject_myo_model.pth"
+DEFAULT_NORM_FILE = "normalization_params.npz" # Only used for weights-only checkpoints
+if BACKEND == "numpy":
+    # Serve (and hot-reload) the NumPy export; re-export after retraining
+    from numpy_inference import exported_path
+    DEFAULT_MODEL_FILE = exported_path(DEFAULT_MODEL_FILE)
+
+def _load_default_model():
+    # Load model with default paths if not already loaded
+    load_model_and_params(DEFAULT_MODEL_FILE, DEFAULT_NORM_FILE)
+
+
+def forward_logits(model, X: np.ndarray) -> np.ndarray:
+    """
+    Logits of either backend's model (CNNmodel or numpy_inference.NumpyCNN).
+
+    Args:
+        X: Normalized features of shape (N, 8, F, T), float32.
+
+    Returns:
+        A NumPy array of shape (N, num_classes).
+    """
+    if torch is None or not isinstance(model, nn.Module):
+        return model(X)
+    with torch.no_grad():
+        return model(torch.from_numpy(X).to(DEVICE)).cpu().numpy()
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Row-wise softmax of (N, num_classes) logits."""
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
 def run_inference(emg_window: np.ndarray) -> str:
     """
     Runs the full inference pipeline (preprocess -> normalize -> predict).
@@ -179,22 +364,21 @@ def run_inference(emg_window: np.ndarray) -> str:
     global _MODEL, _MEAN, _STD
     
     if _MODEL is None:
-        # Load model with placeholder paths if not already loaded
-        # YOU MUST REPLACE THE PATHS BELOW with your saved files
-        model_file = "train_single_subject_myo_model.pth"
-        norm_file = "normalization_params.npy" # Placeholder
-        load_model_and_params(model_file, norm_file)
+        _load_default_model()
         
     # Ensure the model is loaded after the first attempt
     if _MODEL is None:
         return "ERROR: Model not loaded."
 
 
-    # 1. Preprocessing (Detrend, Filter, STFT)
+    # 1. Preprocessing (Detrend, Filter, STFT), with the settings the model was trained on
     # Output shape: (8, F, T) -> (channels, freq, time)
-    X_spec = preprocess_window(emg_window)
+    cfg = _CONFIG or {}
+    X_spec = preprocess_window(emg_window, cfg.get("fs", FS), cfg.get("nperseg", NPERSEG),
+                               cfg.get("noverlap", NOVERLAP))
     
     # 2. Log + Normalization
+    tick = STAGE_TIMER.start()
     X = np.log1p(X_spec)
     # The normalization parameters must have been calculated over the entire
     # training set for ALL axes (0, 2, 3), but applied per channel.
@@ -208,26 +392,221 @@ def run_inference(emg_window: np.ndarray) -> str:
         print("⚠️ Warning: Using fallback normalization (zero mean, unit std). Model performance may be poor.")
     
     # Ensure shapes are compatible for broadcasting
-    # _MEAN and _STD should be shape (8, F, T) or broadcastable to it
+    # _MEAN and _STD are shape (8, 1, 1) or broadcastable to (8, F, T)
     X = (X - _MEAN) / _STD
+    tick = STAGE_TIMER.lap("log_normalize", tick)
     
-    # 3. Prepare for PyTorch model (Add batch dimension)
+    # 3. Prepare for the model (Add batch dimension)
     # Input shape to model must be (1, C, F, T) -> (1, 8, F, T)
-    X_tensor = torch.from_numpy(X[np.newaxis, ...]).to(DEVICE)
+    X_batch = X[np.newaxis, ...].astype(np.float32)
     
-    # 4. Inference
-    with torch.no_grad():
-        output = _MODEL(X_tensor)
+    # 4. Inference (torch or NumPy backend)
+    output = forward_logits(_MODEL, X_batch)
         
     # 5. Get Prediction
-    # The output is a tensor like [logit_rest, logit_pinch]
-    prediction_idx = output.argmax(1).item()
+    # The output is an array like [[logit_rest, logit_pinch]]
+    prediction_idx = int(output.argmax(1)[0])
+    STAGE_TIMER.lap("forward", tick)
     
-    return CLASS_NAMES[prediction_idx]
+    return cfg.get("class_names", CLASS_NAMES)[prediction_idx]
+
+
+def run_inference_batch(emg_windows: np.ndarray, batch_size: int = 1024) -> tuple:
+    """
+    Runs the inference pipeline on many windows at once (e.g. a whole recording).
+
+    Args:
+        emg_windows: A NumPy array (or strided view) of shape (N, WINDOW_SIZE, 8).
+        batch_size: Windows preprocessed and forwarded per step, bounding memory.
+
+    Returns:
+        (predicted class indices of shape (N,), softmax probabilities of shape (N, num_classes))
+    """
+    global _MEAN, _STD
+
+    if _MODEL is None:
+        _load_default_model()
+
+    cfg = _CONFIG or {}
+    if _MEAN is None or _STD is None:
+        # Same fallback (and warning, once per model) as run_inference
+        _MEAN, _STD = np.float32(0.0), np.float32(1.0)
+        print("⚠️ Warning: Using fallback normalization (zero mean, unit std). Model performance may be poor.")
+    mean, std = _MEAN, _STD
+
+    probs = []
+    for start in range(0, len(emg_windows), batch_size):
+        X = np.log1p(preprocess_windows(np.asarray(emg_windows[start:start + batch_size]),
+                                        cfg.get("fs", FS), cfg.get("nperseg", NPERSEG),
+                                        cfg.get("noverlap", NOVERLAP)))
+        X = ((X - mean) / std).astype(np.float32)
+        probs.append(softmax(forward_logits(_MODEL, X)).astype(np.float32))
+
+    if not probs:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, len(cfg.get("class_names", CLASS_NAMES))), dtype=np.float32)
+    probs = np.concatenate(probs)
+    return probs.argmax(axis=1), probs
+
+
+# ===========================
+# 6. Model Registry (several models on one stream)
+# ===========================
+
+def feature_settings(config: dict = None) -> dict:
+    """A model's feature config with the module defaults filled in."""
+    cfg = {"fs": FS, "window_size": WINDOW_SIZE, "nperseg": NPERSEG, "noverlap": NOVERLAP,
+           "class_names": CLASS_NAMES}
+    cfg.update(config or {})
+    return cfg
+
+
+class RegisteredModel:
+    """A served model and the feature config it was trained on."""
+
+    def __init__(self, name, model, mean, std, config):
+        self.name = name
+        self.model = model
+        self.config = feature_settings(config)
+        # Models without saved statistics fall back to zero mean / unit std, as in run_inference
+        self.mean = mean if mean is not None else np.float32(0.0)
+        self.std = std if std is not None else np.float32(1.0)
+
+    @property
+    def feature_key(self) -> tuple:
+        """Models with the same key share one preprocessing result."""
+        cfg = self.config
+        return (cfg["fs"], cfg["window_size"], cfg["nperseg"], cfg["noverlap"])
+
+
+_REGISTRY = {}                  # name -> RegisteredModel, in registration order
+_REGISTRY_LOCK = threading.Lock()
+
+
+def register_model(name: str, model_path: str, normalization_path: str = None,
+                   config: dict = None) -> RegisteredModel:
+    """
+    Loads a model file and adds it to the registry served by run_inference_all.
+
+    Args:
+        config: Feature config overrides (fs, window_size, nperseg, noverlap, class_names);
+            needed for weights-only checkpoints trained with non-default settings.
+    """
+    model, mean, std, saved_config = load_bundle(model_path, normalization_path)
+    entry = RegisteredModel(name, model, mean, std, {**(saved_config or {}), **(config or {})})
+    replace_registered(entry)
+    return entry
+
+
+def replace_registered(entry: RegisteredModel) -> RegisteredModel:
+    """Adds or atomically replaces a registry entry; returns the previous one (or None)."""
+    with _REGISTRY_LOCK:
+        previous = _REGISTRY.get(entry.name)
+        _REGISTRY[entry.name] = entry
+    return previous
+
+
+def unregister_model(name: str):
+    with _REGISTRY_LOCK:
+        _REGISTRY.pop(name, None)
+
+
+def registered_models() -> list:
+    with _REGISTRY_LOCK:
+        return list(_REGISTRY.values())
+
+
+def registry_window_size() -> int:
+    """Samples needed to serve every registered model (0 if the registry is empty)."""
+    return max((m.config["window_size"] for m in registered_models()), default=0)
+
+
+def serving_models() -> list:
+    """
+    The models the receiver serves: the registry, or else the default model of
+    run_inference (loaded on first use) as a single entry named "default".
+    """
+    models = registered_models()
+    if models:
+        return models
+    if _MODEL is None:
+        _load_default_model()
+    return [RegisteredModel("default", _MODEL, _MEAN, _STD, _CONFIG)]
+
+
+def compute_features(emg_window: np.ndarray, models: list = None) -> dict:
+    """
+    Preprocessing (detrend, filters, STFT, log) once per distinct feature config.
+
+    Args:
+        emg_window: A NumPy array of shape (N, 8); each config uses the latest
+            `window_size` samples.
+        models: Models to compute features for (default: serving_models()).
+
+    Returns:
+        {feature_key: log-spectrogram of shape (8, F, T)}
+    """
+    features = {}
+    for entry in (models if models is not None else serving_models()):
+        key = entry.feature_key
+        if key in features:
+            continue
+        fs, window_size, nperseg, noverlap = key
+        if len(emg_window) < window_size:
+            raise ValueError(f"Window has {len(emg_window)} samples, model '{entry.name}' needs {window_size}")
+        X_spec = preprocess_window(emg_window[-window_size:], fs, nperseg, noverlap)
+        tick = STAGE_TIMER.start()
+        features[key] = np.log1p(X_spec)
+        STAGE_TIMER.lap("log_normalize", tick)
+    return features
+
+
+def predict_features(features: dict, models: list = None, with_probs: bool = False) -> dict:
+    """
+    Normalizes the shared features per model and runs each model's forward pass.
+
+    Args:
+        features: Output of compute_features; must contain every model's feature_key.
+        models: Models to evaluate (default: serving_models()).
+
+    Returns:
+        {model name: class name}, or {model name: (class name, probabilities)} with with_probs.
+    """
+    results = {}
+    for entry in (models if models is not None else serving_models()):
+        tick = STAGE_TIMER.start()
+        X = ((features[entry.feature_key] - entry.mean) / entry.std).astype(np.float32)
+        logits = forward_logits(entry.model, X[np.newaxis, ...])
+        idx = int(logits.argmax(1)[0])
+        class_name = entry.config["class_names"][idx]
+        if with_probs:
+            results[entry.name] = (class_name, softmax(logits)[0].astype(np.float32))
+        else:
+            results[entry.name] = class_name
+        STAGE_TIMER.lap(f"forward[{entry.name}]", tick)
+    return results
+
+
+def run_inference_all(emg_window: np.ndarray, with_probs: bool = False) -> dict:
+    """
+    Runs every registered model on the latest samples of one window.
+
+    Preprocessing (detrend, filters, STFT, log) runs once per distinct feature
+    config; each model then only adds its normalization and a forward pass.
+
+    Args:
+        emg_window: A NumPy array of shape (N, 8) with N >= registry_window_size();
+            each model uses the latest `window_size` samples.
+        with_probs: Also return the softmax probabilities.
+
+    Returns:
+        {model name: class name}, or {model name: (class name, probabilities)} with with_probs.
+    """
+    models = registered_models()
+    return predict_features(compute_features(emg_window, models), models, with_probs)
 
 
 # ===========================
-# 6. Example Usage (Self-Test)
+# 7. Example Usage (Self-Test)
 # ===========================
 
 if __name__ == '__main__':
@@ -0,0 +1,167 @@
+# This file implements the latency-vs-accuracy Pareto benchmark for window / STFT settings
+"""
+Latency vs. accuracy benchmark across window and STFT settings.
+
+The live path waits for WINDOW_SIZE samples before it can classify (256 samples =
+1.28 s at 200 Hz). This tool trains variants with shorter windows and different
+NPERSEG/NOVERLAP (in parallel, through sweep.py), then loads each resulting model
+into inference.py and measures what serving it actually costs:
+
+    delay_ms   - algorithmic delay: window length (WINDOW_SIZE / FS)
+    preprocess - inference.preprocess_window wall time
+    total      - inference.run_inference wall time and CPU time (process_time)
+
+and reports the Pareto front over (accuracy ↑, delay ↓, CPU time ↓).
+
+Usage:
+    python latency_pareto.py --workers 4 --out pareto_results
+    python latency_pareto.py --from-results sweep_results/results.csv   # measure existing models only
+"""
+
+import os
+import csv
+import time
+
+import numpy as np
+
+# ===========================
+# Config
+# ===========================
+DEFAULT_SPEC = {
+    "mode": "grid",
+    "params": {
+        "WINDOW_SIZE": [64, 96, 128, 192, 256],
+        "NPERSEG": [32, 64, 128],
+        "NOVERLAP": [16, 32, 64],
+    },
+}
+SERVING_RUNS = 300             # run_inference calls per variant
+WARMUP_RUNS = 20
+PARETO_FILE = "pareto.csv"
+
+# ===========================
+# Serving Measurements
+# ===========================
+def measure_serving(model_path, runs=SERVING_RUNS, seed=0):
+    """
+    Loads a model bundle into inference.py and times preprocess_window and run_inference.
+
+    Returns:
+        Dict of median/p95 wall times and mean CPU time per call, in ms.
+    """
+    import inference
+
+    inference.reset_model()
+    inference.load_model_and_params(model_path)
+    cfg = inference._CONFIG
+    fs, window_size = cfg["fs"], cfg["window_size"]
+
+    rng = np.random.RandomState(seed)
+    windows = rng.randint(-40, 40, size=(WARMUP_RUNS + runs, window_size, 8)).astype(np.float32)
+
+    for w in windows[:WARMUP_RUNS]:
+        inference.run_inference(w)
+
+    pre_ms, total_ms = [], []
+    cpu_start = time.process_time()
+    for w in windows[WARMUP_RUNS:]:
+        start = time.perf_counter()
+        inference.run_inference(w)
+        total_ms.append((time.perf_counter() - start) * 1000)
+    cpu_ms = (time.process_time() - cpu_start) * 1000 / runs
+
+    for w in windows[WARMUP_RUNS:]:
+        start = time.perf_counter()
+        inference.preprocess_window(w, fs, cfg["nperseg"], cfg["noverlap"])
+        pre_ms.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "delay_ms": round(1000.0 * window_size / fs, 1),
+        "preprocess_ms": round(float(np.median(pre_ms)), 3),
+        "total_ms": round(float(np.median(total_ms)), 3),
+        "total_p95_ms": round(float(np.percentile(total_ms, 95)), 3),
+        "cpu_ms": round(cpu_ms, 3),
+    }
+
+def pareto_front(rows, maximize=("test_acc",), minimize=("delay_ms", "cpu_ms")):
+    """Rows not dominated by any other row on the given objectives."""
+    def dominates(a, b):
+        better_or_equal = all(a[k] >= b[k] for k in maximize) and all(a[k] <= b[k] for k in minimize)
+        strictly = any(a[k] > b[k] for k in maximize) or any(a[k] < b[k] for k in minimize)
+        return better_or_equal and strictly
+    return [r for r in rows if not any(dominates(o, r) for o in rows if o is not r)]
+
+def read_results(path):
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        row["test_acc"] = float(row["test_acc"])
+    return rows
+
+# ===========================
+# Main
+# ===========================
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Latency vs. accuracy Pareto benchmark for window/STFT settings")
+    parser.add_argument("--spec", default=None, help="JSON sweep spec (default: built-in window/STFT grid)")
+    parser.add_argument("--from-results", default=None, help="Skip training; measure models listed in a sweep results.csv")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent training trials")
+    parser.add_argument("--threads", type=int, default=1, help="Threads per training trial")
+    parser.add_argument("--serving-threads", type=int, default=1, help="Torch threads while measuring serving cost")
+    parser.add_argument("--epochs", type=int, default=None, help="Override EPOCHS for every variant")
+    parser.add_argument("--patience", type=int, default=None, help="Early stopping patience per variant")
+    parser.add_argument("--all-subjects", action="store_true", help="Train on ALL_SUBJECT_FILES")
+    parser.add_argument("--out", default="pareto_results", help="Output directory")
+    args = parser.parse_args()
+
+    if args.from_results:
+        rows = read_results(args.from_results)
+        out_dir = os.path.dirname(args.from_results) or "."
+    else:
+        import sweep
+        import train_200 as tr
+
+        spec = DEFAULT_SPEC
+        if args.spec:
+            with open(args.spec) as f:
+                spec = json.load(f)
+        if args.epochs:
+            spec = {**spec, "params": {**spec["params"], "EPOCHS": [args.epochs]}}
+        defaults = {k: getattr(tr, k) for k in tr.CONFIG_KEYS}
+        trials = sweep.expand_spec(spec, defaults)
+        files = tr.ALL_SUBJECT_FILES if args.all_subjects else tr.DATA_FILES
+        print(f"Training {len(trials)} variant(s)...")
+        rows = sweep.run_sweep(trials, files, args.out, args.workers, args.threads, patience=args.patience)
+        out_dir = args.out
+
+    import torch
+    torch.set_num_threads(args.serving_threads)
+
+    print(f"\nMeasuring serving cost of {len(rows)} model(s)...")
+    for row in rows:
+        row.update(measure_serving(row["model"]))
+
+    front = pareto_front(rows)
+    front_ids = {id(r) for r in front}
+    for row in rows:
+        row["pareto"] = id(row) in front_ids
+
+    rows.sort(key=lambda r: (r["delay_ms"], -r["test_acc"]))
+    columns = ["WINDOW_SIZE", "NPERSEG", "NOVERLAP", "test_acc", "delay_ms", "preprocess_ms",
+               "total_ms", "total_p95_ms", "cpu_ms", "pareto", "model"]
+    with open(os.path.join(out_dir, PARETO_FILE), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"\n{'window':>6s} {'nperseg':>7s} {'noverlap':>8s} | {'acc':>6s} | {'delay':>7s} | "
+          f"{'prep':>7s} | {'total':>7s} | {'cpu':>7s}")
+    for row in rows:
+        mark = " *" if row["pareto"] else ""
+        print(f"{int(row['WINDOW_SIZE']):6d} {int(row['NPERSEG']):7d} {int(row['NOVERLAP']):8d} | "
+              f"{row['test_acc']:.4f} | {row['delay_ms']:5.0f}ms | {row['preprocess_ms']:5.2f}ms | "
+              f"{row['total_ms']:5.2f}ms | {row['cpu_ms']:5.2f}ms{mark}")
+    print(f"\n* = Pareto-optimal (accuracy vs. delay vs. CPU time). Written to '{os.path.join(out_dir, PARETO_FILE)}'")
@@ -0,0 +1,394 @@
+# This file implements a multi-connection synthetic load generator for the EMG ingestion path
+"""
+Stress test for the EMG ingestion path.
+
+`run` opens N concurrent sender connections (one thread each, like N armbands)
+and streams synthetic 8-channel EMG at a fixed rate per connection, from 200 Hz
+up to several kHz, with rest noise and pinch-like bursts (ramped envelope,
+per-channel gains, random onsets). `sink` is a receiver that accepts any number
+of connections and measures what arrives.
+
+Formats:
+    json    the sender's wire format plus the send time, one line per sample:
+            {"timestamp":1.234000,"sent":1718000000.123456,"sample":246,"emg":[1,-2,3,0,5,-1,2,0]}
+            (the receiver, stream_broker.py and stream_recorder.py ignore "sent")
+    binary  32-byte records: f64 timestamp, f64 sent, i64 sample, i8[8] emg
+
+Reported by `run`, per connection and in total:
+    throughput      samples/s achieved vs. target
+    stalls          sends that blocked longer than --stall-ms (the receiver's socket
+                    buffer was full) and the total time spent blocked
+    behind          how far the sender fell behind its schedule
+    backlog         bytes the receiver has no room for yet: written by the sender but not
+                    sent because the receive window is closed (Linux, SIOCOUTQNSD), as ms of data
+Reported by `sink`:
+    lag             receive time - send time per sample (mean, p99, max)
+
+emg-to-pytorch.py accepts a single sender connection; with more than one, point
+the generator at stream_broker.py (and the receiver at the broker with
+--subscribe), or at the sink. Only the sink understands the binary format.
+
+Usage:
+    python load_generator.py sink --port 9002 --format json
+    python load_generator.py run --connections 8 --rate 2000 --seconds 30
+    python load_generator.py run --connections 1 --rate 200 --seconds 60     # against emg-to-pytorch.py
+"""
+
+import sys
+import json
+import time
+import socket
+import threading
+
+import numpy as np
+
+# ===========================
+# Config
+# ===========================
+HOST = '127.0.0.1'
+PORT = 9002
+FORMATS = ("json", "binary")
+CHANNELS = 8
+SEND_INTERVAL = 0.005          # Seconds between sends of one connection (samples due are sent together)
+STALL_MS = 5.0                 # A send blocking longer than this counts as a stall
+REPORT_INTERVAL = 1.0          # Seconds between progress lines
+RECV_SIZE = 64 * 1024
+SIOCOUTQNSD = 0x894B           # Linux ioctl: bytes in the send queue not sent yet
+
+JSON_LINE = ('{"timestamp":%.6f,"sent":%.6f,"sample":%d,"emg":[' + ",".join(["%d"] * CHANNELS) + ']}\n')
+BINARY_RECORD = np.dtype([("timestamp", "<f8"), ("sent", "<f8"), ("sample", "<i8"), ("emg", "i1", (CHANNELS,))])
+
+# ===========================
+# Synthetic EMG
+# ===========================
+class SyntheticEMG:
+    """
+    Rest noise with pinch-like bursts: 0.4-1.5 s long, starting every 1-4 s, with a
+    raised-cosine envelope and a fixed gain pattern across channels.
+    """
+
+    def __init__(self, rate, seed=0):
+        self.rate = rate
+        self.rng = np.random.default_rng(seed)
+        self.gains = self.rng.uniform(0.3, 1.0, CHANNELS)
+        self._next_burst = int(self.rng.uniform(1, 4) * rate)
+        self._burst_start = None
+        self._burst_len = 0
+
+    def envelope(self, seq, n):
+        """Burst amplitude (0..1) of samples seq..seq+n-1."""
+        env = np.zeros(n)
+        i = 0
+        while i < n:
+            s = seq + i
+            if self._burst_start is None:
+                if s >= self._next_burst:
+                    self._burst_start = s
+                    self._burst_len = int(self.rng.uniform(0.4, 1.5) * self.rate)
+                    continue
+                i = min(n, self._next_burst - seq)
+                continue
+            pos = s - self._burst_start
+            take = min(n - i, self._burst_len - pos)
+            phase = (pos + np.arange(take)) / self._burst_len
+            env[i:i + take] = 0.5 - 0.5 * np.cos(2 * np.pi * phase)
+            i += take
+            if pos + take >= self._burst_len:
+                self._next_burst = s + take + int(self.rng.uniform(1, 4) * self.rate)
+                self._burst_start = None
+        return env
+
+    def block(self, seq, n):
+        """n samples starting at sequence number seq -> int array (n, CHANNELS) in int8 range."""
+        amplitude = 3 + 40 * self.envelope(seq, n)[:, np.newaxis] * self.gains
+        emg = self.rng.normal(0, 1, (n, CHANNELS)) * amplitude
+        return np.clip(np.rint(emg), -128, 127).astype(np.int64)
+
+
+def encode(fmt, timestamps, sent, seq, emg):
+    """A block of samples in the given format."""
+    n = len(timestamps)
+    if fmt == "binary":
+        records = np.zeros(n, dtype=BINARY_RECORD)
+        records["timestamp"], records["sent"], records["emg"] = timestamps, sent, emg
+        records["sample"] = seq + np.arange(n)
+        return records.tobytes()
+    columns = np.empty((n, 3 + CHANNELS), dtype=object)
+    columns[:, 0] = timestamps.tolist()
+    columns[:, 1] = sent
+    columns[:, 2] = range(seq, seq + n)
+    columns[:, 3:] = emg.tolist()
+    return ((JSON_LINE * n) % tuple(columns.ravel().tolist())).encode()
+
+
+def unsent_bytes(sock):
+    """Bytes written to the socket but not sent yet, i.e. waiting for the receiver to read (Linux only), else None."""
+    try:
+        import fcntl
+        return int.from_bytes(fcntl.ioctl(sock.fileno(), SIOCOUTQNSD, b"\0\0\0\0"), sys.byteorder)
+    except (ImportError, OSError):
+        return None
+
+# ===========================
+# Senders
+# ===========================
+class SenderConnection(threading.Thread):
+    """One paced sender connection and its counters."""
+
+    def __init__(self, index, host, port, rate, fmt, seconds, stall_ms=STALL_MS, seed=0):
+        super().__init__(name=f"sender-{index}", daemon=True)
+        self.index = index
+        self.address = (host, port)
+        self.rate = rate
+        self.fmt = fmt
+        self.seconds = seconds
+        self.stall_s = stall_ms / 1000
+        self.source = SyntheticEMG(rate, seed + index)
+        self.stop_event = threading.Event()
+
+        self.samples = 0
+        self.bytes = 0
+        self.stalls = 0
+        self.stalled_s = 0.0
+        self.max_send_s = 0.0
+        self.max_behind_s = 0.0
+        self.backlog_bytes = 0          # Latest SIOCOUTQNSD reading
+        self.max_backlog_bytes = 0
+        self.elapsed = 0.0
+        self.error = None
+
+    def run(self):
+        try:
+            with socket.create_connection(self.address) as s:
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._send_loop(s)
+        except OSError as e:
+            self.error = str(e)
+
+    def _send_loop(self, s):
+        start = time.perf_counter()
+        epoch = time.time() - start         # perf_counter -> wall clock, for the "sent" field
+        while not self.stop_event.is_set():
+            now = time.perf_counter() - start
+            if self.seconds is not None and now >= self.seconds:
+                break
+            due = int(now * self.rate) - self.samples
+            if due > 0:
+                # How late the oldest due sample is
+                self.max_behind_s = max(self.max_behind_s, now - (self.samples + 1) / self.rate)
+                seq = self.samples
+                timestamps = (seq + np.arange(due)) / self.rate
+                data = encode(self.fmt, timestamps, epoch + time.perf_counter(), seq, self.source.block(seq, due))
+
+                send_start = time.perf_counter()
+                s.sendall(data)
+                took = time.perf_counter() - send_start
+                if took > self.stall_s:
+                    self.stalls += 1
+                    self.stalled_s += took
+                self.max_send_s = max(self.max_send_s, took)
+                self.samples += due
+                self.bytes += len(data)
+
+                backlog = unsent_bytes(s)
+                if backlog is not None:
+                    self.backlog_bytes = backlog
+                    self.max_backlog_bytes = max(self.max_backlog_bytes, backlog)
+
+            # Sleep until the next send slot
+            delay = SEND_INTERVAL - (time.perf_counter() - start - now)
+            if delay > 0:
+                time.sleep(delay)
+        self.elapsed = time.perf_counter() - start
+
+    @property
+    def bytes_per_sample(self):
+        return self.bytes / max(self.samples, 1)
+
+    def backlog_ms(self, value):
+        return 1000 * value / self.bytes_per_sample / self.rate if self.samples else 0.0
+
+
+def run_load(host=HOST, port=PORT, connections=1, rate=200, fmt="json", seconds=10.0,
+             stall_ms=STALL_MS, seed=0, report_interval=REPORT_INTERVAL):
+    """
+    Runs the senders to completion (or Ctrl+C) while printing progress.
+
+    Returns:
+        The SenderConnection objects, with their counters.
+    """
+    senders = [SenderConnection(i, host, port, rate, fmt, seconds, stall_ms, seed) for i in range(connections)]
+    print(f"🚀 Load: {connections} connection(s) x {rate:.0f} Hz ({fmt}) -> {host}:{port}"
+          f" for {seconds:g}s, target {connections * rate:.0f} samples/s")
+    for sender in senders:
+        sender.start()
+
+    start = time.perf_counter()
+    last_samples = 0
+    try:
+        while any(sender.is_alive() for sender in senders):
+            time.sleep(report_interval)
+            total = sum(sender.samples for sender in senders)
+            backlog = max(sender.backlog_ms(sender.backlog_bytes) for sender in senders)
+            print(f"   t={time.perf_counter() - start:6.1f}s | {(total - last_samples) / report_interval:9.0f} samples/s | "
+                  f"stalls {sum(sender.stalls for sender in senders):5d} | backlog {backlog:7.1f}ms", flush=True)
+            last_samples = total
+    except KeyboardInterrupt:
+        print("\n🛑 Load: Stopping...")
+        for sender in senders:
+            sender.stop_event.set()
+    for sender in senders:
+        sender.join()
+    return senders
+
+
+def print_report(senders):
+    print("📊 Load report:")
+    print(f"   {'conn':>4s} {'samples':>9s} {'rate/s':>9s} {'target':>7s} {'stalls':>6s} {'stalled':>8s} "
+          f"{'max send':>9s} {'behind':>8s} {'backlog max':>11s}")
+    for sd in senders:
+        if sd.error:
+            print(f"   {sd.index:4d} error: {sd.error}")
+            continue
+        achieved = sd.samples / max(sd.elapsed, 1e-9)
+        print(f"   {sd.index:4d} {sd.samples:9d} {achieved:9.0f} {sd.rate:7.0f} {sd.stalls:6d} {sd.stalled_s:7.3f}s "
+              f"{1000 * sd.max_send_s:7.2f}ms {1000 * sd.max_behind_s:6.1f}ms {sd.backlog_ms(sd.max_backlog_bytes):9.1f}ms")
+    ok = [sd for sd in senders if not sd.error]
+    if ok:
+        elapsed = max(sd.elapsed for sd in ok)
+        total = sum(sd.samples for sd in ok)
+        print(f"   total {total} samples, {total / max(elapsed, 1e-9):.0f} samples/s "
+              f"({sum(sd.rate for sd in ok):.0f} targeted), {sum(sd.bytes for sd in ok) / max(elapsed, 1e-9) / 1e6:.2f} MB/s, "
+              f"{sum(sd.stalls for sd in ok)} stalls")
+
+# ===========================
+# Sink (measuring receiver)
+# ===========================
+class LoadSink:
+    """
+    Accepts any number of sender connections and measures throughput and the
+    lag between each sample's send time and its arrival.
+    """
+
+    def __init__(self, host=HOST, port=PORT, fmt="json"):
+        self.address = (host, port)
+        self.fmt = fmt
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.samples = 0
+        self.bad = 0
+        self.connections = 0
+        self.lags = []                   # Arrays of per-sample lags (s)
+        self.first_arrival = None
+        self.last_arrival = None
+
+    def serve(self, seconds=None):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind(self.address)
+            server.listen(64)
+            server.settimeout(0.2)
+            print(f"📥 Sink: Listening on {self.address[0]}:{self.address[1]} ({self.fmt})")
+            start = time.perf_counter()
+            threads = []
+            while not self.stop_event.is_set():
+                if seconds is not None and time.perf_counter() - start >= seconds:
+                    break
+                try:
+                    conn, addr = server.accept()
+                except socket.timeout:
+                    continue
+                with self.lock:
+                    self.connections += 1
+                thread = threading.Thread(target=self._receive, args=(conn,), daemon=True)
+                thread.start()
+                threads.append(thread)
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+
+    def _receive(self, conn):
+        partial = b""
+        with conn:
+            conn.settimeout(0.2)
+            while not self.stop_event.is_set():
+                try:
+                    data = conn.recv(RECV_SIZE)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                if not data:
+                    break
+                now = time.time()
+                data = partial + data
+                if self.fmt == "binary":
+                    end = len(data) - len(data) % BINARY_RECORD.itemsize
+                    sent, bad = np.frombuffer(data[:end], dtype=BINARY_RECORD)["sent"], 0
+                else:
+                    end = data.rfind(b"\n") + 1
+                    sent, bad = self._parse_json(data[:end])
+                partial = data[end:]
+                if len(sent):
+                    with self.lock:
+                        if self.first_arrival is None:
+                            self.first_arrival = now
+                        self.last_arrival = now
+                        self.samples += len(sent)
+                        self.bad += bad
+                        self.lags.append(now - sent)
+
+    @staticmethod
+    def _parse_json(data):
+        """Per-line json.loads, as the receiver does; returns (send times, bad lines)."""
+        sent, bad = [], 0
+        for line in data.splitlines():
+            try:
+                sent.append(json.loads(line)["sent"])
+            except (ValueError, KeyError, TypeError):
+                bad += 1
+        return np.array(sent, dtype=np.float64), bad
+
+    def report(self):
+        lags = np.concatenate(self.lags) if self.lags else np.zeros(0)
+        elapsed = (self.last_arrival - self.first_arrival) if self.samples else 0.0
+        print(f"📊 Sink: {self.samples} samples from {self.connections} connection(s), "
+              f"{self.samples / max(elapsed, 1e-9):.0f} samples/s while receiving, {self.bad} bad")
+        if len(lags):
+            print(f"   lag mean {1000 * lags.mean():.2f}ms | p99 {1000 * np.percentile(lags, 99):.2f}ms | "
+                  f"max {1000 * lags.max():.2f}ms")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Synthetic multi-connection EMG load generator")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Open N sender connections and stream synthetic EMG")
+    p_run.add_argument("--host", default=HOST)
+    p_run.add_argument("--port", type=int, default=PORT)
+    p_run.add_argument("--connections", "-n", type=int, default=1)
+    p_run.add_argument("--rate", type=float, default=200, help="Samples per second per connection")
+    p_run.add_argument("--format", choices=FORMATS, default="json")
+    p_run.add_argument("--seconds", type=float, default=10.0)
+    p_run.add_argument("--stall-ms", type=float, default=STALL_MS, help="Sends blocking longer than this count as stalls")
+    p_run.add_argument("--seed", type=int, default=0)
+
+    p_sink = sub.add_parser("sink", help="Receive from any number of senders and measure lag")
+    p_sink.add_argument("--host", default=HOST)
+    p_sink.add_argument("--port", type=int, default=PORT)
+    p_sink.add_argument("--format", choices=FORMATS, default="json")
+    p_sink.add_argument("--seconds", type=float, default=None, help="Stop after this long (default: Ctrl+C)")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        print_report(run_load(args.host, args.port, args.connections, args.rate, args.format,
+                              args.seconds, args.stall_ms, args.seed))
+    else:
+        sink = LoadSink(args.host, args.port, args.format)
+        try:
+            sink.serve(args.seconds)
+        except KeyboardInterrupt:
+            sink.stop_event.set()
+        sink.report()
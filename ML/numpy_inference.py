@@ -0,0 +1,272 @@
+# This file implements the torch-free (pure NumPy) forward pass of CNNmodel
+"""
+Torch-free inference for CNNmodel.
+
+Importing torch costs seconds and hundreds of MB of RSS, while the model is
+three convolutions and two linear layers. This module runs the same forward
+pass with NumPy only, from weights exported once from the trained model:
+
+    - each BatchNorm is folded into the convolution before it (eval mode: running stats)
+    - convolutions are im2col + one matrix product (BLAS), activations kept channels-last
+    - max pooling and global average pooling are reshapes + reductions
+    - dropout is the identity (eval mode)
+
+Outputs match the torch model to float32 rounding.
+
+Usage:
+    # Export (needs torch, once per trained model): writes train_single_subject_myo_model.numpy.npz
+    python numpy_inference.py export train_single_subject_myo_model.pth
+
+    # Serve without torch: inference.py loads the exported file instead of the .pth
+    EMG_INFERENCE_BACKEND=numpy python emg-to-pytorch.py
+
+Exported files also work with --model NAME=PATH.npz and inference.load_bundle under
+either backend.
+"""
+
+import os
+import json
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ===========================
+# Config
+# ===========================
+EXPORT_SUFFIX = ".numpy.npz"   # train_x.pth -> train_x.numpy.npz
+BN_EPS = 1e-5                  # nn.BatchNorm2d default (not stored in the state_dict)
+
+# (conv, batchnorm, padding (freq, time), max pool over freq after the ReLU)
+CONV_LAYERS = [("conv1", "bn1", (2, 1), 2),
+               ("conv2", "bn2", (1, 1), 2),
+               ("conv3", "bn3", (1, 1), None)]
+
+# ===========================
+# Layers
+# ===========================
+def fold_batchnorm(weight, bias, gamma, beta, running_mean, running_var, eps=BN_EPS):
+    """
+    Folds an eval-mode BatchNorm into the preceding convolution.
+
+    Returns:
+        (weight, bias) such that conv(x, weight) + bias == bn(conv(x)).
+    """
+    scale = gamma / np.sqrt(running_var + eps)
+    weight = weight * scale[:, np.newaxis, np.newaxis, np.newaxis]
+    bias = (bias - running_mean) * scale + beta
+    return weight.astype(np.float32), bias.astype(np.float32)
+
+
+def conv2d(x, weight_matrix, bias, kernel, padding):
+    """
+    Stride-1 2D convolution of channels-last input via im2col.
+
+    Args:
+        x: (N, H, W, C) input.
+        weight_matrix: (C * kh * kw, O) kernel, rows ordered (c, i, j) like
+            torch's (O, C, kh, kw) weight reshaped and transposed.
+        kernel: (kh, kw); padding: (ph, pw) zero padding.
+
+    Returns:
+        (N, H', W', O) output.
+    """
+    kh, kw = kernel
+    ph, pw = padding
+    if ph or pw:
+        x = np.pad(x, ((0, 0), (ph, ph), (pw, pw), (0, 0)))
+    # (N, H', W', C, kh, kw) view -> one row per output position
+    patches = sliding_window_view(x, (kh, kw), axis=(1, 2))
+    n, h, w = patches.shape[:3]
+    cols = patches.reshape(n * h * w, -1)
+    out = cols @ weight_matrix
+    out += bias
+    return out.reshape(n, h, w, -1)
+
+
+def max_pool_rows(x, size):
+    """MaxPool2d((size, 1)) of channels-last input (trailing rows dropped, as in torch)."""
+    n, h, w, c = x.shape
+    h_out = h // size
+    return x[:, :h_out * size].reshape(n, h_out, size, w, c).max(axis=2)
+
+# ===========================
+# Model
+# ===========================
+class NumpyCNN:
+    """
+    CNNmodel's eval-mode forward pass in NumPy.
+
+    Called like the torch model, but on NumPy arrays: (N, 8, F, T) float32
+    normalized features -> (N, num_classes) logits.
+    """
+
+    def __init__(self, params):
+        self.convs = []
+        for conv, _, padding, pool in CONV_LAYERS:
+            weight = np.asarray(params[f"{conv}.weight"], dtype=np.float32)
+            out_ch, in_ch, kh, kw = weight.shape
+            matrix = np.ascontiguousarray(weight.reshape(out_ch, in_ch * kh * kw).T)
+            self.convs.append((matrix, np.asarray(params[f"{conv}.bias"], dtype=np.float32),
+                               (kh, kw), padding, pool))
+        self.fc1_w = np.ascontiguousarray(np.asarray(params["fc1.weight"], dtype=np.float32).T)
+        self.fc1_b = np.asarray(params["fc1.bias"], dtype=np.float32)
+        self.fc2_w = np.ascontiguousarray(np.asarray(params["fc2.weight"], dtype=np.float32).T)
+        self.fc2_b = np.asarray(params["fc2.bias"], dtype=np.float32)
+        self.num_classes = len(self.fc2_b)
+
+    @classmethod
+    def from_state_dict(cls, state_dict):
+        """Builds the model from a CNNmodel state_dict of NumPy arrays (BatchNorms folded here)."""
+        params = {}
+        for conv, bn, _, _ in CONV_LAYERS:
+            params[f"{conv}.weight"], params[f"{conv}.bias"] = fold_batchnorm(
+                state_dict[f"{conv}.weight"], state_dict[f"{conv}.bias"],
+                state_dict[f"{bn}.weight"], state_dict[f"{bn}.bias"],
+                state_dict[f"{bn}.running_mean"], state_dict[f"{bn}.running_var"])
+        for name in ("fc1.weight", "fc1.bias", "fc2.weight", "fc2.bias"):
+            params[name] = state_dict[name]
+        return cls(params)
+
+    def params(self):
+        """Folded weights in torch layout ({name: array}), as stored by export_model."""
+        out = {}
+        for (conv, _, _, _), (matrix, bias, (kh, kw), _, _) in zip(CONV_LAYERS, self.convs):
+            out[f"{conv}.weight"] = matrix.T.reshape(matrix.shape[1], -1, kh, kw)
+            out[f"{conv}.bias"] = bias
+        out.update({"fc1.weight": self.fc1_w.T, "fc1.bias": self.fc1_b,
+                    "fc2.weight": self.fc2_w.T, "fc2.bias": self.fc2_b})
+        return out
+
+    def __call__(self, X):
+        # (N, C, F, T) -> channels-last (N, F, T, C), so every conv is one matrix product
+        x = np.ascontiguousarray(np.asarray(X, dtype=np.float32).transpose(0, 2, 3, 1))
+        for matrix, bias, kernel, padding, pool in self.convs:
+            x = conv2d(x, matrix, bias, kernel, padding)
+            np.maximum(x, 0, out=x)
+            if pool:
+                x = max_pool_rows(x, pool)
+        x = x.mean(axis=(1, 2))                       # AdaptiveAvgPool2d((1, 1)) + flatten
+        x = np.maximum(x @ self.fc1_w + self.fc1_b, 0)
+        return x @ self.fc2_w + self.fc2_b
+
+    def eval(self):
+        return self
+
+# ===========================
+# Export & Loading
+# ===========================
+def exported_path(model_path: str) -> str:
+    """Where export_model writes the NumPy weights of a .pth model."""
+    return os.path.splitext(model_path)[0] + EXPORT_SUFFIX
+
+
+def export_model(model_path: str, out_path: str = None, normalization_path: str = None) -> str:
+    """
+    Exports a trained model (.pth, loaded with inference.load_bundle) to a NumPy file.
+
+    The file holds the BatchNorm-folded weights, the normalization statistics and
+    the feature config; loading it needs neither torch nor the .pth. Needs torch.
+
+    Returns:
+        The path written.
+    """
+    import inference
+
+    model, mean, std, config = inference.load_bundle(model_path, normalization_path)
+    state_dict = {k: v.detach().cpu().numpy() for k, v in model.state_dict().items()}
+    arrays = NumpyCNN.from_state_dict(state_dict).params()
+    if mean is not None:
+        arrays["normalization.mean"] = mean
+        arrays["normalization.std"] = std
+    arrays["config"] = np.array(json.dumps(config or {}))
+
+    out_path = out_path or exported_path(model_path)
+    np.savez(out_path, **arrays)
+    print(f"💾 Export: Wrote NumPy weights of '{model_path}' to '{out_path}'.")
+    return out_path
+
+
+def load_numpy_bundle(path: str) -> tuple:
+    """
+    Loads an exported model; same return value as inference.load_bundle.
+
+    Returns:
+        (NumpyCNN, mean, std, config); mean/std are None if the model had no
+        normalization, config is None if it had no feature config.
+    """
+    try:
+        with np.load(path) as npz:
+            arrays = {k: npz[k] for k in npz.files}
+        model = NumpyCNN(arrays)
+        config = json.loads(str(arrays["config"])) or None
+        mean, std = arrays.get("normalization.mean"), arrays.get("normalization.std")
+        print(f"🧠 Model: Loaded NumPy weights from '{path}'.")
+    except Exception as e:
+        print(f"❌ Model: Failed to load NumPy weights from {path}. Error: {e}")
+        raise
+    if mean is None:
+        print("⚠️ Model: No normalization parameters found with the model. Retrain with train_200.py to save them.")
+    return model, mean, std, config
+
+# ===========================
+# Parity Check
+# ===========================
+def compare_backends(model_path: str, exported: str, normalization_path: str = None, n: int = 256) -> dict:
+    """
+    Runs the torch model and its export on the same probe windows (needs torch).
+
+    Returns:
+        {max_abs_diff, agreement, torch_ms, numpy_ms} (per-window forward times, batch of 1).
+    """
+    import time
+    import torch
+    import inference
+    from hot_reload import probe_windows
+
+    model, mean, std, config = inference.load_bundle(model_path, normalization_path)
+    np_model, np_mean, np_std, _ = load_numpy_bundle(exported)
+    cfg = inference.feature_settings(config)
+    X = np.log1p(inference.preprocess_windows(probe_windows(cfg["window_size"], n),
+                                              cfg["fs"], cfg["nperseg"], cfg["noverlap"]))
+    X = ((X - (mean if mean is not None else 0)) / (std if std is not None else 1)).astype(np.float32)
+
+    with torch.no_grad():
+        reference = model(torch.from_numpy(X).to(inference.DEVICE)).cpu().numpy()
+    logits = np_model(X)
+
+    def per_window_ms(forward):
+        start = time.perf_counter()
+        for i in range(len(X)):
+            forward(X[i:i + 1])
+        return (time.perf_counter() - start) * 1000 / len(X)
+
+    with torch.no_grad():
+        torch_ms = per_window_ms(lambda x: model(torch.from_numpy(x).to(inference.DEVICE)))
+    numpy_ms = per_window_ms(np_model)
+
+    return {"max_abs_diff": float(np.abs(logits - reference).max()),
+            "agreement": float(np.mean(logits.argmax(1) == reference.argmax(1))),
+            "torch_ms": round(torch_ms, 4), "numpy_ms": round(numpy_ms, 4)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Torch-free CNNmodel weights")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Export a .pth model to NumPy weights and check parity")
+    p_export.add_argument("model", help="Trained model (.pth)")
+    p_export.add_argument("-o", "--out", default=None, help=f"Output file (default: <model>{EXPORT_SUFFIX})")
+    p_export.add_argument("--normalization", default=None,
+                          help="Normalization .npz for weights-only checkpoints")
+    p_export.add_argument("--no-check", action="store_true", help="Skip the torch vs. NumPy comparison")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        out = export_model(args.model, args.out, args.normalization)
+        if not args.no_check:
+            result = compare_backends(args.model, out, args.normalization)
+            print(f"🔍 Parity: max |logit diff| {result['max_abs_diff']:.2e}, "
+                  f"prediction agreement {result['agreement']:.1%}")
+            print(f"⏱️ Forward (1 window): torch {result['torch_ms']:.3f} ms, numpy {result['numpy_ms']:.3f} ms")
@@ -0,0 +1,196 @@
+# This file implements the opt-in profiling hooks for the realtime receiver
+"""
+Profiling hooks for the realtime EMG receiver (emg-to-pytorch.py).
+
+Two profilers, both limited to the threads they are asked to watch:
+
+    SamplingProfiler      - samples the watched threads' Python stacks at a fixed
+                            rate from a background thread; low overhead, safe to
+                            leave on in the field. Dumps folded stacks
+                            ("thread;module:function;... count"), the input format
+                            of flamegraph.pl, speedscope and inferno.
+    DeterministicProfiler - cProfile per watched thread; exact call counts, higher
+                            overhead. Dumps one .pstats file per thread (snakeviz,
+                            flameprof, gprof2dot).
+
+Per-stage timings inside inference.run_inference are collected by
+inference.STAGE_TIMER and written next to the profile as stages.json.
+
+Usage (from emg-to-pytorch.py):
+    python emg-to-pytorch.py --profile [--profile-mode sampling|deterministic] [--profile-out profiles]
+    EMG_PROFILE=1 python emg-to-pytorch.py
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+import collections
+
+# ===========================
+# Config
+# ===========================
+PROFILE_ENV = "EMG_PROFILE"            # "1"/"sampling" or "deterministic" enables profiling
+PROFILE_DIR_ENV = "EMG_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "profiles"
+SAMPLE_INTERVAL = 0.005                # Seconds between stack samples (200 Hz)
+
+def profile_mode_from_env():
+    """Profiling mode requested through EMG_PROFILE, or None."""
+    value = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    return "deterministic" if value == "deterministic" else "sampling"
+
+# ===========================
+# Sampling Profiler
+# ===========================
+def _frame_label(frame):
+    code = frame.f_code
+    parent, filename = os.path.split(code.co_filename)
+    module = os.path.splitext(filename)[0]
+    if module in ("module", "functional", "__init__"):
+        module = f"{os.path.basename(parent)}/{module}"  # e.g. torch's modules/module
+    return f"{module}:{code.co_name}"
+
+class SamplingProfiler:
+    """Periodically samples the stacks of registered threads into folded-stack counts."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._threads = {}             # thread ident -> name
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def wrap(self, target, name):
+        """Returns a thread target that registers itself with the profiler while it runs."""
+        def run(*args, **kwargs):
+            ident = threading.get_ident()
+            with self._lock:
+                self._threads[ident] = name
+            try:
+                return target(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._threads.pop(ident, None)
+        return run
+
+    def start(self):
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                watched = list(self._threads.items())
+            for ident, name in watched:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.counts[";".join([name] + stack[::-1])] += 1
+            self.samples += 1
+
+    def dump(self, out_dir):
+        """Writes folded stacks to <out_dir>/profile.folded; returns the path."""
+        path = os.path.join(out_dir, "profile.folded")
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+# ===========================
+# Deterministic Profiler
+# ===========================
+class DeterministicProfiler:
+    """cProfile per registered thread (cProfile only sees the thread that enabled it)."""
+
+    def __init__(self):
+        self.profiles = {}
+
+    def wrap(self, target, name):
+        def run(*args, **kwargs):
+            profile = cProfile.Profile()
+            self.profiles[name] = profile
+            profile.enable()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                profile.disable()
+        return run
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def dump(self, out_dir):
+        """Writes <out_dir>/<thread>.pstats per thread; returns the directory."""
+        for name, profile in self.profiles.items():
+            profile.dump_stats(os.path.join(out_dir, f"{name}.pstats"))
+        return out_dir
+
+# ===========================
+# Session
+# ===========================
+class ProfilingSession:
+    """
+    Ties a thread profiler and inference's stage timers together for one run.
+
+    Usage:
+        session = ProfilingSession("sampling", "profiles")
+        thread = threading.Thread(target=session.wrap(data_listener_thread, "listener"))
+        session.start(); ...; session.dump()
+    """
+
+    def __init__(self, mode="sampling", out_dir=None):
+        self.mode = mode
+        self.out_dir = out_dir or os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR)
+        self.profiler = DeterministicProfiler() if mode == "deterministic" else SamplingProfiler()
+        self.started = None
+
+    def wrap(self, target, name):
+        return self.profiler.wrap(target, name)
+
+    def start(self):
+        import inference
+        inference.STAGE_TIMER.enable()
+        self.started = time.perf_counter()
+        self.profiler.start()
+        print(f"⏱️ Profiler: {self.mode} profiling enabled; output goes to '{self.out_dir}' on shutdown.")
+
+    def dump(self):
+        """Stops profiling and writes the thread profile and stages.json; prints the stage summary."""
+        import inference
+
+        self.profiler.stop()
+        os.makedirs(self.out_dir, exist_ok=True)
+        profile_path = self.profiler.dump(self.out_dir)
+
+        stages = inference.STAGE_TIMER.summary()
+        stages_path = os.path.join(self.out_dir, "stages.json")
+        with open(stages_path, "w") as f:
+            json.dump({"mode": self.mode,
+                       "duration_s": round(time.perf_counter() - self.started, 3),
+                       "stages": stages}, f, indent=2)
+
+        print(f"\n⏱️ Profiler: Stage timings ({stages_path}):")
+        for name, s in stages.items():
+            print(f"   {name:<15s} n={s['count']:6d} | mean {s['mean_ms']:7.3f}ms | "
+                  f"p95 {s['p95_ms']:7.3f}ms | total {s['total_s']:7.2f}s")
+        print(f"⏱️ Profiler: Thread profile written to '{profile_path}'")
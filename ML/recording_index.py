@@ -0,0 +1,264 @@
+# This file implements a sidecar time index for recorded EMG sessions (CSV)
+"""
+Sidecar time index for EMG recordings.
+
+A recording like raymond_arm_down_200hz.csv has ~63k rows; reaching minute 8 of a
+session used to mean parsing every row before it. The index stores the byte offset
+and timestamp of every INDEX_STRIDE-th row in '<recording>.idx.npz', so seeking is a
+binary search over the index plus a parse of at most INDEX_STRIDE rows.
+
+Usage:
+    python recording_index.py build ../myo/samples/*.csv
+    python recording_index.py slice ../myo/samples/raymond_arm_down_200hz.csv --start 480 --end 490 -o clip.csv
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# ===========================
+# Config
+# ===========================
+INDEX_STRIDE = 256             # Rows between index entries
+INDEX_SUFFIX = ".idx.npz"      # Sidecar file suffix
+INDEX_VERSION = 1
+
+# Both recording layouts found in myo/samples
+#   new: timestamp (s), sample_number, emg1..emg8
+#   old: Timestamp_ms, Channel_0..Channel_7
+TIME_COLUMNS = {"timestamp": 1.0, "Timestamp_ms": 1e-3}
+
+
+def emg_columns(columns):
+    """Returns the 8 EMG column names for either recording layout."""
+    columns = list(columns)
+    if "emg1" in columns:
+        return [f"emg{i}" for i in range(1, 9)]
+    return [f"Channel_{i}" for i in range(8)]
+
+
+def time_column(columns):
+    """Returns (column name, scale to seconds) of the timestamp column."""
+    for name, scale in TIME_COLUMNS.items():
+        if name in columns:
+            return name, scale
+    raise ValueError(f"No timestamp column in {list(columns)}")
+
+
+def index_path(csv_path):
+    return csv_path + INDEX_SUFFIX
+
+
+# ===========================
+# Index Building
+# ===========================
+def _scan(f, offset, row, stride, offsets, times, scale):
+    """Scans complete lines from `offset`, recording every `stride`-th row. Returns (offset, row)."""
+    f.seek(offset)
+    for line in f:
+        if not line.endswith(b"\n"):
+            break  # partial trailing line of a recording in progress
+        if row % stride == 0:
+            offsets.append(offset)
+            times.append(float(line.split(b",", 1)[0]) * scale)
+        offset += len(line)
+        row += 1
+    return offset, row
+
+
+def build_index(csv_path, stride=INDEX_STRIDE, previous=None):
+    """
+    Scans a recording once and writes its sidecar index.
+
+    Args:
+        csv_path: Path to the recording.
+        stride: Number of rows between index entries.
+        previous: An existing index dict for the same file; if the file has only
+                  grown since, scanning resumes where it stopped.
+
+    Returns:
+        The index as a dict of NumPy arrays/scalars (the contents of the .npz).
+    """
+    with open(csv_path, "rb") as f:
+        header = f.readline().decode("utf-8").strip().split(",")
+        _, scale = time_column(header)
+
+        if previous is not None and int(previous["stride"]) == stride:
+            offsets = list(previous["offsets"])
+            times = list(previous["times"])
+            offset, row = int(previous["data_end"]), int(previous["n_rows"])
+        else:
+            offsets, times = [], []
+            offset, row = f.tell(), 0
+
+        data_end, n_rows = _scan(f, offset, row, stride, offsets, times, scale)
+
+    stat = os.stat(csv_path)
+    index = {
+        "version": np.int64(INDEX_VERSION),
+        "stride": np.int64(stride),
+        "header": np.array(header),
+        "time_scale": np.float64(scale),
+        "offsets": np.array(offsets, dtype=np.int64),
+        "times": np.array(times, dtype=np.float64),
+        "n_rows": np.int64(n_rows),
+        "data_end": np.int64(data_end),
+        "file_size": np.int64(stat.st_size),
+        "mtime_ns": np.int64(stat.st_mtime_ns),
+    }
+    # np.savez appends '.npz' unless the name already ends with it
+    np.savez(index_path(csv_path), **index)
+    return index
+
+
+def load_index(csv_path, stride=INDEX_STRIDE):
+    """
+    Opens a recording through its sidecar index, (re)building it if missing or stale.
+
+    A recording that was appended to since the index was built is extended
+    incrementally instead of re-scanned.
+    """
+    path = index_path(csv_path)
+    index = None
+    if os.path.exists(path):
+        with np.load(path) as npz:
+            index = {k: npz[k] for k in npz.files}
+        stat = os.stat(csv_path)
+        if int(index["version"]) != INDEX_VERSION or stat.st_size < int(index["file_size"]):
+            index = build_index(csv_path, stride)
+        elif stat.st_size > int(index["file_size"]):
+            index = build_index(csv_path, stride, previous=index)
+        elif stat.st_mtime_ns != int(index["mtime_ns"]):
+            index = build_index(csv_path, stride)
+    else:
+        index = build_index(csv_path, stride)
+    return RecordingIndex(csv_path, index)
+
+
+# ===========================
+# Seeking & Reading
+# ===========================
+class RecordingIndex:
+    """Timestamp -> row lookups and ranged reads on an indexed recording."""
+
+    def __init__(self, csv_path, index):
+        self.csv_path = csv_path
+        self.stride = int(index["stride"])
+        self.columns = [str(c) for c in index["header"]]
+        self.time_col, self.time_scale = time_column(self.columns)
+        self.emg_cols = emg_columns(self.columns)
+        self.offsets = index["offsets"]
+        self.times = index["times"]
+        self.n_rows = int(index["n_rows"])
+        self.data_end = int(index["data_end"])
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def start_time(self):
+        return float(self.times[0]) if len(self.times) else 0.0
+
+    def _block_end(self, block):
+        return int(self.offsets[block + 1]) if block + 1 < len(self.offsets) else self.data_end
+
+    def _read_bytes(self, start, end):
+        with open(self.csv_path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def _parse(self, raw):
+        if not raw:
+            return pd.DataFrame(columns=self.columns)
+        return pd.read_csv(io.BytesIO(raw), header=None, names=self.columns)
+
+    def seek(self, t):
+        """Returns the first row whose timestamp (seconds) is >= t."""
+        if self.n_rows == 0:
+            return 0
+        block = max(int(np.searchsorted(self.times, t, side="right")) - 1, 0)
+        raw = self._read_bytes(int(self.offsets[block]), self._block_end(block))
+        block_times = self._parse(raw)[self.time_col].to_numpy(dtype=np.float64) * self.time_scale
+        return block * self.stride + int(np.searchsorted(block_times, t, side="left"))
+
+    def read_rows(self, start_row, n_rows):
+        """Reads rows [start_row, start_row + n_rows) as a DataFrame with the file's columns."""
+        start_row = max(start_row, 0)
+        stop_row = min(start_row + n_rows, self.n_rows)
+        if stop_row <= start_row:
+            return pd.DataFrame(columns=self.columns)
+
+        first_block = start_row // self.stride
+        last_block = (stop_row - 1) // self.stride
+        raw = self._read_bytes(int(self.offsets[first_block]), self._block_end(last_block))
+        df = self._parse(raw)
+        skip = start_row - first_block * self.stride
+        return df.iloc[skip:skip + (stop_row - start_row)].reset_index(drop=True)
+
+    def read_range(self, t0, t1):
+        """Reads all rows with t0 <= timestamp < t1 (seconds)."""
+        start = self.seek(t0)
+        stop = self.seek(t1)
+        return self.read_rows(start, stop - start)
+
+    def iter_windows(self, window_size, stride, t0=None, t1=None, chunk_windows=64):
+        """
+        Yields (timestamps, emg) windows of `window_size` rows every `stride` rows.
+
+        Rows are read in chunks of `chunk_windows` windows, so memory stays bounded
+        regardless of the recording length.
+
+        Returns:
+            timestamps: (window_size,) float64 seconds
+            emg: (window_size, 8) float64
+        """
+        start = self.seek(t0) if t0 is not None else 0
+        stop = self.seek(t1) if t1 is not None else self.n_rows
+
+        while start + window_size <= stop:
+            n_windows = min(chunk_windows, (stop - start - window_size) // stride + 1)
+            span = (n_windows - 1) * stride + window_size
+            df = self.read_rows(start, span)
+            ts = df[self.time_col].to_numpy(dtype=np.float64) * self.time_scale
+            emg = df[self.emg_cols].to_numpy(dtype=np.float64)
+            for w in range(n_windows):
+                s = w * stride
+                yield ts[s:s + window_size], emg[s:s + window_size]
+            start += n_windows * stride
+
+
+# ===========================
+# Main
+# ===========================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build time indexes and extract time ranges from EMG recordings")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="Build or refresh sidecar indexes")
+    p_build.add_argument("files", nargs="+")
+    p_build.add_argument("--stride", type=int, default=INDEX_STRIDE)
+
+    p_slice = sub.add_parser("slice", help="Extract a time range (seconds) to CSV")
+    p_slice.add_argument("file")
+    p_slice.add_argument("--start", type=float, required=True)
+    p_slice.add_argument("--end", type=float, required=True)
+    p_slice.add_argument("-o", "--output", default=None, help="Output CSV (default: stdout)")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for path in args.files:
+            index = build_index(path, args.stride)
+            print(f"{path}: {int(index['n_rows'])} rows, {len(index['offsets'])} index entries")
+    else:
+        rec = load_index(args.file)
+        df = rec.read_range(args.start, args.end)
+        if args.output:
+            df.to_csv(args.output, index=False)
+            print(f"Wrote {len(df)} rows to {args.output}")
+        else:
+            print(df.to_csv(index=False), end="")
@@ -0,0 +1,186 @@
+# This file implements offline bulk scoring of recorded sessions with the trained model
+"""
+Offline bulk scoring of recorded EMG sessions.
+
+Slides the inference window over each recording with a configurable hop and
+scores all windows with inference.run_inference_batch (vectorized preprocessing,
+one forward pass per batch). Recordings are spread over worker processes.
+
+Outputs, per recording, '<name>.scores.csv' with one row per window
+(start row, start/end timestamp, prediction, class probabilities), and a
+'summary.csv' with per-file accuracy against the recording's label.
+Recordings whose measured sample rate is not the model's fs (e.g.
+train_200.LOW_RATE_FILES) are not scored; their summary row says why.
+
+Usage:
+    python score_recordings.py ../myo/samples/raymond_*.csv --model train_single_subject_myo_model_swing.pth
+    python score_recordings.py --all --hop 25 --workers 4 --out scores
+"""
+
+import os
+import csv
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from recording_index import emg_columns, time_column
+
+# ===========================
+# Config
+# ===========================
+DEFAULT_MODEL = "train_single_subject_myo_model.pth"
+DEFAULT_HOP = 50               # Samples between window starts (train_200.STRIDE)
+SCORE_BATCH = 1024             # Windows per vectorized batch
+SUMMARY_FILE = "summary.csv"
+
+# ===========================
+# Labels
+# ===========================
+def recording_label(path, class_names):
+    """Label of a recording: from train_200's file lists, else from a class name in the file name."""
+    import train_200 as tr
+
+    name = os.path.basename(path)
+    for known, label in tr.ALL_SUBJECT_FILES:
+        if os.path.basename(known) == name:
+            return label
+    for label, class_name in enumerate(class_names):
+        if class_name in name:
+            return label
+    return None
+
+# ===========================
+# Worker Side
+# ===========================
+_LOADED = None
+
+def _load(model_path):
+    global _LOADED
+    import inference
+    if _LOADED != model_path:
+        inference.reset_model()
+        inference.load_model_and_params(model_path)
+        _LOADED = model_path
+    return inference
+
+def score_file(path, model_path, out_dir, hop=DEFAULT_HOP, batch_size=SCORE_BATCH):
+    """Scores every window of one recording; returns its summary row."""
+    inference = _load(model_path)
+    cfg = inference._CONFIG or {}
+    window_size = cfg.get("window_size", inference.WINDOW_SIZE)
+    class_names = cfg.get("class_names", inference.CLASS_NAMES)
+
+    import train_200 as tr
+
+    start = time.perf_counter()
+    df = pd.read_csv(path)
+    label = recording_label(path, class_names)
+    fs = cfg.get("fs", inference.FS)
+    rate = tr.rate_mismatch(df, fs)
+    if rate is not None:
+        # The model's filters and STFT assume fs: the scores would be meaningless
+        return {"file": path, "label": class_names[label] if label is not None else "",
+                "windows": 0, "accuracy": "", "windows_per_s": "", "scores": "",
+                "skipped": f"measured {rate:.1f} Hz, model expects {fs} Hz"}
+    time_col, scale = time_column(df.columns)
+    timestamps = df[time_col].to_numpy(dtype=np.float64) * scale
+    data = df[emg_columns(df.columns)].to_numpy(dtype=np.float32)
+
+    if len(data) >= window_size:
+        # (N, window_size, 8) strided view: windows are copied one batch at a time
+        windows = sliding_window_view(data, window_size, axis=0)[::hop].transpose(0, 2, 1)
+    else:
+        windows = np.zeros((0, window_size, 8), dtype=np.float32)
+    preds, probs = inference.run_inference_batch(windows, batch_size)
+    elapsed = time.perf_counter() - start
+
+    starts = np.arange(len(preds)) * hop
+    scores_path = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".scores.csv")
+    scores = pd.DataFrame({
+        "start_row": starts,
+        "t_start": timestamps[starts] if len(starts) else [],
+        "t_end": timestamps[starts + window_size - 1] if len(starts) else [],
+        "prediction": np.asarray(class_names)[preds] if len(preds) else [],
+    })
+    for i, class_name in enumerate(class_names):
+        scores[f"p_{class_name}"] = probs[:, i]
+    scores.to_csv(scores_path, index=False, float_format="%.6f")
+
+    accuracy = float((preds == label).mean()) if label is not None and len(preds) else None
+    return {"file": path,
+            "label": class_names[label] if label is not None else "",
+            "windows": len(preds),
+            "accuracy": round(accuracy, 4) if accuracy is not None else "",
+            "windows_per_s": round(len(preds) / elapsed, 1) if elapsed > 0 else "",
+            "scores": scores_path,
+            "skipped": ""}
+
+# ===========================
+# Driver
+# ===========================
+def score_recordings(files, model_path, out_dir, hop=DEFAULT_HOP, workers=None, threads=1,
+                     batch_size=SCORE_BATCH):
+    """Scores recordings in parallel worker processes and writes <out_dir>/summary.csv."""
+    from sweep import worker_pool
+
+    workers = workers or max(1, min(len(files), (os.cpu_count() or 1) // threads))
+    os.makedirs(out_dir, exist_ok=True)
+
+    rows = []
+    with worker_pool(workers, threads) as pool:
+        futures = {pool.submit(score_file, path, model_path, out_dir, hop, batch_size): path for path in files}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f"❌ {futures[future]}: {e}")
+                continue
+            rows.append(row)
+            if row["skipped"]:
+                print(f"⚠️ {os.path.basename(row['file']):<40s} | skipped: {row['skipped']}")
+                continue
+            acc = f"{row['accuracy']:.4f}" if row["accuracy"] != "" else "   n/a"
+            print(f"{os.path.basename(row['file']):<40s} | {row['windows']:6d} windows | "
+                  f"Acc: {acc} | {row['windows_per_s']} windows/s")
+
+    rows.sort(key=lambda r: r["file"])
+    with open(os.path.join(out_dir, SUMMARY_FILE), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["file", "label", "windows", "accuracy", "windows_per_s", "scores",
+                                               "skipped"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+# ===========================
+# Main
+# ===========================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score recorded EMG sessions with the trained model")
+    parser.add_argument("files", nargs="*", help="Recordings (CSV) to score")
+    parser.add_argument("--all", action="store_true", help="Score every recording in train_200.ALL_SUBJECT_FILES")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model bundle (.pth)")
+    parser.add_argument("--hop", type=int, default=DEFAULT_HOP, help="Samples between window starts")
+    parser.add_argument("--batch-size", type=int, default=SCORE_BATCH, help="Windows per vectorized batch")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--threads", type=int, default=1, help="Torch/BLAS threads per worker")
+    parser.add_argument("--out", default="scores", help="Output directory")
+    args = parser.parse_args()
+
+    files = list(args.files)
+    if args.all:
+        import train_200 as tr
+        files += [path for path, _ in tr.ALL_SUBJECT_FILES]
+    if not files:
+        parser.error("no recordings given (pass files or --all)")
+
+    start = time.perf_counter()
+    rows = score_recordings(files, args.model, args.out, args.hop, args.workers, args.threads, args.batch_size)
+    total = sum(r["windows"] for r in rows)
+    skipped = sum(1 for r in rows if r["skipped"])
+    print(f"\nScored {total} windows from {len(rows) - skipped} recording(s) ({skipped} skipped) "
+          f"in {time.perf_counter() - start:.1f}s. Summary: '{os.path.join(args.out, SUMMARY_FILE)}'")
@@ -0,0 +1,139 @@
+# This file implements the bounded queues between the realtime pipeline stages
+"""
+Bounded queues with explicit overload policies for the realtime EMG pipeline.
+
+emg-to-pytorch.py connects its stages (ingest -> preprocess -> infer -> publish)
+with BoundedQueue instances. When a consumer cannot keep up, each queue degrades
+according to its policy and counts what happened:
+
+    block        - put() waits for space (backpressure; for ingest this reaches
+                   the sender through TCP flow control)
+    drop_oldest  - the oldest queued item is discarded to make room
+    keep_latest  - every put() replaces whatever is still queued (conflation):
+                   the consumer always gets the newest item
+
+Counters per queue: items put / got, items dropped, time producers spent
+blocked, and how long items waited in the queue before being consumed.
+"""
+
+import time
+import threading
+import collections
+
+# ===========================
+# Config
+# ===========================
+POLICIES = ("block", "drop_oldest", "keep_latest")
+
+def parse_queue_spec(spec):
+    """'name=policy[:maxsize]' -> (name, policy, maxsize or None)."""
+    name, _, rest = spec.partition("=")
+    policy, _, size = rest.partition(":")
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown queue policy '{policy}' (choose from {', '.join(POLICIES)})")
+    return name, policy, int(size) if size else None
+
+# ===========================
+# Queue
+# ===========================
+class QueueClosed(Exception):
+    """Raised by put()/get() once the queue is closed (and, for get, drained)."""
+
+
+class BoundedQueue:
+    """Thread-safe bounded FIFO with a fixed overload policy and counters."""
+
+    def __init__(self, name, maxsize, policy="drop_oldest"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}'")
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+
+        self._items = collections.deque()          # (put time, item)
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.put_count = 0
+        self.get_count = 0
+        self.dropped = 0
+        self.blocked_s = 0.0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.high_watermark = 0
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item, timeout=None):
+        """
+        Enqueues an item according to the policy.
+
+        Returns:
+            False if a blocking put timed out, True otherwise (even if older items were dropped).
+        """
+        with self._cond:
+            if self._closed:
+                raise QueueClosed(self.name)
+
+            if self.policy == "keep_latest":
+                self.dropped += len(self._items)
+                self._items.clear()
+            elif self.policy == "drop_oldest":
+                while len(self._items) >= self.maxsize:
+                    self._items.popleft()
+                    self.dropped += 1
+            elif len(self._items) >= self.maxsize:
+                start = time.perf_counter()
+                full = not self._cond.wait_for(lambda: len(self._items) < self.maxsize or self._closed, timeout)
+                self.blocked_s += time.perf_counter() - start
+                if self._closed:
+                    raise QueueClosed(self.name)
+                if full:
+                    return False
+
+            self._items.append((time.perf_counter(), item))
+            self.put_count += 1
+            self.high_watermark = max(self.high_watermark, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Dequeues the oldest item.
+
+        Returns:
+            The item, or None on timeout. Raises QueueClosed once closed and empty.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                raise QueueClosed(self.name)
+            put_time, item = self._items.popleft()
+            wait = time.perf_counter() - put_time
+            self.get_count += 1
+            self.wait_total_s += wait
+            self.wait_max_s = max(self.wait_max_s, wait)
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Wakes up all producers and consumers; queued items can still be drained."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"policy": self.policy,
+                    "maxsize": self.maxsize,
+                    "depth": len(self._items),
+                    "high_watermark": self.high_watermark,
+                    "put": self.put_count,
+                    "got": self.get_count,
+                    "dropped": self.dropped,
+                    "blocked_s": round(self.blocked_s, 4),
+                    "mean_wait_ms": round(1000 * self.wait_total_s / max(self.get_count, 1), 3),
+                    "max_wait_ms": round(1000 * self.wait_max_s, 3)}
@@ -0,0 +1,266 @@
+# This file implements the local fan-out broker for the live EMG stream
+"""
+Local fan-out broker for the live EMG stream.
+
+The C++ sender (emg-to-pytorch.exe) connects to one TCP port and only one
+program can accept it. The broker takes that connection once and republishes
+the stream, byte for byte, to any number of local subscribers:
+
+    emg-to-pytorch.exe --> broker :9002 --> :9003 --> emg-to-pytorch.py --subscribe
+                                                  --> emg_visualizer.py --subscribe
+                                                  --> recorders, ...
+
+Subscribers connect to the publish port and receive the unchanged wire format
+({"timestamp":...,"sample":...,"emg":[...]}\\n lines), always starting at a line
+boundary. The broker never parses the stream: every received chunk of complete
+lines becomes one bytes object that all subscriber send queues share.
+
+A subscriber that stops reading never slows down the sender or the other
+subscribers: once its unsent backlog exceeds max_pending bytes, its oldest
+chunks are dropped (and counted).
+
+Usage:
+    python stream_broker.py                       # sender on :9002, subscribers on :9003
+    python stream_broker.py --publish-port 9100 --max-pending 65536
+"""
+
+import time
+import socket
+import selectors
+import collections
+
+# ===========================
+# Config
+# ===========================
+HOST = '127.0.0.1'
+UPSTREAM_PORT = 9002           # Where the C++ sender connects (same as the receiver's PORT)
+PUBLISH_PORT = 9003            # Where subscribers connect
+MAX_PENDING = 256 * 1024       # Unsent bytes per subscriber before its oldest chunks are dropped (~20 s at 200 Hz)
+RECV_SIZE = 64 * 1024
+
+# ===========================
+# Connections
+# ===========================
+class _Upstream:
+    """A sender connection; keeps the partial line at the end of the last read."""
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.partial = b''
+
+
+class _Subscriber:
+    """A subscriber connection with its queue of shared chunks still to send."""
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.chunks = collections.deque()
+        self.offset = 0                # Bytes of chunks[0] already sent
+        self.pending = 0               # Unsent bytes
+        self.sent_bytes = 0
+        self.dropped_lines = 0
+
+    def enqueue(self, chunk, max_pending):
+        self.chunks.append(chunk)
+        self.pending += len(chunk)
+        # Drop the oldest whole chunks, but never the one that is partly sent (that would
+        # split a line) nor the newest one
+        index = 1 if self.offset else 0
+        while self.pending > max_pending and index < len(self.chunks) - 1:
+            dropped = self.chunks[index]
+            del self.chunks[index]
+            self.pending -= len(dropped)
+            self.dropped_lines += dropped.count(b'\n')
+
+    def flush(self):
+        """Sends as much as the socket takes without blocking; raises OSError if the subscriber is gone."""
+        while self.chunks:
+            chunk = self.chunks[0]
+            try:
+                n = self.sock.send(memoryview(chunk)[self.offset:])
+            except (BlockingIOError, InterruptedError):
+                return
+            self.offset += n
+            self.pending -= n
+            self.sent_bytes += n
+            if self.offset < len(chunk):
+                return
+            self.chunks.popleft()
+            self.offset = 0
+
+# ===========================
+# Broker
+# ===========================
+class StreamBroker:
+    """
+    Single-threaded, non-blocking fan-out from sender connection(s) to subscribers.
+
+    Several senders (e.g. one per armband) may be connected at once; their lines
+    are interleaved, never split.
+    """
+
+    def __init__(self, host=HOST, upstream_port=UPSTREAM_PORT, publish_port=PUBLISH_PORT,
+                 max_pending=MAX_PENDING):
+        self.host = host
+        self.upstream_port = upstream_port
+        self.publish_port = publish_port
+        self.max_pending = max_pending
+
+        self.selector = selectors.DefaultSelector()
+        self.upstreams = []
+        self.subscribers = []
+
+        self.received_bytes = 0
+        self.received_lines = 0
+        self.dropped_lines = 0          # Of subscribers that have disconnected since
+        self.subscribers_served = 0
+
+    def _listen(self, port, role):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, port))
+        server.listen(16)
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ, (role, None))
+        return server
+
+    def serve(self, stop_event=None, poll_interval=0.2):
+        """Runs until stop_event is set (or forever); the caller handles KeyboardInterrupt."""
+        servers = [self._listen(self.upstream_port, 'accept_upstream'),
+                   self._listen(self.publish_port, 'accept_subscriber')]
+        print(f"📡 Broker: Sender port {self.host}:{self.upstream_port}, "
+              f"subscriber port {self.host}:{self.publish_port}")
+        try:
+            while stop_event is None or not stop_event.is_set():
+                for key, mask in self.selector.select(poll_interval):
+                    role, conn = key.data
+                    if role == 'accept_upstream':
+                        self._accept(key.fileobj, _Upstream)
+                    elif role == 'accept_subscriber':
+                        self._accept(key.fileobj, _Subscriber)
+                    elif role == 'upstream':
+                        self._read_upstream(conn)
+                    elif mask & selectors.EVENT_READ:
+                        self._check_subscriber(conn)
+                    else:
+                        self._flush(conn)
+        finally:
+            for conn in self.upstreams + self.subscribers:
+                self._close(conn)
+            for server in servers:
+                self.selector.unregister(server)
+                server.close()
+            self.selector.close()
+
+    def _accept(self, server, kind):
+        try:
+            sock, addr = server.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        conn = kind(sock, addr)
+        if kind is _Upstream:
+            self.upstreams.append(conn)
+            self.selector.register(sock, selectors.EVENT_READ, ('upstream', conn))
+            print(f"✅ Broker: Sender connected from {addr}")
+        else:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.subscribers.append(conn)
+            self.subscribers_served += 1
+            self.selector.register(sock, selectors.EVENT_READ, ('subscriber', conn))
+            print(f"✅ Broker: Subscriber connected from {addr} ({len(self.subscribers)} active)")
+
+    def _read_upstream(self, conn):
+        try:
+            data = conn.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            print(f"⚠️ Broker: Sender {conn.addr} disconnected.")
+            self._close(conn)
+            return
+
+        data = conn.partial + data
+        end = data.rfind(b'\n') + 1
+        conn.partial = data[end:]
+        if end:
+            self.publish(data[:end])
+
+    def publish(self, chunk):
+        """Queues a chunk of complete lines for every subscriber and sends what fits right away."""
+        self.received_bytes += len(chunk)
+        self.received_lines += chunk.count(b'\n')
+        for conn in list(self.subscribers):
+            conn.enqueue(chunk, self.max_pending)
+            self._flush(conn)
+
+    def _flush(self, conn):
+        try:
+            conn.flush()
+        except OSError:
+            print(f"⚠️ Broker: Subscriber {conn.addr} disconnected.")
+            self._close(conn)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if conn.chunks else 0)
+        self.selector.modify(conn.sock, events, ('subscriber', conn))
+
+    def _check_subscriber(self, conn):
+        """Subscribers send nothing; readable means closed (anything else is discarded)."""
+        try:
+            data = conn.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            print(f"⚠️ Broker: Subscriber {conn.addr} disconnected.")
+            self._close(conn)
+
+    def _close(self, conn):
+        try:
+            self.selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        conn.sock.close()
+        if conn in self.upstreams:
+            self.upstreams.remove(conn)
+        if conn in self.subscribers:
+            self.subscribers.remove(conn)
+            self.dropped_lines += conn.dropped_lines
+
+    def stats(self):
+        return {"received_lines": self.received_lines,
+                "received_bytes": self.received_bytes,
+                "senders": len(self.upstreams),
+                "subscribers": len(self.subscribers),
+                "subscribers_served": self.subscribers_served,
+                "dropped_lines": self.dropped_lines + sum(c.dropped_lines for c in self.subscribers),
+                "pending_bytes": {f"{c.addr[0]}:{c.addr[1]}": c.pending for c in self.subscribers}}
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fan out the live EMG stream to local subscribers")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=UPSTREAM_PORT, help="Port the C++ sender connects to")
+    parser.add_argument("--publish-port", type=int, default=PUBLISH_PORT, help="Port subscribers connect to")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="Unsent bytes per subscriber before its oldest data is dropped")
+    args = parser.parse_args()
+
+    broker = StreamBroker(args.host, args.port, args.publish_port, args.max_pending)
+    start = time.time()
+    try:
+        broker.serve()
+    except KeyboardInterrupt:
+        print("\n🛑 Broker: Stopped.")
+    except OSError as e:
+        print(f"❌ Broker: Socket error: {e}")
+    elapsed = time.time() - start
+    st = broker.stats()
+    print(f"📊 Broker: {st['received_lines']} lines ({st['received_lines'] / max(elapsed, 1e-9):.0f}/s), "
+          f"{st['subscribers_served']} subscriber(s) served, {st['dropped_lines']} lines dropped for slow subscribers")
@@ -0,0 +1,486 @@
+# This file implements the direct stream-to-disk recorder for the live EMG stream
+"""
+Records the live EMG stream (the TCP wire format consumed by inference) to
+chunked columnar files.
+
+The recorder subscribes to stream_broker.py (or, with --listen, accepts the
+sender on port 9002 itself). Its ingest thread only receives bytes and cuts
+them at line boundaries; a separate writer thread parses them in bulk once per
+chunk, encodes the columns, optionally compresses them and appends the chunk,
+so the recorder never holds up the socket.
+
+File layout (.emgrec, little endian):
+
+    header   b"EMGREC01", u32 length, JSON metadata (codec, channels, created, source)
+    chunk    b"CHNK", u32 rows, u32 payload bytes, u32 crc32(payload), f64 first ts, f64 last ts,
+             payload = codec(timestamp f64[rows] | sample i64[rows] | emg i8[8][rows], channel-major)
+    ...
+    index    b"INDX", u32 chunks, chunks x (u64 offset, u32 rows, f64 first ts, f64 last ts)
+    trailer  u64 index offset, u32 crc32(index), b"END!"
+
+Every chunk is self-describing and checksummed and is fsync'ed when written,
+so after a crash (no index) read_recording() recovers every complete chunk by
+scanning. A file is rotated every --rotate seconds.
+
+Usage:
+    python stream_recorder.py record --out recordings --codec zlib --rotate 600
+    python stream_recorder.py info recordings/*.emgrec
+    python stream_recorder.py export recordings/emg_stream_20250101_120000.emgrec -o session.csv
+"""
+
+import os
+import json
+import time
+import zlib
+import socket
+import struct
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from stage_queue import BoundedQueue, QueueClosed
+
+# ===========================
+# Config
+# ===========================
+HOST = '127.0.0.1'
+PORT = 9002                    # Sender port (--listen)
+BROKER_PORT = 9003             # stream_broker.py publish port
+CHANNELS = 8
+CHUNK_SECONDS = 1.0            # Data per chunk; also the most a crash can lose
+ROTATE_SECONDS = 600.0         # New file every 10 minutes
+CODECS = ("raw", "zlib")
+ZLIB_LEVEL = 1                 # Fast; columnar EMG compresses well even at level 1
+RECV_SIZE = 64 * 1024
+QUEUE_SIZE = 1024              # Received blocks waiting for the writer (blocking: backpressure goes to the broker)
+RECONNECT_INTERVAL = 1.0
+
+FILE_MAGIC = b"EMGREC01"
+CHUNK_TAG = b"CHNK"
+INDEX_TAG = b"INDX"
+END_TAG = b"END!"
+CHUNK_HEADER = struct.Struct("<4sIIIdd")
+INDEX_ENTRY = struct.Struct("<QIdd")
+TRAILER = struct.Struct("<QI4s")
+
+# ===========================
+# Columnar Chunk Files
+# ===========================
+def parse_lines(data, channels=CHANNELS):
+    """
+    Complete wire-format lines -> (timestamp f64 (n,), sample i64 (n,), emg i8 (n, channels), bad lines).
+    """
+    lines = [line for line in data.split(b"\n") if line.strip()]
+    try:
+        # Fast path: one json.loads for the whole block; a newline inside a record
+        # rejoins its halves, so it only counts with one object per line
+        records = json.loads(b"[" + b",".join(lines) + b"]")
+        if len(records) != len(lines) or not all(isinstance(r, dict) for r in records):
+            raise ValueError("records do not match lines")
+        bad = 0
+    except ValueError:
+        records, bad = [], 0
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                bad += 1
+
+    timestamps, samples, emg = [], [], []
+    for record in records:
+        try:
+            values = record["emg"]
+            if len(values) != channels or not all(-128 <= v <= 127 for v in values):
+                raise ValueError(values)
+            timestamps.append(float(record["timestamp"]))
+            samples.append(int(record.get("sample", -1)))
+            emg.append(values)
+        except (KeyError, TypeError, ValueError):
+            bad += 1
+    return (np.array(timestamps, dtype=np.float64), np.array(samples, dtype=np.int64),
+            np.array(emg, dtype=np.int8).reshape(-1, channels), bad)
+
+
+class ChunkFileWriter:
+    """Appends columnar chunks to one .emgrec file and writes the index on close()."""
+
+    def __init__(self, path, codec="zlib", channels=CHANNELS, meta=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}' (choose from {', '.join(CODECS)})")
+        self.path = path
+        self.codec = codec
+        self.channels = channels
+        self.index = []                 # (offset, rows, first ts, last ts)
+        self.rows = 0
+        self.raw_bytes = 0
+        self.written_bytes = 0
+
+        header = json.dumps({"version": 1, "codec": codec, "channels": channels,
+                             "created": datetime.now().isoformat(timespec="seconds"),
+                             **(meta or {})}).encode()
+        self._file = open(path, "wb")
+        self._file.write(FILE_MAGIC + struct.pack("<I", len(header)) + header)
+        self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def write_chunk(self, timestamps, samples, emg):
+        rows = len(timestamps)
+        if rows == 0:
+            return
+        payload = (np.ascontiguousarray(timestamps, dtype="<f8").tobytes() +
+                   np.ascontiguousarray(samples, dtype="<i8").tobytes() +
+                   np.ascontiguousarray(emg.T, dtype=np.int8).tobytes())
+        self.raw_bytes += len(payload)
+        if self.codec == "zlib":
+            payload = zlib.compress(payload, ZLIB_LEVEL)
+
+        offset = self._file.tell()
+        self._file.write(CHUNK_HEADER.pack(CHUNK_TAG, rows, len(payload), zlib.crc32(payload),
+                                           timestamps[0], timestamps[-1]))
+        self._file.write(payload)
+        self._sync()
+        self.index.append((offset, rows, float(timestamps[0]), float(timestamps[-1])))
+        self.rows += rows
+        self.written_bytes += CHUNK_HEADER.size + len(payload)
+
+    def close(self):
+        if self._file is None:
+            return
+        index_offset = self._file.tell()
+        index = INDEX_TAG + struct.pack("<I", len(self.index)) + b"".join(
+            INDEX_ENTRY.pack(*entry) for entry in self.index)
+        self._file.write(index + TRAILER.pack(index_offset, zlib.crc32(index), END_TAG))
+        self._sync()
+        self._file.close()
+        self._file = None
+
+
+def _read_header(f):
+    if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+        raise ValueError("Not an .emgrec file")
+    (length,) = struct.unpack("<I", f.read(4))
+    return json.loads(f.read(length))
+
+
+def _read_index(f, size):
+    """The index from the trailer, or None if the file was not closed cleanly."""
+    if size < TRAILER.size:
+        return None
+    f.seek(size - TRAILER.size)
+    index_offset, crc, tag = TRAILER.unpack(f.read(TRAILER.size))
+    if tag != END_TAG or index_offset >= size:
+        return None
+    f.seek(index_offset)
+    index = f.read(size - TRAILER.size - index_offset)
+    if zlib.crc32(index) != crc or index[:4] != INDEX_TAG:
+        return None
+    (count,) = struct.unpack_from("<I", index, 4)
+    return [INDEX_ENTRY.unpack_from(index, 8 + i * INDEX_ENTRY.size) for i in range(count)]
+
+
+def _scan_chunks(f, start, size):
+    """Chunk entries found by walking the file from `start`; stops at the first truncated or corrupt chunk."""
+    entries = []
+    offset = start
+    while offset + CHUNK_HEADER.size <= size:
+        f.seek(offset)
+        tag, rows, length, crc, first, last = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+        if tag != CHUNK_TAG or offset + CHUNK_HEADER.size + length > size:
+            break
+        if zlib.crc32(f.read(length)) != crc:
+            break
+        entries.append((offset, rows, first, last))
+        offset += CHUNK_HEADER.size + length
+    return entries
+
+
+def recording_info(path):
+    """Metadata, chunk entries and whether the file has a valid index (was closed cleanly)."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        meta = _read_header(f)
+        data_start = f.tell()
+        index = _read_index(f, size)
+        complete = index is not None
+        if index is None:
+            index = _scan_chunks(f, data_start, size)
+    return {"meta": meta, "chunks": index, "complete": complete,
+            "rows": sum(entry[1] for entry in index)}
+
+
+def read_recording(path, start=None, end=None):
+    """
+    Loads a recording (or the chunks overlapping [start, end] seconds), recovering
+    every complete chunk of a file that was not closed cleanly.
+
+    Returns:
+        {"timestamp": f64 (n,), "sample": i64 (n,), "emg": i8 (n, channels), "meta": dict, "complete": bool}
+    """
+    info = recording_info(path)
+    channels = info["meta"]["channels"]
+    codec = info["meta"]["codec"]
+    timestamps, samples, emg = [], [], []
+    with open(path, "rb") as f:
+        for offset, rows, first, last in info["chunks"]:
+            if (start is not None and last < start) or (end is not None and first > end):
+                continue
+            f.seek(offset)
+            _, _, length, crc, _, _ = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+            payload = f.read(length)
+            if codec == "zlib":
+                payload = zlib.decompress(payload)
+            timestamps.append(np.frombuffer(payload, "<f8", rows))
+            samples.append(np.frombuffer(payload, "<i8", rows, offset=8 * rows))
+            emg.append(np.frombuffer(payload, np.int8, rows * channels, offset=16 * rows).reshape(channels, rows).T)
+
+    rec = {"timestamp": np.concatenate(timestamps) if timestamps else np.zeros(0),
+           "sample": np.concatenate(samples) if samples else np.zeros(0, dtype=np.int64),
+           "emg": np.concatenate(emg) if emg else np.zeros((0, channels), dtype=np.int8),
+           "meta": info["meta"], "complete": info["complete"]}
+    if start is not None or end is not None:
+        keep = np.ones(len(rec["timestamp"]), dtype=bool)
+        if start is not None:
+            keep &= rec["timestamp"] >= start
+        if end is not None:
+            keep &= rec["timestamp"] <= end
+        for key in ("timestamp", "sample", "emg"):
+            rec[key] = rec[key][keep]
+    return rec
+
+
+def recording_to_frame(rec):
+    """A read_recording() result as a DataFrame in the CSV layout used for training."""
+    import pandas as pd
+    df = pd.DataFrame({"timestamp": rec["timestamp"], "sample_number": rec["sample"]})
+    for channel in range(rec["emg"].shape[1]):
+        df[f"emg{channel + 1}"] = rec["emg"][:, channel]
+    return df
+
+# ===========================
+# Recorder
+# ===========================
+class StreamRecorder:
+    """
+    Records the live stream with an ingest thread (socket -> queue of line blocks)
+    and a writer thread (queue -> parsed chunks -> rotated files).
+    """
+
+    def __init__(self, out_dir="recordings", codec="zlib", chunk_seconds=CHUNK_SECONDS,
+                 rotate_seconds=ROTATE_SECONDS, broker=(HOST, BROKER_PORT), listen=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}' (choose from {', '.join(CODECS)})")
+        self.out_dir = out_dir
+        self.codec = codec
+        self.chunk_seconds = chunk_seconds
+        self.rotate_seconds = rotate_seconds
+        self.broker = broker
+        self.listen = listen            # (host, port) to accept the sender on instead of subscribing
+        self.source = f"tcp://{listen[0]}:{listen[1]} (sender)" if listen else f"tcp://{broker[0]}:{broker[1]}"
+
+        self.queue = BoundedQueue("recorder", QUEUE_SIZE, "block")
+        self.stop_event = threading.Event()
+        self.files = []
+        self.rows = 0
+        self.bad_lines = 0
+        self.raw_bytes = 0
+        self.written_bytes = 0
+        self.writer_busy_s = 0.0
+        self._threads = []
+
+    # --- Ingest thread ---
+    def _connect(self):
+        if self.listen:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+                server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                server.bind(self.listen)
+                server.listen(1)
+                server.settimeout(RECONNECT_INTERVAL)
+                print(f"📡 Recorder: Waiting for the sender on {self.listen[0]}:{self.listen[1]}...")
+                while not self.stop_event.is_set():
+                    try:
+                        conn, addr = server.accept()
+                        print(f"✅ Recorder: Sender connected from {addr}")
+                        return conn
+                    except socket.timeout:
+                        continue
+            return None
+        while not self.stop_event.is_set():
+            try:
+                conn = socket.create_connection(self.broker, timeout=RECONNECT_INTERVAL)
+                print(f"✅ Recorder: Subscribed to {self.source}")
+                return conn
+            except OSError:
+                self.stop_event.wait(RECONNECT_INTERVAL)
+        return None
+
+    def _ingest_loop(self):
+        """Receives bytes and queues them cut at line boundaries; no parsing here."""
+        try:
+            while not self.stop_event.is_set():
+                conn = self._connect()
+                if conn is None:
+                    break
+                partial = b""
+                with conn:
+                    conn.settimeout(0.2)
+                    while not self.stop_event.is_set():
+                        try:
+                            data = conn.recv(RECV_SIZE)
+                        except socket.timeout:
+                            continue
+                        except OSError:
+                            data = b""
+                        if not data:
+                            print(f"⚠️ Recorder: {self.source} disconnected.")
+                            break
+                        data = partial + data
+                        end = data.rfind(b"\n") + 1
+                        partial = data[end:]
+                        if end:
+                            while not self.queue.put(data[:end], timeout=0.2):
+                                if self.stop_event.is_set():
+                                    return
+        except QueueClosed:
+            pass
+        finally:
+            self.queue.close()
+
+    # --- Writer thread ---
+    def _open_file(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.out_dir, f"emg_stream_{stamp}.emgrec")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.out_dir, f"emg_stream_{stamp}_{suffix}.emgrec")
+            suffix += 1
+        writer = ChunkFileWriter(path, self.codec, CHANNELS, {"source": self.source})
+        self.files.append(path)
+        print(f"💾 Recorder: Writing {path}")
+        return writer
+
+    def _close_file(self, writer):
+        writer.close()
+        self.raw_bytes += writer.raw_bytes
+        self.written_bytes += writer.written_bytes
+
+    def _write_chunk(self, writer, blocks):
+        start = time.perf_counter()
+        timestamps, samples, emg, bad = parse_lines(b"".join(blocks))
+        writer.write_chunk(timestamps, samples, emg)
+        self.rows += len(timestamps)
+        self.bad_lines += bad
+        self.writer_busy_s += time.perf_counter() - start
+
+    def _writer_loop(self):
+        writer = None
+        blocks = []
+        chunk_due = rotate_due = None
+        try:
+            while True:
+                try:
+                    block = self.queue.get(timeout=0.1)
+                except QueueClosed:
+                    break
+                now = time.monotonic()
+                if block is not None:
+                    if not blocks:
+                        chunk_due = now + self.chunk_seconds
+                    blocks.append(block)
+                if blocks and now >= chunk_due:
+                    if writer is None:
+                        writer = self._open_file()
+                        rotate_due = now + self.rotate_seconds
+                    self._write_chunk(writer, blocks)
+                    blocks = []
+                    if now >= rotate_due:
+                        self._close_file(writer)
+                        writer = None
+            if blocks:
+                if writer is None:
+                    writer = self._open_file()
+                self._write_chunk(writer, blocks)
+        finally:
+            if writer is not None:
+                self._close_file(writer)
+
+    # --- Control ---
+    def start(self):
+        self._threads = [threading.Thread(target=self._ingest_loop, name="recorder-ingest"),
+                         threading.Thread(target=self._writer_loop, name="recorder-writer")]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stops receiving, writes what was received and closes the current file with its index."""
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self):
+        return {"rows": self.rows, "files": len(self.files), "bad_lines": self.bad_lines,
+                "raw_bytes": self.raw_bytes, "written_bytes": self.written_bytes,
+                "writer_busy_s": round(self.writer_busy_s, 4), "queue": self.queue.stats()}
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record the live EMG stream to chunked columnar files")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_record = sub.add_parser("record", help="Record until Ctrl+C")
+    p_record.add_argument("--out", default="recordings", help="Output directory")
+    p_record.add_argument("--codec", choices=CODECS, default="zlib")
+    p_record.add_argument("--chunk", type=float, default=CHUNK_SECONDS, help="Seconds of data per chunk")
+    p_record.add_argument("--rotate", type=float, default=ROTATE_SECONDS, help="Seconds per file")
+    p_record.add_argument("--subscribe", default=f"{HOST}:{BROKER_PORT}", metavar="HOST:PORT",
+                          help="stream_broker.py publish address")
+    p_record.add_argument("--listen", nargs="?", const=f"{HOST}:{PORT}", default=None, metavar="HOST:PORT",
+                          help="Accept the sender directly instead of subscribing to the broker")
+
+    p_info = sub.add_parser("info", help="Summarize recordings (and check for unclean shutdowns)")
+    p_info.add_argument("files", nargs="+")
+
+    p_export = sub.add_parser("export", help="Convert a recording to CSV (timestamp, sample_number, emg1..emg8)")
+    p_export.add_argument("file")
+    p_export.add_argument("--start", type=float, default=None)
+    p_export.add_argument("--end", type=float, default=None)
+    p_export.add_argument("-o", "--output", required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        def address(spec):
+            host, _, port = spec.rpartition(":")
+            return (host or HOST, int(port))
+
+        recorder = StreamRecorder(args.out, args.codec, args.chunk, args.rotate,
+                                  broker=address(args.subscribe),
+                                  listen=address(args.listen) if args.listen else None)
+        recorder.start()
+        try:
+            while not recorder.stop_event.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            print("\n🛑 Recorder: Stopping...")
+        recorder.stop()
+        st = recorder.stats()
+        ratio = st["raw_bytes"] / max(st["written_bytes"], 1)
+        print(f"📊 Recorder: {st['rows']} samples in {st['files']} file(s), {st['written_bytes']} bytes "
+              f"({ratio:.1f}x), writer busy {st['writer_busy_s']:.3f}s, {st['bad_lines']} bad lines")
+    elif args.command == "info":
+        for path in args.files:
+            info = recording_info(path)
+            spans = [(entry[2], entry[3]) for entry in info["chunks"]]
+            span = f"{spans[0][0]:.3f}-{spans[-1][1]:.3f}s" if spans else "empty"
+            state = "complete" if info["complete"] else "no index (recovered by scanning)"
+            print(f"{path}: {info['rows']} samples, {len(info['chunks'])} chunks, {span}, "
+                  f"{info['meta']['codec']}, {state}")
+    else:
+        df = recording_to_frame(read_recording(args.file, args.start, args.end))
+        df.to_csv(args.output, index=False)
+        print(f"Wrote {len(df)} rows to {args.output}")
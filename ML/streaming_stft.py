@@ -0,0 +1,97 @@
+# This file implements the incremental (streaming) version of the inference preprocessing
+"""
+Incremental log-STFT of a live EMG stream, for display next to live inference.
+
+inference.preprocess_window filters and transforms every window from scratch
+(detrend, filtfilt notch 60 Hz, filtfilt bandpass 20-90 Hz, STFT, then log1p in
+compute_features). StreamingSpectrogram produces the same kind of columns
+incrementally: samples go through stateful causal filters once, and one new
+STFT column per channel is computed every nperseg - noverlap samples
+(64 samples = 320 ms with the defaults), so the cost per sample is constant.
+
+filtfilt is zero-phase; here each filter is applied twice, forward only, which
+has the same magnitude response (|H|^2) but not zero phase. The magnitudes
+therefore match the model's features closely except near filter start-up and
+the window edges filtfilt sees, not sample for sample.
+"""
+
+import numpy as np
+from scipy.signal import get_window, sosfilt, sosfilt_zi, tf2sos
+
+from inference import FS, NPERSEG, NOVERLAP, filter_coefficients
+
+class StreamingSpectrogram:
+    """
+    Rolling per-channel log1p(|STFT|) with the model's feature settings.
+
+    push() takes new samples and returns the new columns; image() returns the
+    last `history` columns as (channels, freq bins, history), oldest first.
+    """
+
+    def __init__(self, fs=FS, nperseg=NPERSEG, noverlap=NOVERLAP, channels=8, history=64):
+        self.fs = fs
+        self.nperseg = nperseg
+        self.hop = nperseg - noverlap
+        self.channels = channels
+        self.history = history
+        self.freqs = np.fft.rfftfreq(nperseg, 1.0 / fs)
+
+        # Notch and bandpass, each applied twice (magnitude of filtfilt), as one SOS cascade
+        b_notch, a_notch, b_band, a_band = filter_coefficients(fs)
+        sos = np.vstack([tf2sos(b_notch, a_notch), tf2sos(b_band, a_band)])
+        self._sos = np.vstack([sos, sos])
+        self._zi = None
+
+        # Same window and scaling as scipy.signal.stft (hann, divided by the window sum)
+        window = get_window('hann', nperseg)
+        self._window = (window / window.sum()).astype(np.float64)
+
+        self._pending = np.zeros((0, channels))      # Filtered samples not yet consumed by a column
+        self._image = np.zeros((channels, len(self.freqs), history), dtype=np.float32)
+        self.columns = 0                             # Columns computed so far
+        self.samples = 0
+
+    def push(self, samples):
+        """
+        Adds raw samples of shape (n, channels).
+
+        Returns:
+            The new log-magnitude columns, shape (k, channels, freq bins); k may be 0.
+        """
+        samples = np.asarray(samples, dtype=np.float64).reshape(-1, self.channels)
+        if len(samples) == 0:
+            return np.zeros((0, self.channels, len(self.freqs)), dtype=np.float32)
+        if self._zi is None:
+            # Start the filters in steady state for the first sample (as if it had always been there)
+            self._zi = sosfilt_zi(self._sos)[:, :, np.newaxis] * samples[0]
+        filtered, self._zi = sosfilt(self._sos, samples, axis=0, zi=self._zi)
+        self.samples += len(samples)
+
+        data = np.concatenate([self._pending, filtered])
+        k = max(0, (len(data) - self.nperseg) // self.hop + 1)
+        if k == 0:
+            self._pending = data
+            return np.zeros((0, self.channels, len(self.freqs)), dtype=np.float32)
+
+        # All new segments at once: (k, nperseg, channels)
+        starts = np.arange(k) * self.hop
+        segments = data[starts[:, np.newaxis] + np.arange(self.nperseg)]
+        spectrum = np.abs(np.fft.rfft(segments * self._window[:, np.newaxis], axis=1))
+        columns = np.log1p(spectrum).transpose(0, 2, 1).astype(np.float32)   # (k, channels, F)
+        self._pending = data[k * self.hop:]
+
+        # Scroll the image left by k columns
+        k_img = min(k, self.history)
+        self._image = np.roll(self._image, -k_img, axis=2)
+        self._image[:, :, -k_img:] = columns[-k_img:].transpose(1, 2, 0)
+        self.columns += k
+        return columns
+
+    def image(self):
+        """(channels, freq bins, history) log-magnitudes, oldest column first."""
+        return self._image
+
+    @property
+    def column_seconds(self):
+        """Time between two columns."""
+        return self.hop / self.fs
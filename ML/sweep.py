@@ -0,0 +1,239 @@
+# This file implements a parallel hyperparameter / preprocessing sweep over train_200.py
+"""
+Parallel sweep runner for train_200.py.
+
+Each trial overrides some of train_200's config constants (WINDOW_SIZE, STRIDE,
+NPERSEG, NOVERLAP, BATCH_SIZE, LR, EPOCHS), trains from the shared feature-shard
+cache and reports test accuracy, training time and single-window inference latency.
+Trials run concurrently in worker processes with a per-trial thread limit; trials
+whose preprocessing config matches reuse the same cached features, which are built
+once per config before training starts.
+
+Spec file (JSON):
+    {
+      "mode": "grid",                       # or "random"
+      "trials": 20,                         # random mode only
+      "seed": 0,
+      "params": {
+        "WINDOW_SIZE": [128, 256],          # lists: choose from
+        "NPERSEG": [64, 128],
+        "LR": {"loguniform": [1e-4, 3e-3]}  # random mode: uniform / loguniform ranges
+      }
+    }
+
+Usage:
+    python sweep.py spec.json --workers 4 --threads 1 --out sweep_results
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import itertools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+
+import numpy as np
+
+# ===========================
+# Config
+# ===========================
+RESULTS_FILE = "results.csv"
+LATENCY_RUNS = 200             # Single-window inference timings per trial
+PREPROCESS_KEYS = ("WINDOW_SIZE", "STRIDE", "NPERSEG", "NOVERLAP")
+
+# ===========================
+# Search Spec
+# ===========================
+def _sample(value, rng):
+    if isinstance(value, list):
+        return value[rng.randint(len(value))]
+    if "uniform" in value:
+        low, high = value["uniform"]
+        return float(rng.uniform(low, high))
+    if "loguniform" in value:
+        low, high = value["loguniform"]
+        return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    raise ValueError(f"Unsupported parameter spec: {value}")
+
+def valid_config(params, defaults):
+    """STFT segments must fit the window and overlap less than a segment."""
+    cfg = {**defaults, **params}
+    return cfg["NOVERLAP"] < cfg["NPERSEG"] <= cfg["WINDOW_SIZE"] and cfg["STRIDE"] > 0
+
+def expand_spec(spec, defaults):
+    """Returns the list of trial parameter dicts for a grid or random spec."""
+    params = spec["params"]
+    if spec.get("mode", "grid") == "grid":
+        names = list(params)
+        trials = [dict(zip(names, values)) for values in itertools.product(*(params[n] for n in names))]
+    else:
+        rng = np.random.RandomState(spec.get("seed", 0))
+        trials = [{name: _sample(value, rng) for name, value in params.items()}
+                  for _ in range(spec.get("trials", 10))]
+    # ints from JSON stay ints; numpy scalars become plain Python values
+    trials = [{k: (v.item() if hasattr(v, "item") else v) for k, v in t.items()} for t in trials]
+    # Every trial carries the full config, since worker processes are reused across trials
+    return [{**defaults, **t} for t in trials if valid_config(t, defaults)]
+
+def preprocess_key(params, defaults):
+    cfg = {**defaults, **params}
+    return tuple(cfg[k] for k in PREPROCESS_KEYS)
+
+# ===========================
+# Worker Side
+# ===========================
+def limit_threads(threads):
+    """Caps torch intra-op threads in this process."""
+    import torch
+    torch.set_num_threads(threads)
+
+def measure_latency(model, mean, std, runs=LATENCY_RUNS):
+    """Median/p95 ms of one live inference (preprocess_window -> log/normalize -> forward)."""
+    import torch
+    import train_200 as tr
+    from inference import preprocess_window
+
+    rng = np.random.RandomState(0)
+    window = rng.randint(-30, 30, size=(tr.WINDOW_SIZE, 8)).astype(np.float32)
+    model.eval()
+    times = []
+    with torch.no_grad():
+        for _ in range(runs):
+            start = time.perf_counter()
+            X = np.log1p(preprocess_window(window, tr.FS, tr.NPERSEG, tr.NOVERLAP))
+            X = (X - mean[0]) / std[0]
+            model(torch.from_numpy(X[np.newaxis, ...]).to(tr.DEVICE)).argmax(1).item()
+            times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), float(np.percentile(times, 95))
+
+def build_shards_for(params, files, cache_dir):
+    """Builds (or reuses) the feature shards of one preprocessing config."""
+    import train_200 as tr
+    tr.configure(**params)
+    return tr.build_feature_shards(files, cache_dir)
+
+def run_trial(trial_id, params, files, cache_dir, out_dir, threads, patience, seed):
+    """Trains one configuration; output goes to <out_dir>/trial_<id>.log."""
+    limit_threads(threads)
+    import train_200 as tr
+
+    log_path = os.path.join(out_dir, f"trial_{trial_id:03d}.log")
+    with open(log_path, "w") as log, contextlib.redirect_stdout(log):
+        tr.configure(**params)
+        shards = tr.build_feature_shards(files, cache_dir)
+        stats = tr.shard_normalization(shards)
+        mean, std = stats.normalization()
+        train_loader, test_loader = tr.sharded_loaders(shards, mean, std, seed)
+
+        start = time.perf_counter()
+        model, best_acc, _, _ = tr.train_model(train_loader, test_loader, patience=patience)
+        train_time = time.perf_counter() - start
+
+        latency_ms, latency_p95_ms = measure_latency(model, mean, std)
+        model_path = os.path.join(out_dir, f"trial_{trial_id:03d}.pth")
+        tr.save_model_bundle(model, stats, model_path)
+
+    cfg = {k: getattr(tr, k) for k in tr.CONFIG_KEYS}
+    return {"trial": trial_id, **cfg,
+            "test_acc": round(best_acc, 4),
+            "train_time_s": round(train_time, 2),
+            "latency_ms": round(latency_ms, 3),
+            "latency_p95_ms": round(latency_p95_ms, 3),
+            "model": model_path}
+
+# ===========================
+# Sweep Driver
+# ===========================
+def worker_pool(workers, threads):
+    """Spawned process pool whose workers are limited to `threads` torch/BLAS threads."""
+    # Children inherit these before importing numpy/torch, so BLAS/OpenMP pools stay small
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                               initializer=limit_threads, initargs=(threads,))
+
+def run_sweep(trials, files, out_dir, workers=None, threads=1, cache_dir=None, patience=None, seed=0):
+    """
+    Runs all trials and writes <out_dir>/results.csv.
+
+    Returns:
+        List of result rows, sorted by test accuracy (best first).
+    """
+    import train_200 as tr
+
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    cache_dir = cache_dir or tr.FEATURE_CACHE_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    defaults = {k: getattr(tr, k) for k in tr.CONFIG_KEYS}
+
+    # One representative trial per distinct preprocessing config
+    by_preprocess = {}
+    for params in trials:
+        by_preprocess.setdefault(preprocess_key(params, defaults), params)
+
+    rows = []
+    with worker_pool(workers, threads) as pool:
+        print(f"Building features for {len(by_preprocess)} preprocessing config(s)...")
+        for future in as_completed([pool.submit(build_shards_for, p, files, cache_dir)
+                                    for p in by_preprocess.values()]):
+            future.result()
+
+        print(f"Running {len(trials)} trial(s) on {workers} worker(s), {threads} thread(s) each...")
+        futures = {pool.submit(run_trial, i, params, files, cache_dir, out_dir, threads, patience, seed): i
+                   for i, params in enumerate(trials)}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f"❌ Trial {futures[future]} failed: {e}")
+                continue
+            rows.append(row)
+            print(f"Trial {row['trial']:03d} | Acc: {row['test_acc']:.4f} | "
+                  f"Train: {row['train_time_s']:.1f}s | Latency: {row['latency_ms']:.2f}ms")
+
+    rows.sort(key=lambda r: -r["test_acc"])
+    if rows:
+        with open(os.path.join(out_dir, RESULTS_FILE), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
+
+# ===========================
+# Main
+# ===========================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter / preprocessing sweep for train_200.py")
+    parser.add_argument("spec", help="JSON search spec (see module docstring)")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent trials (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="Torch/BLAS threads per trial")
+    parser.add_argument("--out", default="sweep_results", help="Output directory for results, logs and models")
+    parser.add_argument("--cache-dir", default=None, help="Feature shard cache shared by all trials")
+    parser.add_argument("--all-subjects", action="store_true", help="Use ALL_SUBJECT_FILES instead of DATA_FILES")
+    parser.add_argument("--patience", type=int, default=None, help="Early stopping patience per trial")
+    parser.add_argument("--seed", type=int, default=0, help="Train/test split seed")
+    args = parser.parse_args()
+
+    import train_200 as tr
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    defaults = {k: getattr(tr, k) for k in tr.CONFIG_KEYS}
+    trials = expand_spec(spec, defaults)
+    if not trials:
+        print("No valid trials in spec.")
+        sys.exit(1)
+
+    files = tr.ALL_SUBJECT_FILES if args.all_subjects else tr.DATA_FILES
+    rows = run_sweep(trials, files, args.out, args.workers, args.threads,
+                     args.cache_dir, args.patience, args.seed)
+
+    print(f"\nResults ({len(rows)} trials) written to '{os.path.join(args.out, RESULTS_FILE)}':")
+    for row in rows:
+        params = ", ".join(f"{k}={row[k]}" for k in tr.CONFIG_KEYS)
+        print(f"  {row['test_acc']:.4f} | {row['train_time_s']:7.1f}s | {row['latency_ms']:6.2f}ms | {params}")
@@ -1,6 +1,8 @@
 # train_single_subject_myo_fixed.py
 import os
 import sys
+import copy
+import random
 
 # Workaround for Windows DLL loading issue
 # Set environment variable before importing torch
@@ -12,9 +14,11 @@ from scipy.signal import butter, filtfilt, iirnotch, stft, detrend
 
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, BatchSampler, SubsetRandomSampler
 import torch.optim as optim
 
+from recording_index import emg_columns, time_column
+
 import matplotlib.pyplot as plt
 from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
 
@@ -22,6 +26,7 @@ from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
 # Config
 # ===========================
 FS = 200                      # Sampling rate
+RATE_TOLERANCE = 0.1          # Max relative deviation of a recording's measured rate from FS
 WINDOW_SIZE = 256
 STRIDE = 50
 NPERSEG = 128
@@ -34,6 +39,20 @@ DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 LABELS = {"rest": 0, "pinch": 1}
 
+# Constants that configure() may override (see sweep.py)
+CONFIG_KEYS = ("WINDOW_SIZE", "STRIDE", "NPERSEG", "NOVERLAP", "BATCH_SIZE", "LR", "EPOCHS")
+
+FEATURE_CACHE_DIR = "feature_cache"  # Memory-mapped feature shards (out-of-core training)
+STATS_CHUNK = 256                     # Windows per chunk when streaming over shards
+
+def configure(**overrides):
+    """Overrides config constants for this process, e.g. configure(WINDOW_SIZE=128, LR=3e-4)."""
+    for key, value in overrides.items():
+        name = key.upper()
+        if name not in CONFIG_KEYS:
+            raise KeyError(f"Unknown config key '{key}' (expected one of {CONFIG_KEYS})")
+        globals()[name] = value
+
 # ===========================
 # New Files for Raymond (200 Hz)
 # ===========================
@@ -47,14 +66,69 @@ DATA_FILES = [
     ("../myo/samples/raymond_swing_arm.csv", LABELS["rest"])
 ]
 
+# ===========================
+# All Subjects (rest/pinch recordings at FS only)
+# ===========================
+# Add other subjects' 200 Hz recordings here; preprocess() rejects files whose
+# measured rate is not FS.
+ALL_SUBJECT_FILES = list(DATA_FILES)
+
+# Recordings scraped from the console output of emg-data-sample.exe by the old
+# run_emg_logger.py (Timestamp_ms, Channel_0..7). They hold ~17.6-18.4 Hz snapshots,
+# so nothing of the 20-90 Hz band the features use survives, and resampling cannot
+# bring it back: they are kept out of training and evaluation.
+LOW_RATE_FILES = [
+    ("../myo/samples/hiroki_rest.csv", LABELS["rest"]),
+    ("../myo/samples/hiroki_pinch.csv", LABELS["pinch"]),
+    ("../myo/samples/hiroki_arm_down_pinch.csv", LABELS["pinch"]),
+    ("../myo/samples/josiah_rest.csv", LABELS["rest"]),
+    ("../myo/samples/josiah_pinch.csv", LABELS["pinch"]),
+    ("../myo/samples/josiah_arm_down_pinch.csv", LABELS["pinch"]),
+    ("../myo/samples/raymond_rest.csv", LABELS["rest"]),
+    ("../myo/samples/raymond_pinch_hold.csv", LABELS["pinch"]),
+    ("../myo/samples/raymond_arm_down_pinch.csv", LABELS["pinch"]),
+]
+
 # ===========================
 # Preprocessing
 # ===========================
+def measured_rate(df):
+    """
+    Mean sample rate (Hz) from the timestamp column; NaN for fewer than two rows.
+
+    The 200 Hz logger writes in bursts, so the mean over the whole recording is
+    used rather than the median interval.
+    """
+    col, scale = time_column(df.columns)
+    t = df[col].values * scale
+    span = t[-1] - t[0] if len(t) > 1 else 0.0
+    return (len(t) - 1) / span if span > 0 else float("nan")
+
+def rate_mismatch(df, fs=None):
+    """
+    The measured rate if it is not `fs` (default FS, within RATE_TOLERANCE), else None.
+
+    Recordings shorter than one window produce no windows and are not checked:
+    over a second or two the logger's write bursts dominate the measurement.
+    """
+    if len(df) < WINDOW_SIZE:
+        return None
+    fs = fs or FS
+    rate = measured_rate(df)
+    return None if abs(rate - fs) <= RATE_TOLERANCE * fs else rate
+
+def check_sample_rate(path, df):
+    """Raises ValueError if the recording's measured rate is not FS."""
+    rate = rate_mismatch(df)
+    if rate is not None:
+        raise ValueError(f"{path}: measured sample rate {rate:.1f} Hz, but the features assume FS={FS} Hz")
+
 def preprocess(path):
     df = pd.read_csv(path)
+    check_sample_rate(path, df)
 
     # Keep only EMG1–EMG8 columns
-    emg_cols = [f"emg{i}" for i in range(1, 9)]
+    emg_cols = emg_columns(df.columns)
     data = df[emg_cols].values.astype(np.float64)
 
     # detrend + DC removal
@@ -92,6 +166,83 @@ def preprocess(path):
 
     return np.array(specs).astype(np.float32)
 
+# ===========================
+# Normalization Statistics
+# ===========================
+class RunningStats:
+    """
+    Per-channel mean/variance of (N, C, F, T) feature batches, accumulated in one
+    pass (Welford, with Chan's pairwise update per batch).
+
+    Stats built in parallel workers, or for previously seen sessions, combine
+    with merge() without revisiting the data.
+    """
+    def __init__(self, channels=8):
+        self.count = 0
+        self.mean = np.zeros(channels, dtype=np.float64)
+        self.m2 = np.zeros(channels, dtype=np.float64)
+
+    def _combine(self, n_b, mean_b, m2_b):
+        n_a = self.count
+        n = n_a + n_b
+        if n_b == 0:
+            return
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + delta * delta * (n_a * n_b / n)
+        self.count = n
+
+    def update(self, X):
+        """Folds a (N, C, F, T) batch into the running statistics."""
+        flat = np.moveaxis(np.asarray(X, dtype=np.float64), 1, 0).reshape(X.shape[1], -1)
+        if flat.shape[1] == 0:
+            return
+        mean_b = flat.mean(axis=1)
+        m2_b = ((flat - mean_b[:, None]) ** 2).sum(axis=1)
+        self._combine(flat.shape[1], mean_b, m2_b)
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2)
+        return self
+
+    def normalization(self):
+        """Returns (mean, std) shaped (1, C, 1, 1) as float32, matching X.mean(axis=(0,2,3), keepdims=True)."""
+        std = np.sqrt(self.m2 / max(self.count, 1)) + 1e-8
+        return (self.mean.reshape(1, -1, 1, 1).astype(np.float32),
+                std.reshape(1, -1, 1, 1).astype(np.float32))
+
+    def state_dict(self):
+        return {"count": self.count,
+                "mean": torch.from_numpy(self.mean.copy()),
+                "m2": torch.from_numpy(self.m2.copy())}
+
+    @classmethod
+    def from_state_dict(cls, state):
+        stats = cls(len(state["mean"]))
+        stats.count = int(state["count"])
+        stats.mean = np.asarray(state["mean"], dtype=np.float64)
+        stats.m2 = np.asarray(state["m2"], dtype=np.float64)
+        return stats
+
+    def save(self, path):
+        np.savez(path, count=self.count, mean=self.mean, m2=self.m2)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as npz:
+            return cls.from_state_dict({k: npz[k] for k in npz.files})
+
+def feature_config():
+    """Preprocessing settings stored with the model so inference can match them."""
+    return {"fs": FS, "window_size": WINDOW_SIZE, "nperseg": NPERSEG, "noverlap": NOVERLAP,
+            "class_names": list(LABELS)}
+
+def save_model_bundle(model, stats, save_path):
+    """Saves the weights together with the normalization statistics and feature config."""
+    torch.save({"state_dict": model.state_dict(),
+                "normalization": stats.state_dict(),
+                "config": feature_config()}, save_path)
+
 # ===========================
 # Dataset
 # ===========================
@@ -106,6 +257,207 @@ class EMGDataset(Dataset):
     def __getitem__(self, idx):
         return torch.from_numpy(self.X[idx]), torch.tensor(self.y[idx])
 
+# ===========================
+# Batched Dataset (whole batches per item)
+# ===========================
+class BatchedEMGDataset(Dataset):
+    """
+    Serves whole batches as slices of one contiguous tensor.
+
+    Items are (epoch, batch_index) pairs from EpochBatchSampler. The data is permuted
+    once per epoch (from seed + epoch, so every worker process derives the same
+    order), after which each batch is a plain slice: no per-sample indexing and no
+    collation.
+    """
+    def __init__(self, X, y, batch_size=BATCH_SIZE, shuffle=True, seed=0):
+        self.X = torch.from_numpy(np.ascontiguousarray(X, dtype=np.float32))
+        self.y = torch.from_numpy(np.asarray(y, dtype=np.int64))
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self._epoch = None
+        self._X, self._y = self.X, self.y
+
+    def __len__(self):
+        return (len(self.X) + self.batch_size - 1) // self.batch_size
+
+    def _arrange(self, epoch):
+        if self.shuffle and epoch != self._epoch:
+            g = torch.Generator().manual_seed(self.seed + epoch)
+            perm = torch.randperm(len(self.X), generator=g)
+            self._X, self._y = self.X[perm], self.y[perm]
+        self._epoch = epoch
+
+    def __getitem__(self, item):
+        epoch, i = item
+        self._arrange(epoch)
+        start = i * self.batch_size
+        return self._X[start:start + self.batch_size], self._y[start:start + self.batch_size]
+
+class EpochBatchSampler:
+    """Yields (epoch, batch_index) for a BatchedEMGDataset; call set_epoch() before each epoch."""
+    def __init__(self, n_batches):
+        self.n_batches = n_batches
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return self.n_batches
+
+    def __iter__(self):
+        for i in range(self.n_batches):
+            yield (self.epoch, i)
+
+def seed_worker(worker_id):
+    """Deterministic NumPy seeding inside DataLoader workers."""
+    worker_seed = torch.initial_seed() % 2**32
+    np.random.seed(worker_seed)
+
+def batched_loader(X, y, shuffle=True, num_workers=0, seed=0):
+    """DataLoader over BatchedEMGDataset, with optional persistent, deterministically seeded workers."""
+    dataset = BatchedEMGDataset(X, y, BATCH_SIZE, shuffle=shuffle, seed=seed)
+    return DataLoader(dataset, batch_size=None, sampler=EpochBatchSampler(len(dataset)),
+                      num_workers=num_workers, persistent_workers=num_workers > 0,
+                      worker_init_fn=seed_worker if num_workers > 0 else None,
+                      generator=torch.Generator().manual_seed(seed),
+                      pin_memory=DEVICE.type == "cuda")
+
+def benchmark_loaders(n_windows=20000, epochs=3, num_workers=2):
+    """Prints samples/s of the per-sample EMGDataset path vs. the batched path (synthetic data)."""
+    import time
+
+    X = np.random.rand(n_windows, 8, NPERSEG // 2 + 1, (WINDOW_SIZE - NOVERLAP) // (NPERSEG - NOVERLAP)).astype(np.float32)
+    y = np.random.randint(0, len(LABELS), n_windows)
+
+    loaders = [
+        ("EMGDataset + DataLoader", DataLoader(EMGDataset(X, y), batch_size=BATCH_SIZE, shuffle=True)),
+        ("BatchedEMGDataset", batched_loader(X, y)),
+        (f"BatchedEMGDataset ({num_workers} workers)", batched_loader(X, y, num_workers=num_workers)),
+    ]
+
+    print(f"\nLoader throughput ({n_windows} windows x {epochs} epochs, batch {BATCH_SIZE}):")
+    for name, loader in loaders:
+        start = time.perf_counter()
+        seen = 0
+        for epoch in range(epochs):
+            if hasattr(loader.sampler, "set_epoch"):
+                loader.sampler.set_epoch(epoch)
+            for xb, yb in loader:
+                seen += len(yb)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<36s} {seen / elapsed:12,.0f} samples/s")
+
+# ===========================
+# Out-of-Core Feature Shards
+# ===========================
+def shard_path(path, cache_dir=FEATURE_CACHE_DIR):
+    """Cache file for one recording, keyed by the file and the preprocessing config."""
+    st = os.stat(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    key = f"fs{FS}_w{WINDOW_SIZE}_s{STRIDE}_n{NPERSEG}_o{NOVERLAP}_{st.st_size}_{st.st_mtime_ns}"
+    return os.path.join(cache_dir, f"{name}_{key}.npy")
+
+def shard_stats_path(path):
+    return path[:-len(".npy")] + ".stats.npz"
+
+def shard_stats(path):
+    """
+    Normalization stats of log1p(features) for one shard, cached next to it.
+
+    Computed once per shard, so appending sessions only touches the new shards.
+    """
+    stats_path = shard_stats_path(path)
+    if os.path.exists(stats_path):
+        return RunningStats.load(stats_path)
+    X = np.load(path, mmap_mode='r')
+    stats = RunningStats(X.shape[1])
+    for start in range(0, len(X), STATS_CHUNK):
+        stats.update(np.log1p(np.asarray(X[start:start + STATS_CHUNK], dtype=np.float32)))
+    stats.save(stats_path)
+    return stats
+
+def build_feature_shards(files, cache_dir=FEATURE_CACHE_DIR):
+    """
+    Preprocesses each recording once into its own .npy shard (raw STFT magnitudes).
+
+    Only one recording's windows are held in memory at a time; shards that already
+    exist for the current config are reused.
+
+    Returns:
+        List of (shard_path, label).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    shards = []
+    for path, label in files:
+        out = shard_path(path, cache_dir)
+        if not os.path.exists(out):
+            X_proc = preprocess(path)
+            tmp = out + ".tmp.npy"
+            np.save(tmp, X_proc)
+            if X_proc.ndim == 4:
+                # Stats are accumulated while the features are still in memory
+                stats = RunningStats(X_proc.shape[1])
+                stats.update(np.log1p(X_proc))
+                stats.save(shard_stats_path(out))
+            os.replace(tmp, out)
+            del X_proc
+        if np.load(out, mmap_mode='r').ndim == 4:  # recordings shorter than one window have no features
+            shards.append((out, label))
+    return shards
+
+def shard_normalization(shards):
+    """Merges the per-shard stats into corpus-wide stats."""
+    stats = RunningStats()
+    for path, _ in shards:
+        stats.merge(shard_stats(path))
+    return stats
+
+class ShardedEMGDataset(Dataset):
+    """
+    Serves batches from memory-mapped feature shards without loading them.
+
+    Indexed with a list of global window indices (use with a BatchSampler and
+    batch_size=None); log1p and normalization are applied per batch.
+    """
+    def __init__(self, shards, mean, std):
+        self.paths = [path for path, _ in shards]
+        self.labels = np.array([label for _, label in shards], dtype=np.int64)
+        self.shards = None
+        self._open()
+        self.offsets = np.cumsum([0] + [len(X) for X in self.shards])
+        self.mean = mean
+        self.std = std
+
+    def _open(self):
+        self.shards = [np.load(path, mmap_mode='r') for path in self.paths]
+
+    def __getstate__(self):
+        # Worker processes re-open the memory maps instead of pickling their contents
+        state = self.__dict__.copy()
+        state['shards'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, indices):
+        indices = np.sort(np.asarray(indices))  # sequential reads within each shard
+        shard_ids = np.searchsorted(self.offsets, indices, side='right') - 1
+        X = np.empty((len(indices),) + self.shards[0].shape[1:], dtype=np.float32)
+        for s in np.unique(shard_ids):
+            mask = shard_ids == s
+            X[mask] = self.shards[s][indices[mask] - self.offsets[s]]
+        np.log1p(X, out=X)
+        X -= self.mean[0]
+        X /= self.std[0]
+        return torch.from_numpy(X), torch.from_numpy(self.labels[shard_ids])
+
 # ===========================
 # CNN Model
 # ===========================
@@ -142,13 +494,17 @@ class CNNmodel(nn.Module):
 # ===========================
 # Training (Single Subject)
 # ===========================
-def train_single_subject():
+def train_single_subject(batched=False, num_workers=0, seed=0, headless=False, **train_opts):
+    """train_opts are passed to train_model (patience, checkpoint_path, resume)."""
     print("\nLoading & preprocessing 200 Hz data...")
 
     X_list, y_list = [], []
+    stats = RunningStats()
 
     for path, label in DATA_FILES:
         X_proc = preprocess(path)
+        np.log1p(X_proc, out=X_proc)
+        stats.update(X_proc)
         X_list.append(X_proc)
         y_list.append(np.full(len(X_proc), label))
 
@@ -157,27 +513,122 @@ def train_single_subject():
 
     print("Data shape (windows, channels, freq_bins, time_steps):", X.shape)
 
-    # Log + Normalize
-    X = np.log1p(X)
-    mean = X.mean(axis=(0,2,3), keepdims=True)
-    std = X.std(axis=(0,2,3), keepdims=True) + 1e-8
-    X = (X - mean) / std
+    # Normalize (log1p was applied per file, stats accumulated alongside)
+    mean, std = stats.normalization()
+    X -= mean
+    X /= std
 
-    # Random 80/20 split
+    # Random 80/20 split (seeded, so a resumed run sees the same split)
     N = len(X)
-    idx = np.random.permutation(N)
+    idx = np.random.RandomState(seed).permutation(N)
     train_idx = idx[:int(0.8*N)]
     test_idx  = idx[int(0.8*N):]
 
     X_train, y_train = X[train_idx], y[train_idx]
     X_test,  y_test  = X[test_idx],  y[test_idx]
 
-    train_dataset = EMGDataset(X_train, y_train)
-    test_dataset  = EMGDataset(X_test,  y_test)
+    if batched:
+        train_loader = batched_loader(X_train, y_train, shuffle=True, num_workers=num_workers, seed=seed)
+        test_loader  = batched_loader(X_test, y_test, shuffle=False)
+    else:
+        train_dataset = EMGDataset(X_train, y_train)
+        test_dataset  = EMGDataset(X_test,  y_test)
+
+        train_loader = DataLoader(train_dataset, batch_size=BATCH_SIZE, shuffle=True)
+        test_loader  = DataLoader(test_dataset, batch_size=BATCH_SIZE)
+
+    model, best_acc, best_preds, best_labels = train_model(train_loader, test_loader, **train_opts)
+    save_results(model, stats, best_acc, best_preds, best_labels,
+                 "Raymond 200 Hz — Confusion Matrix", "train_single_subject_myo_model_swing.pth", headless)
+
+# ===========================
+# Training (Out-of-Core, Multi-Subject)
+# ===========================
+def sharded_loaders(shards, mean, std, seed=0):
+    """Train/test loaders over feature shards with a random 80/20 split kept as indices only."""
+    dataset = ShardedEMGDataset(shards, mean, std)
+
+    N = len(dataset)
+    idx = np.random.RandomState(seed).permutation(N)
+    train_idx = idx[:int(0.8*N)]
+    test_idx  = np.sort(idx[int(0.8*N):])
+
+    train_loader = DataLoader(dataset, batch_size=None,
+                              sampler=BatchSampler(SubsetRandomSampler(train_idx), BATCH_SIZE, drop_last=False))
+    test_loader  = DataLoader(dataset, batch_size=None,
+                              sampler=BatchSampler(test_idx, BATCH_SIZE, drop_last=False))
+    return train_loader, test_loader
+
+def train_out_of_core(files=ALL_SUBJECT_FILES, cache_dir=FEATURE_CACHE_DIR, seed=0, headless=False, **train_opts):
+    """
+    Trains from memory-mapped feature shards; peak memory is bounded by one
+    recording's features (while building shards) and one batch (while training).
+    """
+    print(f"\nBuilding feature shards in '{cache_dir}'...")
+    shards = build_feature_shards(files, cache_dir)
+    stats = shard_normalization(shards)
+    mean, std = stats.normalization()
+
+    train_loader, test_loader = sharded_loaders(shards, mean, std, seed)
+    dataset = train_loader.dataset
+    print("Windows:", len(dataset), "| Window shape:", dataset.shards[0].shape[1:])
+
+    model, best_acc, best_preds, best_labels = train_model(train_loader, test_loader, **train_opts)
+    save_results(model, stats, best_acc, best_preds, best_labels,
+                 "All Subjects — Confusion Matrix", "train_all_subjects_myo_model.pth", headless)
+
+# ===========================
+# Training Loop
+# ===========================
+def save_checkpoint(path, state):
+    """Writes a resumable checkpoint atomically (a crash never leaves a half-written file)."""
+    tmp = path + ".tmp"
+    torch.save(state, tmp)
+    os.replace(tmp, path)
+
+def rng_state():
+    state = {"torch": torch.get_rng_state(), "numpy": np.random.get_state(), "python": random.getstate()}
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+def set_rng_state(state):
+    torch.set_rng_state(state["torch"])
+    np.random.set_state(state["numpy"])
+    random.setstate(state["python"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+def evaluate(model, loader):
+    """Returns (accuracy, predictions, labels) of a model over a loader."""
+    model.eval()
+    correct = 0
+    total = 0
+    preds_all = []
+    labels_all = []
+
+    with torch.no_grad():
+        for xb, yb in loader:
+            xb, yb = xb.to(DEVICE), yb.to(DEVICE)
+            out = model(xb)
+            preds = out.argmax(1)
+            correct += (preds == yb).sum().item()
+            total += yb.size(0)
+            preds_all.append(preds.cpu().numpy())
+            labels_all.append(yb.cpu().numpy())
+
+    return correct / max(total, 1), np.concatenate(preds_all), np.concatenate(labels_all)
 
-    train_loader = DataLoader(train_dataset, batch_size=BATCH_SIZE, shuffle=True)
-    test_loader  = DataLoader(test_dataset, batch_size=BATCH_SIZE)
+def train_model(train_loader, test_loader, patience=None, checkpoint_path=None, resume=False):
+    """
+    Trains for up to EPOCHS epochs and returns the model with the best test weights.
 
+    Args:
+        patience: Stop after this many epochs without a test accuracy improvement.
+        checkpoint_path: Write a resumable checkpoint (model, optimizer, epoch,
+                         best weights, RNG state) here after every epoch.
+        resume: Continue from checkpoint_path if it exists.
+    """
     # Model
     model = CNNmodel().to(DEVICE)
     crit = nn.CrossEntropyLoss()
@@ -186,11 +637,29 @@ def train_single_subject():
     best_acc = 0
     best_preds = None
     best_labels = None
+    best_state = None
+    epochs_since_best = 0
+    start_epoch = 1
+
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        ckpt = torch.load(checkpoint_path, map_location=DEVICE, weights_only=False)
+        model.load_state_dict(ckpt["model"])
+        opt.load_state_dict(ckpt["optimizer"])
+        best_acc = ckpt["best_acc"]
+        best_preds = ckpt["best_preds"]
+        best_labels = ckpt["best_labels"]
+        best_state = ckpt["best_state"]
+        epochs_since_best = ckpt["epochs_since_best"]
+        start_epoch = ckpt["epoch"] + 1
+        set_rng_state(ckpt["rng"])
+        print(f"\nResuming from '{checkpoint_path}' at epoch {start_epoch}")
 
     print("\nStarting training...\n")
 
-    for epoch in range(1, EPOCHS+1):
+    for epoch in range(start_epoch, EPOCHS+1):
         # ---- train ----
+        if hasattr(train_loader.sampler, "set_epoch"):
+            train_loader.sampler.set_epoch(epoch)
         model.train()
         correct = 0
         total = 0
@@ -208,46 +677,100 @@ def train_single_subject():
         train_acc = correct / total
 
         # ---- test ----
-        model.eval()
-        correct = 0
-        total = 0
-        preds_all = []
-        labels_all = []
-
-        with torch.no_grad():
-            for xb, yb in test_loader:
-                xb, yb = xb.to(DEVICE), yb.to(DEVICE)
-                out = model(xb)
-                preds = out.argmax(1)
-                correct += (preds == yb).sum().item()
-                total += yb.size(0)
-                preds_all.append(preds.cpu().numpy())
-                labels_all.append(yb.cpu().numpy())
-
-        test_acc = correct / total
+        test_acc, preds, labels = evaluate(model, test_loader)
 
         print(f"Epoch {epoch:02d} | Train Acc: {train_acc:.4f} | Test Acc: {test_acc:.4f}")
 
         if test_acc > best_acc:
             best_acc = test_acc
-            best_preds = np.concatenate(preds_all)
-            best_labels = np.concatenate(labels_all)
-
+            best_preds = preds
+            best_labels = labels
+            best_state = copy.deepcopy(model.state_dict())
+            epochs_since_best = 0
+        else:
+            epochs_since_best += 1
+
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, {
+                "epoch": epoch,
+                "model": model.state_dict(),
+                "optimizer": opt.state_dict(),
+                "best_acc": best_acc,
+                "best_preds": best_preds,
+                "best_labels": best_labels,
+                "best_state": best_state,
+                "epochs_since_best": epochs_since_best,
+                "rng": rng_state(),
+            })
+
+        if patience is not None and epochs_since_best >= patience:
+            print(f"Early stopping: no improvement for {patience} epochs")
+            break
+
+    # Keep the best weights, not the last ones
+    if best_state is not None:
+        model.load_state_dict(best_state)
+
+    return model, best_acc, best_preds, best_labels
+
+
+def save_results(model, stats, best_acc, best_preds, best_labels, title, save_path, headless=False):
     print("\nBest Test Acc:", best_acc)
 
     # Confusion Matrix
-    cm = confusion_matrix(best_labels, best_preds)
-    disp = ConfusionMatrixDisplay(cm, display_labels=["rest", "pinch"])
+    cm = confusion_matrix(best_labels, best_preds, labels=list(LABELS.values()))
+    disp = ConfusionMatrixDisplay(cm, display_labels=list(LABELS))
     disp.plot(cmap=plt.cm.Blues)
-    plt.title("Raymond 200 Hz — Confusion Matrix")
-    plt.show()
-
-    save_path = "train_single_subject_myo_model_swing.pth"
-    torch.save(model.state_dict(), save_path)
-    print(f"Pretrained model weights saved to '{save_path}'")
+    plt.title(title)
+    if headless:
+        figure_path = os.path.splitext(save_path)[0] + "_confusion.png"
+        plt.savefig(figure_path, bbox_inches="tight")
+        plt.close()
+        print(f"Confusion matrix saved to '{figure_path}'")
+    else:
+        plt.show()
+
+    save_model_bundle(model, stats, save_path)
+    print(f"Pretrained model weights and normalization stats saved to '{save_path}'")
 
 # ===========================
 # Main
 # ===========================
 if __name__ == "__main__":
-    train_single_subject()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the EMG gesture CNN")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="Train on all subjects from memory-mapped feature shards")
+    parser.add_argument("--cache-dir", default=FEATURE_CACHE_DIR,
+                        help="Directory for feature shards (with --out-of-core)")
+    parser.add_argument("--batched", action="store_true",
+                        help="Serve whole batches as slices of one contiguous tensor")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="DataLoader worker processes (with --batched)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for the train/test split and batched shuffling")
+    parser.add_argument("--patience", type=int, default=None,
+                        help="Stop after this many epochs without test accuracy improvement")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Resumable checkpoint written after every epoch")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from --checkpoint if it exists")
+    parser.add_argument("--headless", action="store_true",
+                        help="Write the confusion matrix to a PNG instead of showing it")
+    parser.add_argument("--benchmark-loader", action="store_true",
+                        help="Report data loading samples/s on synthetic data and exit")
+    args = parser.parse_args()
+
+    if args.headless:
+        plt.switch_backend("Agg")
+
+    train_opts = {"patience": args.patience, "checkpoint_path": args.checkpoint, "resume": args.resume}
+
+    if args.benchmark_loader:
+        benchmark_loaders(num_workers=max(args.workers, 1))
+    elif args.out_of_core:
+        train_out_of_core(cache_dir=args.cache_dir, seed=args.seed, headless=args.headless, **train_opts)
+    else:
+        train_single_subject(batched=args.batched, num_workers=args.workers, seed=args.seed,
+                             headless=args.headless, **train_opts)
@@ -0,0 +1,216 @@
+# This file implements the low-latency UDP ingestion path for EMG samples
+"""
+UDP datagram ingestion for the realtime EMG receiver (emg-to-pytorch.py --udp).
+
+Datagram format: one or more sample lines in the TCP wire format, i.e.
+
+    {"timestamp":12.345000,"sample":2469,"emg":[1,-2,3,0,5,-1,2,0]}\\n
+    {"timestamp":12.350000,"sample":2470,"emg":[...]}\\n
+
+The "sample" counter is the sequence number. Datagrams may arrive late, out of
+order, duplicated or not at all; ReorderBuffer releases samples in sequence order
+and gives up on a gap once it is older than max_delay or wider than the reorder
+window, so one lost datagram costs a few missing samples instead of stalling every
+later one (as a lost TCP segment does).
+
+Test sender: udp_test_sender.py
+"""
+
+import json
+import time
+import socket
+
+# ===========================
+# Config
+# ===========================
+UDP_HOST = '127.0.0.1'
+UDP_PORT = 9002                # Same port number as the TCP stream (different protocol)
+REORDER_WINDOW = 32            # Samples a gap may span before it is declared lost
+MAX_REORDER_DELAY = 0.02       # Seconds a gap may hold back later samples (4 samples at 200 Hz)
+RESYNC_DISTANCE = 1000         # A sequence number this far behind may mean the sender restarted...
+RESYNC_DATAGRAMS = 3           # ...confirmed by this many consecutive datagrams in the new range
+MAX_DATAGRAM = 65507
+
+# ===========================
+# Wire Format
+# ===========================
+def encode_datagram(samples):
+    """[(sequence, timestamp, [8 ints]), ...] -> datagram bytes."""
+    return "".join('{"timestamp":%.6f,"sample":%d,"emg":[%s]}\n'
+                   % (timestamp, seq, ",".join(str(int(v)) for v in emg))
+                   for seq, timestamp, emg in samples).encode()
+
+def decode_datagram(data):
+    """Datagram bytes -> [(sequence, (timestamp, [8 ints])), ...]; malformed lines are skipped."""
+    samples = []
+    for line in data.splitlines():
+        try:
+            fields = json.loads(line)
+            samples.append((int(fields["sample"]), (fields["timestamp"], fields["emg"])))
+        except (ValueError, KeyError, TypeError):
+            continue
+    return samples
+
+# ===========================
+# Reordering
+# ===========================
+class ReorderBuffer:
+    """
+    Releases samples in sequence order, tolerating reordering within a window.
+
+    Counters: released, reordered (arrived after a later sample but in time),
+    late (arrived after their sequence number was released or skipped, which
+    includes most duplicates), duplicates (of a sample still pending), lost
+    (skipped), resyncs.
+
+    A sample more than RESYNC_DISTANCE behind is held as a possible sender
+    restart. The restart is accepted (pending samples flushed, order restarted
+    from the new range) once RESYNC_DATAGRAMS consecutive datagrams agree on the
+    new range, or at once for sequence number 0; a stale or duplicate datagram is
+    dropped as late as soon as an in-range sample arrives. Samples of one
+    datagram share their arrival time, which is how datagrams are counted.
+    """
+
+    def __init__(self, window=REORDER_WINDOW, max_delay=MAX_REORDER_DELAY):
+        self.window = window
+        self.max_delay = max_delay
+        self.next_seq = None
+        self.max_seen = None
+        self.pending = {}                  # seq -> (arrival time, sample)
+        self._restart = None               # Possible sender restart: {"last", "arrival", "datagrams", "held", "samples"}
+
+        self.released = 0
+        self.reordered = 0
+        self.late = 0
+        self.duplicates = 0
+        self.lost = 0
+        self.resyncs = 0
+
+    def push(self, seq, sample, now=None):
+        """Adds one sample; returns the samples that can now be released, in order."""
+        now = time.perf_counter() if now is None else now
+        if self.next_seq is None:
+            self.next_seq = self.max_seen = seq
+
+        if seq < self.next_seq:
+            if self.next_seq - seq > RESYNC_DISTANCE:
+                return self._restart_candidate(seq, sample, now)
+            self.late += 1
+            return []
+        # The current range continues: whatever looked like a restart was stale
+        self._drop_restart()
+        if seq in self.pending:
+            self.duplicates += 1
+            return []
+
+        if seq < self.max_seen:
+            self.reordered += 1
+        self.max_seen = max(self.max_seen, seq)
+        self.pending[seq] = (now, sample)
+        return self._release(now)
+
+    def _restart_candidate(self, seq, sample, now):
+        """Holds a far-behind sample until the new range is confirmed; returns released samples."""
+        restart = self._restart
+        if restart is None or abs(seq - restart["last"]) > self.window:
+            self._drop_restart()
+            restart = self._restart = {"last": seq, "arrival": now, "datagrams": 1, "held": 0,
+                                      "samples": {}}
+        elif now != restart["arrival"]:
+            restart["datagrams"] += 1
+            restart["arrival"] = now
+        restart["last"] = max(restart["last"], seq)
+        restart["samples"][seq] = (now, sample)
+        restart["held"] += 1
+
+        if seq != 0 and restart["datagrams"] < RESYNC_DATAGRAMS:
+            return []
+        # Sender restarted its counter: release what is pending, then start over from the new range
+        self._restart = None
+        self.resyncs += 1
+        released = self.flush(now, force=True)
+        self.pending = restart["samples"]
+        self.next_seq = min(self.pending)
+        self.max_seen = max(self.pending)
+        return released + self._release(now)
+
+    def _drop_restart(self):
+        if self._restart is not None:
+            self.late += self._restart["held"]
+            self._restart = None
+
+    def flush(self, now=None, force=False):
+        """Releases samples held back by gaps that have expired (all of them with force)."""
+        now = time.perf_counter() if now is None else now
+        if force:
+            released = []
+            for seq in sorted(self.pending):
+                self.lost += seq - self.next_seq
+                released.append(self.pending.pop(seq)[1])
+                self.next_seq = seq + 1
+            self.released += len(released)
+            return released
+        return self._release(now)
+
+    def _release(self, now):
+        released = []
+        while self.pending:
+            if self.next_seq in self.pending:
+                released.append(self.pending.pop(self.next_seq)[1])
+                self.next_seq += 1
+                continue
+            oldest = min(self.pending)
+            expired = (self.max_seen - self.next_seq >= self.window or
+                       now - self.pending[oldest][0] >= self.max_delay)
+            if not expired:
+                break
+            # Give up on the gap [next_seq, oldest)
+            self.lost += oldest - self.next_seq
+            self.next_seq = oldest
+        self.released += len(released)
+        return released
+
+    def stats(self):
+        return {"released": self.released, "reordered": self.reordered, "late": self.late,
+                "duplicates": self.duplicates, "lost": self.lost, "resyncs": self.resyncs,
+                "pending": len(self.pending)}
+
+# ===========================
+# Receiver
+# ===========================
+def udp_listener(deliver, stop_event, host=UDP_HOST, port=UDP_PORT, window=REORDER_WINDOW,
+                 max_delay=MAX_REORDER_DELAY):
+    """
+    Receives datagrams until stop_event is set and passes (timestamp, emg) samples,
+    in sequence order, to deliver(sample). deliver returning False stops the listener.
+
+    Returns:
+        The ReorderBuffer, for its counters.
+    """
+    reorder = ReorderBuffer(window, max_delay)
+    datagrams = 0
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind((host, port))
+        # Wake up often enough to release samples stuck behind an expired gap
+        s.settimeout(max(max_delay / 2, 0.001))
+        print(f"📡 Listener: Receiving UDP datagrams on {host}:{port} "
+              f"(reorder window {window} samples, max delay {max_delay * 1000:.0f} ms)")
+
+        while not stop_event.is_set():
+            try:
+                data = s.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                released = reorder.flush()
+            else:
+                datagrams += 1
+                if datagrams == 1:
+                    print("✅ Listener: Receiving UDP samples.")
+                now = time.perf_counter()
+                released = []
+                for seq, sample in decode_datagram(data):
+                    released.extend(reorder.push(seq, sample, now))
+
+            for sample in released:
+                if deliver(sample) is False:
+                    return reorder
+    return reorder
@@ -0,0 +1,92 @@
+# This file implements a UDP test sender for the receiver's --udp ingestion mode
+"""
+Test sender for emg-to-pytorch.py --udp.
+
+Streams synthetic 8-channel EMG (rest with periodic pinch-like bursts) at a fixed
+sample rate, packing several samples per datagram, and can simulate network
+trouble: datagram loss, reordering and duplication.
+
+Usage:
+    python udp_test_sender.py --rate 200 --per-datagram 4 --seconds 30
+    python udp_test_sender.py --loss 0.02 --reorder 0.05 --duplicate 0.01
+"""
+
+import time
+import random
+import socket
+
+from udp_ingest import UDP_HOST, UDP_PORT, encode_datagram
+
+def synthetic_sample(seq, rate, rng):
+    """Rest-like noise, with a 1 s pinch-like burst every 3 s."""
+    amplitude = 30 if (seq / rate) % 3 < 1 else 3
+    return [max(-128, min(127, int(rng.gauss(0, amplitude)))) for _ in range(8)]
+
+def send_stream(host=UDP_HOST, port=UDP_PORT, rate=200, per_datagram=4, seconds=None,
+                loss=0.0, reorder=0.0, duplicate=0.0, seed=0):
+    """
+    Sends until `seconds` elapse (forever if None).
+
+    Returns:
+        Counters: samples and datagrams sent, datagrams dropped, reordered and duplicated.
+    """
+    rng = random.Random(seed)
+    stats = {"samples": 0, "datagrams": 0, "dropped": 0, "reordered": 0, "duplicated": 0}
+    held = None                                    # Datagram held back to be sent out of order
+    interval = per_datagram / rate
+    start = time.perf_counter()
+    seq = 0
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        while seconds is None or seq / rate < seconds:
+            samples = [(seq + i, (seq + i) / rate, synthetic_sample(seq + i, rate, rng))
+                       for i in range(per_datagram)]
+            seq += per_datagram
+            stats["samples"] += per_datagram
+            datagram = encode_datagram(samples)
+
+            if rng.random() < loss:
+                stats["dropped"] += 1
+            elif held is None and rng.random() < reorder:
+                held = datagram                    # Goes out after the next one
+                stats["reordered"] += 1
+            else:
+                s.sendto(datagram, (host, port))
+                stats["datagrams"] += 1
+                if rng.random() < duplicate:
+                    s.sendto(datagram, (host, port))
+                    stats["duplicated"] += 1
+                if held is not None:
+                    s.sendto(held, (host, port))
+                    stats["datagrams"] += 1
+                    held = None
+
+            # Pace against the start time so sleep jitter does not accumulate
+            delay = start + seq / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    return stats
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="UDP test sender for the EMG receiver's --udp mode")
+    parser.add_argument("--host", default=UDP_HOST)
+    parser.add_argument("--port", type=int, default=UDP_PORT)
+    parser.add_argument("--rate", type=float, default=200, help="Samples per second")
+    parser.add_argument("--per-datagram", type=int, default=4, help="Samples packed into one datagram")
+    parser.add_argument("--seconds", type=float, default=None, help="Stop after this long (default: run forever)")
+    parser.add_argument("--loss", type=float, default=0.0, help="Probability of dropping a datagram")
+    parser.add_argument("--reorder", type=float, default=0.0, help="Probability of delaying a datagram past the next one")
+    parser.add_argument("--duplicate", type=float, default=0.0, help="Probability of sending a datagram twice")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Sending to udp://{args.host}:{args.port} at {args.rate:.0f} Hz, {args.per_datagram} samples/datagram")
+    try:
+        stats = send_stream(args.host, args.port, args.rate, args.per_datagram, args.seconds,
+                            args.loss, args.reorder, args.duplicate, args.seed)
+    except KeyboardInterrupt:
+        stats = None
+    if stats:
+        print(f"Done: {stats}")
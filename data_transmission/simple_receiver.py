@@ -1,94 +1,234 @@
 #!/usr/bin/env python3
 """
 Simple TCP socket receiver for EMG data from C++ program.
-Receives and prints EMG data to terminal.
+Receives EMG data and prints a live summary to the terminal (rate, sequence
+gaps, decode errors, latest values), or every sample with --per-sample.
+
+Also usable as a reusable stream reader:
+
+    from simple_receiver import LineReader, decode_batch
+
+    reader = LineReader(conn)
+    while (block := reader.read_block()) is not None:
+        records, errors = decode_batch(block)
+
+LineReader receives with recv_into into one reusable bytearray and finds line
+boundaries without copying; every call returns all complete lines received so
+far as one block, so the cost per byte stays constant however far behind the
+reader is.
 """
 
 import socket
 import json
 import sys
+import time
 
 # Configuration
 HOST = '127.0.0.1'
 PORT = 9002
-BUFFER_SIZE = 4096
+BUFFER_SIZE = 1 << 20      # Initial receive buffer (grows if a single line is longer)
+SUMMARY_INTERVAL = 0.5     # Seconds between summary updates
+
+
+class LineReader:
+    """Newline-delimited framing over a socket with a reusable receive buffer."""
+
+    def __init__(self, sock, buffer_size=BUFFER_SIZE):
+        self.sock = sock
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0            # First byte not yet returned
+        self._end = 0              # End of received data
+        self.bytes_received = 0
+
+    def _compact(self):
+        """Moves the partial line at the end to the front (or grows the buffer if it fills it)."""
+        pending = self._end - self._start
+        if self._start == 0 and pending == len(self._buffer):
+            buffer = bytearray(2 * len(self._buffer))
+            buffer[:pending] = self._view
+            self._buffer, self._view = buffer, memoryview(buffer)
+            return
+        self._view[:pending] = self._view[self._start:self._end]
+        self._start, self._end = 0, pending
+
+    def read_block(self):
+        """
+        Receives until at least one complete line is available.
+
+        Returns:
+            All complete lines received so far as one bytes block (each ending in b'\\n'),
+            or None once the connection is closed.
+        """
+        while True:
+            if self._end == len(self._buffer) or (self._start and self._start == self._end):
+                self._compact()
+            n = self.sock.recv_into(self._view[self._end:])
+            if n == 0:
+                return None
+            scan_from = self._end
+            self._end += n
+            self.bytes_received += n
+
+            # Only the newly received bytes can hold the last newline
+            last = self._buffer.rfind(b'\n', scan_from, self._end)
+            if last < 0:
+                continue
+            block = bytes(self._view[self._start:last + 1])
+            self._start = last + 1
+            return block
+
+
+def decode_batch(block):
+    """
+    Decodes a block of JSON lines with one json.loads call (per line only if a line is malformed).
+    Every line must hold exactly one JSON object; anything else is an error.
+
+    Returns:
+        (list of decoded records, list of lines that failed to decode)
+    """
+    lines = [line for line in block.split(b'\n') if line.strip()]
+    try:
+        records = json.loads(b'[' + b','.join(lines) + b']')
+        # A stray newline inside a record rejoins its halves into one valid record:
+        # trust the fast result only if it has exactly one object per line
+        if len(records) == len(lines) and all(isinstance(r, dict) for r in records):
+            return records, []
+    except ValueError:
+        pass
+
+    records, errors = [], []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            records.append(record)
+        else:
+            errors.append(line)
+    return records, errors
+
+
+class StreamStats:
+    """Counters for the summary display."""
 
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.samples = 0
+        self.decode_errors = 0
+        self.gaps = 0              # Sequence numbers skipped by the sender's "sample" counter
+        self.last_sample = None
+        self.last_record = None
+        self._window_start = self.start
+        self._window_samples = 0
+        self._window_bytes = 0
 
-def main():
-    """Main function to receive and print EMG data"""
+    def add(self, records, errors, n_bytes):
+        self.samples += len(records)
+        self.decode_errors += len(errors)
+        self._window_samples += len(records)
+        self._window_bytes += n_bytes
+        for record in records:
+            sample = record.get('sample')
+            if isinstance(sample, int):
+                if self.last_sample is not None and sample > self.last_sample + 1:
+                    self.gaps += sample - self.last_sample - 1
+                self.last_sample = sample
+        if records:
+            self.last_record = records[-1]
+
+    def summary(self):
+        """One status line; resets the rate window."""
+        now = time.perf_counter()
+        elapsed = max(now - self._window_start, 1e-9)
+        rate = self._window_samples / elapsed
+        kbps = self._window_bytes / elapsed / 1024
+        self._window_start, self._window_samples, self._window_bytes = now, 0, 0
+
+        record = self.last_record or {}
+        emg = record.get('emg', [])
+        return (f"Samples {self.samples:8d} | {rate:7.0f}/s {kbps:7.1f} KB/s | "
+                f"gaps {self.gaps:5d} | errors {self.decode_errors:4d} | "
+                f"t {record.get('timestamp', 0):9.3f}s | EMG: {[f'{v:4d}' for v in emg]}")
+
+
+def print_sample(record, sample_count):
+    timestamp = record.get('timestamp', 0)
+    sample = record.get('sample', sample_count - 1)
+    emg_values = record.get('emg', [])
+    print(f"Sample {sample:6d} | "
+          f"Time: {timestamp:8.3f}s | "
+          f"EMG: {[f'{v:4d}' for v in emg_values]}")
+
+
+def main(host=HOST, port=PORT, per_sample=False, summary_interval=SUMMARY_INTERVAL):
+    """Main function to receive EMG data and display a live summary"""
     # Create TCP socket
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    
+
     try:
         # Bind and listen
-        server_socket.bind((HOST, PORT))
+        server_socket.bind((host, port))
         server_socket.listen(1)
-        
+
         print("=" * 60)
         print("EMG Data Receiver - Simple Listener")
         print("=" * 60)
-        print(f"Listening on {HOST}:{PORT}")
+        print(f"Listening on {host}:{port}")
         print("Waiting for connection from C++ program...")
         print("Press Ctrl+C to stop")
         print("=" * 60)
-        
+
         # Accept connection
         conn, addr = server_socket.accept()
         print(f"\nConnected to {addr}")
         print("-" * 60)
-        
-        # Receive data
-        buffer = ""
-        sample_count = 0
-        
-        while True:
-            try:
-                # Receive data
-                data = conn.recv(BUFFER_SIZE).decode('utf-8')
-                
-                if not data:
-                    print("\nConnection closed by sender")
+
+        reader = LineReader(conn)
+        stats = StreamStats()
+        next_summary = time.perf_counter() + summary_interval
+
+        with conn:
+            while True:
+                try:
+                    # All complete lines received so far, decoded at once
+                    block = reader.read_block()
+                    if block is None:
+                        print("\nConnection closed by sender")
+                        break
+                    records, errors = decode_batch(block)
+                    stats.add(records, errors, len(block))
+
+                    for line in errors:
+                        print(f"\nJSON decode error. Raw data: {line[:200]!r}")
+
+                    if per_sample:
+                        for i, record in enumerate(records):
+                            print_sample(record, stats.samples - len(records) + i + 1)
+                    elif time.perf_counter() >= next_summary:
+                        # Throttled: one overwritten status line per interval
+                        print(f"\r{stats.summary()}", end='', flush=True)
+                        next_summary = time.perf_counter() + summary_interval
+
+                except KeyboardInterrupt:
+                    print("\n\nStopping receiver...")
                     break
-                
-                # Add to buffer
-                buffer += data
-                
-                # Process complete lines (messages end with \n)
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    
-                    if line.strip():
-                        try:
-                            # Parse JSON
-                            emg_data = json.loads(line)
-                            
-                            sample_count += 1
-                            timestamp = emg_data.get('timestamp', 0)
-                            sample = emg_data.get('sample', sample_count - 1)
-                            emg_values = emg_data.get('emg', [])
-                            
-                            # Print formatted output
-                            print(f"Sample {sample:6d} | "
-                                  f"Time: {timestamp:8.3f}s | "
-                                  f"EMG: {[f'{v:4d}' for v in emg_values]}")
-                            
-                        except json.JSONDecodeError as e:
-                            print(f"JSON decode error: {e}")
-                            print(f"Raw data: {line}")
-                            
-            except KeyboardInterrupt:
-                print("\n\nStopping receiver...")
-                break
-            except Exception as e:
-                print(f"\nError: {e}")
-                break
-        
-        print(f"\nTotal samples received: {sample_count}")
-        
+                except Exception as e:
+                    print(f"\nError: {e}")
+                    break
+
+        elapsed = time.perf_counter() - stats.start
+        print(f"\nTotal samples received: {stats.samples} "
+              f"({stats.samples / max(elapsed, 1e-9):.0f}/s, {stats.gaps} sequence gaps, "
+              f"{stats.decode_errors} decode errors)")
+
+    except KeyboardInterrupt:
+        print("\n\nStopping receiver...")
     except OSError as e:
         print(f"Socket error: {e}")
-        print(f"Make sure port {PORT} is not already in use")
+        print(f"Make sure port {port} is not already in use")
         sys.exit(1)
     except Exception as e:
         print(f"Error: {e}")
@@ -99,5 +239,15 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EMG stream diagnostic receiver")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--per-sample', action='store_true',
+                        help="Print every sample instead of a throttled summary")
+    parser.add_argument('--interval', type=float, default=SUMMARY_INTERVAL,
+                        help="Seconds between summary updates")
+    args = parser.parse_args()
 
+    main(args.host, args.port, args.per_sample, args.interval)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Incremental tail reader for EMG CSV files that are still being written
+(emg-to-csv.exe, run_emg_logger.py).
+
+Remembers the byte offset of the last complete line and, on every read, parses
+only the newly appended complete lines, in bulk, into NumPy arrays. A partial
+trailing line is left for the next read. If the file is truncated or replaced
+(rotation), reading starts over from the new file's header.
+
+Supported layouts:
+    timestamp,sample_number,emg1,...,emg8        (timestamp in seconds)
+    Timestamp_ms,Channel_0,...,Channel_7          (older recordings)
+"""
+
+import io
+import os
+import numpy as np
+
+
+class CSVTailReader:
+    def __init__(self, csv_filename, channels=8):
+        self.csv_filename = csv_filename
+        self.channels = channels
+        self._file = None
+        self._inode = None
+        self.offset = 0              # Byte offset just past the last complete line consumed
+        self.columns = None          # Header column names
+        self._time_col = None
+        self._time_scale = 1.0       # Factor converting the time column to milliseconds
+        self._emg_cols = None
+        self.rows_read = 0
+        self.bad_lines = 0
+        self.rotations = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _empty(self):
+        return np.zeros(0, dtype=np.float64), np.zeros((0, self.channels), dtype=np.float32)
+
+    def _open(self):
+        self.close()
+        self._file = open(self.csv_filename, 'rb')
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self.offset = 0
+        self.columns = None
+
+    def _rotated(self):
+        """True if the path now points at another file or the file shrank below our offset."""
+        try:
+            st = os.stat(self.csv_filename)
+        except OSError:
+            return False
+        return st.st_ino != self._inode or st.st_size < self.offset
+
+    def _parse_header(self, line):
+        columns = line.decode('utf-8', errors='replace').strip().split(',')
+        if 'timestamp' in columns:
+            time_col, scale = 'timestamp', 1000.0
+        elif 'Timestamp_ms' in columns:
+            time_col, scale = 'Timestamp_ms', 1.0
+        else:
+            raise ValueError(f"No timestamp column in header: {columns}")
+        emg_cols = [f'emg{i + 1}' for i in range(self.channels)]
+        if not all(c in columns for c in emg_cols):
+            emg_cols = [f'Channel_{i}' for i in range(self.channels)]
+        self.columns = columns
+        self._time_col = columns.index(time_col)
+        self._time_scale = scale
+        self._emg_cols = [columns.index(c) for c in emg_cols]
+
+    def _parse_rows(self, data):
+        """Complete CSV lines (bytes) -> float64 array (rows, columns); malformed lines are skipped."""
+        ncols = len(self.columns)
+        text = data.replace(b'\r', b'')
+        # Fast path: the whole block in one parse, only if every line has exactly ncols fields
+        raw = np.frombuffer(text, dtype=np.uint8)
+        line_ends = np.flatnonzero(raw == ord('\n'))
+        commas = np.cumsum(raw == ord(','))[line_ends]
+        if np.all(np.diff(commas, prepend=0) == ncols - 1):
+            try:
+                return np.loadtxt(io.BytesIO(text), delimiter=',', dtype=np.float64, ndmin=2)
+            except ValueError:
+                pass
+
+        # Slow path: some line is malformed, parse line by line
+        rows = []
+        for line in text.split(b'\n'):
+            if not line:
+                continue
+            try:
+                values = self._numbers(line)
+            except ValueError:
+                values = None
+            if values is not None and values.size == ncols:
+                rows.append(values)
+            else:
+                self.bad_lines += 1
+        return np.array(rows, dtype=np.float64).reshape(-1, ncols)
+
+    @staticmethod
+    def _numbers(line):
+        """One CSV line -> float64 values; raises ValueError on an empty or non-numeric field."""
+        return np.array(line.split(b','), dtype=np.float64)
+
+    def read_new(self):
+        """
+        Reads the complete lines appended since the last call.
+
+        Returns:
+            (timestamps in ms, float64 (n,)), (EMG values, float32 (n, channels))
+        """
+        if not os.path.exists(self.csv_filename):
+            return self._empty()
+
+        if self._file is None:
+            self._open()
+        elif self._rotated():
+            self.rotations += 1
+            self._open()
+
+        self._file.seek(self.offset)
+        data = self._file.read()
+        end = data.rfind(b'\n')
+        if end < 0:
+            return self._empty()            # Nothing new, or only a partial line so far
+        data = data[:end + 1]
+        self.offset += len(data)
+
+        if self.columns is None:
+            header_end = data.find(b'\n')
+            self._parse_header(data[:header_end])
+            data = data[header_end + 1:]
+        if not data:
+            return self._empty()
+
+        rows = self._parse_rows(data)
+        self.rows_read += len(rows)
+        return rows[:, self._time_col] * self._time_scale, rows[:, self._emg_cols].astype(np.float32)
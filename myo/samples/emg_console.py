@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Bulk parser for the console output of emg-data-sample.exe.
+
+The sample prints one record per update (about 20 Hz), each starting with '\\r'
+to overwrite the previous one, as eight left-aligned, bracketed int8 values:
+
+    \\r[12  ][-5  ][3   ][-8  ][15  ][-2  ][7   ][-1  ]
+
+ConsoleParser takes raw chunks of that output as they come off the pipe (any
+size, records may be split across chunks) and extracts all complete records
+of each chunk at once into an int8 NumPy block. Anything else the program
+prints ("Attempting to find a Myo...") is skipped.
+
+The output carries no timestamps: each block is stamped when it is parsed, and
+its records are spread evenly over the time since the previous block.
+"""
+
+import re
+import numpy as np
+
+# Eight bracketed integers back to back; a record interrupted by anything else does not match
+RECORD_RE = re.compile(rb'(?:\[ *-?\d{1,4} *\]){8}')
+MAX_RECORD_BYTES = 8 * len(b'[-128]') + 8   # Longest record (with stray padding); bounds the carried-over tail
+
+
+class ConsoleParser:
+    def __init__(self, channels=8):
+        self.channels = channels
+        self._tail = b''               # Bytes after the last complete record, possibly a partial record
+        self._last_time = None         # Stamp of the previous non-empty block
+        self.records = 0
+        self.bad_records = 0           # Complete records with values outside int8
+
+    def _empty(self):
+        return np.zeros(0, dtype=np.float64), np.zeros((0, self.channels), dtype=np.int8)
+
+    def parse_values(self, chunk):
+        """
+        All complete records in tail + chunk as an int8 array of shape (n, channels).
+        """
+        data = self._tail + chunk
+        records = RECORD_RE.findall(data)
+        if not records:
+            self._tail = data[-MAX_RECORD_BYTES:]
+            return np.zeros((0, self.channels), dtype=np.int8)
+
+        # Keep whatever follows the last complete record for the next chunk
+        end = data.rfind(records[-1]) + len(records[-1])
+        self._tail = data[end:][-MAX_RECORD_BYTES:]
+
+        # "[12  ][-5  ]..." -> "12   -5   ..." -> one flat parse of the whole block
+        text = b' '.join(records).translate(None, b'[').replace(b']', b' ')
+        values = np.fromstring(text.decode('ascii'), dtype=np.int16, sep=' ').reshape(-1, self.channels)
+
+        valid = np.all((values >= -128) & (values <= 127), axis=1)
+        if not valid.all():
+            self.bad_records += int((~valid).sum())
+            values = values[valid]
+        self.records += len(values)
+        return values.astype(np.int8)
+
+    def parse(self, chunk, now):
+        """
+        Parses a chunk read at time `now` (any clock, e.g. ms since recording start).
+
+        Returns:
+            (timestamps, float64 (n,)), (EMG values, int8 (n, channels)). The records
+            of a block are spread evenly over (previous block time, now]; those of the
+            first block all get `now`.
+        """
+        values = self.parse_values(chunk)
+        n = len(values)
+        if n == 0:
+            return self._empty()
+
+        if self._last_time is None:
+            timestamps = np.full(n, float(now))
+        else:
+            timestamps = self._last_time + (now - self._last_time) * np.arange(1, n + 1) / n
+        self._last_time = now
+        return timestamps, values
@@ -1,147 +1,389 @@
 #!/usr/bin/env python3
 """
 Real-time EMG Data Visualizer
-Reads from CSV file generated by C++ collector and displays live graphs
-Displays all 8 channels on one scrolling plot
+Reads from CSV file(s) generated by C++ collector, or subscribes to the live
+stream republished by ML/stream_broker.py (--subscribe), and displays live graphs
+Displays all 8 channels of each armband on one scrolling plot per armband
+
+Rendering is built for high frame rates over long time spans:
+- samples live in a NumPy ring buffer (no per-frame list/deque conversion)
+- each frame plots at most two points (min and max) per PIXELS_PER_BIN
+  horizontal pixels, however long the history
+- the time axis is relative to the latest sample, so axes stay static and
+  only the line artists are redrawn (blitting)
+
+--spectrogram shows instead, per channel, the rolling log-STFT the CNN
+consumes (normalized as for the model, computed incrementally by
+ML/streaming_stft.py) and the model's current prediction and confidence.
 """
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from collections import deque
 import numpy as np
 import time
+import sys
 import os
 
+from csv_tail import CSVTailReader
+from stream_subscriber import StreamSubscriber
+
 # Colors for each channel
-channel_colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', 
+channel_colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728',
                   '#9467bd', '#8c564b', '#e377c2', '#7f7f7f']
 
-class EMGVisualizer:
-    def __init__(self, csv_filename, window_size=1000):
-        self.csv_filename = csv_filename
-        self.window_size = window_size  # Keep last 1000 samples (5 seconds at 200Hz)
-        
-        # Initialize data buffers for 8 channels
-        self.channel_data = [deque(maxlen=window_size) for _ in range(8)]
-        self.timestamps = deque(maxlen=window_size)
-        self.last_row = 0
+ML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'ML')
+
+SAMPLE_RATE = 200  # Hz, Myo EMG
+PIXELS_PER_BIN = 2  # Horizontal pixels per min/max bin (1 = full resolution, more = cheaper frames)
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of rows backed by one NumPy array.
+
+    Every row is written twice (at i and i + capacity), so the latest rows are
+    always one contiguous slice and view() never copies.
+    """
+
+    def __init__(self, capacity, width, dtype=np.float64):
+        self.capacity = capacity
+        self._data = np.zeros((2 * capacity, width), dtype=dtype)
+        self._pos = 0          # Next write index in [0, capacity)
+        self.count = 0         # Valid rows
+
+    def extend(self, rows):
+        rows = rows[-self.capacity:]
+        n = len(rows)
+        if n == 0:
+            return
+        idx = (self._pos + np.arange(n)) % self.capacity
+        self._data[idx] = rows
+        self._data[idx + self.capacity] = rows
+        self._pos = (self._pos + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def view(self):
+        """The valid rows, oldest first (a view into the buffer)."""
+        end = self._pos + self.capacity
+        return self._data[end - self.count:end]
+
+
+def minmax_decimate(t, y, n_bins):
+    """
+    Reduce (N,) times and (N, C) values to 2 points per bin, each bin's min and max.
+
+    With one bin per horizontal pixel the plotted envelope looks the same as
+    plotting every sample. The oldest N % n_bins samples are dropped so the
+    newest sample is always kept.
+    """
+    n = len(t)
+    if n_bins <= 0 or n <= 2 * n_bins:
+        return t, y
+    k = n // n_bins
+    start = n - k * n_bins
+    yb = y[start:].reshape(n_bins, k, y.shape[1])
+    tb = t[start:].reshape(n_bins, k)
+    t_out = np.stack([tb[:, 0], tb[:, -1]], axis=1).reshape(-1)
+    y_out = np.stack([yb.min(axis=1), yb.max(axis=1)], axis=1).reshape(2 * n_bins, y.shape[1])
+    return t_out, y_out
+
+
+def open_source(source):
+    """CSV filename or reader -> (display name, reader with read_new())"""
+    if isinstance(source, str):
+        return os.path.basename(source), CSVTailReader(source)
+    # Any reader with read_new() -> (timestamps in ms, emg), e.g. StreamSubscriber
+    return source.name, source
+
+
+class Armband:
+    """One source (CSV file or broker subscription) with its ring buffer and plot artists."""
+
+    def __init__(self, source, ax, capacity, show_legend):
+        self.name, self.reader = open_source(source)
+        # Columns: timestamp (ms), emg1..emg8
+        self.buffer = RingBuffer(capacity, 9)
         self.sample_count = 0
-        
-        # Set up matplotlib figure and axes
-        self.fig, self.ax = plt.subplots(figsize=(12, 8))
-        self.ax.set_xlabel('Time (ms)', fontsize=10)
-        self.ax.set_ylabel('EMG Value', fontsize=10)
-        self.ax.set_ylim(-100, 100)
-        self.ax.grid(True, alpha=0.3)
-        self.ax.axhline(y=0, color='black', linestyle='-', linewidth=0.5)
-        
+        self.ax = ax
+
         # Create lines for each channel
         self.lines = []
         for channel in range(8):
-            line, = self.ax.plot([], [], color=channel_colors[channel], 
-                               label=f'Channel {channel}', linewidth=1.5)
+            line, = ax.plot([], [], color=channel_colors[channel],
+                            label=f'Channel {channel}', linewidth=1.0, animated=True)
             self.lines.append(line)
-        
+        self.text = ax.text(0.01, 0.97, '', transform=ax.transAxes, fontsize=9, va='top', animated=True)
+
         # Add legend
-        self.ax.legend(loc='upper right', ncol=2, fontsize=9)
-        
-        plt.tight_layout()
-    
+        if show_legend:
+            ax.legend(loc='upper right', ncol=4, fontsize=8)
+
     def update_data(self):
-        """Read new data from CSV file"""
-        if not os.path.exists(self.csv_filename):
-            return
-        
+        """Read rows appended to the CSV file (or received) since the last frame"""
         try:
-            # Read only new rows
-            df = pd.read_csv(self.csv_filename, skiprows=range(1, self.last_row + 1))
-            
-            if len(df) == 0:
+            # Only the new complete lines are read and parsed, in bulk
+            timestamps_ms, emg = self.reader.read_new()
+
+            if len(timestamps_ms) == 0:
                 return
-            
-            # Update last row counter
-            self.last_row += len(df)
-            
-            # Add new data to buffers
-            for _, row in df.iterrows():
-                # Convert timestamp to milliseconds
-                timestamp_ms = row['timestamp'] * 1000
-                self.timestamps.append(timestamp_ms)
-                
-                # Add data for each channel
-                for channel in range(8):
-                    self.channel_data[channel].append(row[f'emg{channel+1}'])
-                
-                self.sample_count += 1
-        
+
+            # Add new data to the ring buffer
+            self.buffer.extend(np.column_stack([timestamps_ms, emg]))
+            self.sample_count += len(timestamps_ms)
+
         except Exception as e:
-            print(f"Error reading CSV: {e}")
-    
+            print(f"Error reading {self.name}: {e}")
+
+    def draw(self, window_seconds, pixels_per_bin=PIXELS_PER_BIN):
+        """Update the line artists with the visible, decimated window"""
+        rows = self.buffer.view()
+        if len(rows) == 0:
+            return
+
+        # Seconds relative to the latest sample; only the visible span
+        t = (rows[:, 0] - rows[-1, 0]) / 1000.0
+        first = np.searchsorted(t, -window_seconds)
+        n_bins = int(self.ax.bbox.width / pixels_per_bin)  # Bins follow the on-screen width
+        t_plot, y_plot = minmax_decimate(t[first:], rows[first:, 1:], n_bins)
+
+        for channel, line in enumerate(self.lines):
+            line.set_data(t_plot, y_plot[:, channel])
+        self.text.set_text(f'{self.name} (Samples: {self.sample_count})')
+
+    @property
+    def artists(self):
+        return self.lines + [self.text]
+
+
+class EMGVisualizer:
+    def __init__(self, sources, window_seconds=5.0, fps=60, pixels_per_bin=PIXELS_PER_BIN):
+        """sources: CSV filename(s) and/or readers such as StreamSubscriber, one per armband"""
+        if isinstance(sources, str):
+            sources = [sources]
+        self.window_seconds = window_seconds
+        self.fps = fps
+        self.pixels_per_bin = pixels_per_bin
+        capacity = int(window_seconds * SAMPLE_RATE * 1.2) + 1  # Headroom for rate jitter
+
+        # Set up matplotlib figure and one axes per armband
+        n = len(sources)
+        self.fig, axes = plt.subplots(n, 1, figsize=(12, min(8, 3 + 2.5 * n)), sharex=True, squeeze=False)
+        self.armbands = []
+        for i, (source, ax) in enumerate(zip(sources, axes[:, 0])):
+            ax.set_ylabel('EMG Value', fontsize=10)
+            ax.set_ylim(-100, 100)
+            # Static axes: the newest sample is always at 0
+            ax.set_xlim(-window_seconds, 0.05 * window_seconds)
+            ax.grid(True, alpha=0.3)
+            ax.axhline(y=0, color='black', linestyle='-', linewidth=0.5)
+            self.armbands.append(Armband(source, ax, capacity, show_legend=(i == 0)))
+        axes[-1, 0].set_xlabel('Time relative to latest sample (s)', fontsize=10)
+        self.fig.suptitle(f'EMG Data - 8 Channels x {n} armband(s), last {window_seconds:g} s', fontsize=12)
+
+        plt.tight_layout()
+
+    @property
+    def sample_count(self):
+        return sum(band.sample_count for band in self.armbands)
+
     def animate(self, frame):
         """Animation function called by FuncAnimation"""
-        self.update_data()
-        
-        if len(self.timestamps) == 0:
-            return self.lines
-        
-        # Convert timestamps to numpy array
-        time_array = np.array(self.timestamps)
-        
-        # Update each channel line
-        for channel in range(8):
-            if len(self.channel_data[channel]) > 0:
-                channel_values = np.array(self.channel_data[channel])
-                self.lines[channel].set_data(time_array, channel_values)
-        
-        # Scrolling window - show last 5 seconds (5000ms)
-        if len(time_array) > 0:
-            current_time = time_array[-1]
-            window_duration = 5000  # 5 seconds in milliseconds
-            self.ax.set_xlim(max(0, current_time - window_duration), current_time + 200)
-        
-        # Update title with sample count
-        self.ax.set_title(f'EMG Data - 8 Channels (Samples: {self.sample_count})', fontsize=12)
-        
-        return self.lines
-    
+        artists = []
+        for band in self.armbands:
+            band.update_data()
+            band.draw(self.window_seconds, self.pixels_per_bin)
+            artists.extend(band.artists)
+        return artists
+
+    def run(self):
+        """Start the animation"""
+        ani = animation.FuncAnimation(
+            self.fig,
+            self.animate,
+            interval=1000 / self.fps,
+            blit=True,
+            cache_frame_data=False
+        )
+
+        try:
+            plt.show()
+        except KeyboardInterrupt:
+            print("\n\nInterrupted by user. Stopping...")
+        finally:
+            for band in self.armbands:
+                band.reader.close()
+            print(f"\nVisualization stopped. Total samples displayed: {self.sample_count}")
+
+class SpectrogramVisualizer:
+    """
+    What the CNN sees: per channel, the rolling log-STFT magnitude with the
+    model's feature settings and normalization, plus the model's prediction
+    and confidence for the latest window.
+
+    Everything is updated once per STFT column (every nperseg - noverlap
+    samples, 320 ms by default), not per frame: the spectrogram incrementally,
+    the prediction with the receiver's own preprocessing and forward pass on
+    the latest window (a few ms each time, one torch thread).
+    """
+
+    def __init__(self, source, model_path, normalization_path=None, history_seconds=20.0, fps=60):
+        if ML_DIR not in sys.path:
+            sys.path.insert(0, ML_DIR)
+        import inference
+        from streaming_stft import StreamingSpectrogram
+
+        self.inference = inference
+        # Stay off the cores the live receiver's inference uses
+        if inference.torch is not None:
+            inference.torch.set_num_threads(1)
+        model, mean, std, config = inference.load_bundle(model_path, normalization_path)
+        self.model = inference.RegisteredModel(os.path.basename(model_path), model, mean, std, config)
+        self.normalized = mean is not None
+        cfg = self.model.config
+
+        self.name, self.reader = open_source(source)
+        self.fps = fps
+        self.spectrogram = StreamingSpectrogram(cfg['fs'], cfg['nperseg'], cfg['noverlap'],
+                                                history=max(1, int(history_seconds * cfg['fs'] / (cfg['nperseg'] - cfg['noverlap']))))
+        # Raw samples of the latest window, for the prediction
+        self.window_size = cfg['window_size']
+        self.buffer = RingBuffer(self.window_size, 8, dtype=np.float32)
+        self.sample_count = 0
+        self.prediction = None
+
+        # One image per channel: frequency vs. time relative to the latest column
+        history = self.spectrogram.history * self.spectrogram.column_seconds
+        extent = [-history, 0, 0, cfg['fs'] / 2]
+        vmin, vmax = (-3, 3) if self.normalized else (0, 2)
+        self.fig, axes = plt.subplots(4, 2, figsize=(12, 8), sharex=True, sharey=True)
+        self.images = []
+        for channel, ax in enumerate(axes.flat):
+            image = ax.imshow(self._model_input()[channel], origin='lower', aspect='auto', extent=extent,
+                              vmin=vmin, vmax=vmax, cmap='magma', interpolation='nearest', animated=True)
+            # Span of the latest window the model consumes
+            ax.axvspan(-self.window_size / cfg['fs'], 0, color='white', alpha=0.15, linewidth=0)
+            ax.set_title(f'Channel {channel}', fontsize=9, color=channel_colors[channel])
+            self.images.append(image)
+        for ax in axes[:, 0]:
+            ax.set_ylabel('Hz', fontsize=9)
+        for ax in axes[-1, :]:
+            ax.set_xlabel('Time relative to latest column (s)', fontsize=9)
+        self.fig.colorbar(self.images[0], ax=axes, shrink=0.8,
+                          label='normalized log|STFT| (model input)' if self.normalized else 'log|STFT| (model input)')
+        self.text = self.fig.text(0.01, 0.985, '', fontsize=12, va='top', animated=True)
+        self.fig.suptitle(f'{self.name} - model {self.model.name}', fontsize=10, x=0.6)
+
+    def _model_input(self):
+        """The rolling spectrogram scaled as the model's input."""
+        return (self.spectrogram.image() - self.model.mean) / self.model.std
+
+    def _predict(self):
+        window = self.buffer.view()
+        if len(window) < self.window_size:
+            return
+        inference = self.inference
+        features = inference.compute_features(window, [self.model])
+        self.prediction = inference.predict_features(features, [self.model], with_probs=True)[self.model.name]
+
+    def animate(self, frame):
+        """Animation function called by FuncAnimation; redraws only when a new column arrived"""
+        try:
+            _, emg = self.reader.read_new()
+        except Exception as e:
+            print(f"Error reading {self.name}: {e}")
+            return []
+        if len(emg) == 0:
+            return []
+        self.sample_count += len(emg)
+        self.buffer.extend(emg)
+        if len(self.spectrogram.push(emg)) == 0:
+            return []
+
+        self._predict()
+        data = self._model_input()
+        for channel, image in enumerate(self.images):
+            image.set_data(data[channel])
+        if self.prediction is None:
+            self.text.set_text(f'Buffering ({len(self.buffer.view())}/{self.window_size} samples)')
+        else:
+            class_name, probs = self.prediction
+            self.text.set_text(f'Prediction: {class_name} ({100 * probs.max():.0f}%)   '
+                               f'Samples: {self.sample_count}')
+        return self.images + [self.text]
+
     def run(self):
         """Start the animation"""
         ani = animation.FuncAnimation(
-            self.fig, 
-            self.animate, 
-            interval=50,  # Update every 50ms
-            blit=False,
+            self.fig,
+            self.animate,
+            interval=1000 / self.fps,
+            blit=True,
             cache_frame_data=False
         )
-        
+
         try:
             plt.show()
         except KeyboardInterrupt:
             print("\n\nInterrupted by user. Stopping...")
         finally:
+            self.reader.close()
             print(f"\nVisualization stopped. Total samples displayed: {self.sample_count}")
 
+
 if __name__ == "__main__":
     import sys
     import glob
-    
-    if len(sys.argv) > 1:
-        csv_file = sys.argv[1]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Real-time EMG data visualizer")
+    parser.add_argument('csv_files', nargs='*', help="CSV file(s), one per armband (default: most recent emg_data_*.csv)")
+    parser.add_argument('--subscribe', action='append', nargs='?', const='127.0.0.1:9003', default=[],
+                        metavar='HOST:PORT',
+                        help="Plot the live stream from ML/stream_broker.py (default 127.0.0.1:9003); repeatable")
+    parser.add_argument('--seconds', type=float, default=None,
+                        help="History shown (seconds; default 5, or 20 with --spectrogram)")
+    parser.add_argument('--fps', type=float, default=60, help="Target frame rate")
+    parser.add_argument('--pixels-per-bin', type=float, default=PIXELS_PER_BIN,
+                        help="Horizontal pixels per min/max bin (1 = full resolution)")
+    parser.add_argument('--spectrogram', action='store_true',
+                        help="Show the model input (rolling log-STFT per channel) and its prediction instead")
+    parser.add_argument('--model', default=os.path.join(ML_DIR, 'train_single_subject_myo_model.pth'),
+                        help="Model for --spectrogram")
+    parser.add_argument('--normalization', default=os.path.join(ML_DIR, 'normalization_params.npz'),
+                        help="Normalization statistics for --spectrogram with a weights-only model")
+    args = parser.parse_args()
+
+    subscribers = []
+    for address in args.subscribe:
+        host, _, port = address.rpartition(':')
+        subscribers.append(StreamSubscriber(host or '127.0.0.1', int(port)))
+
+    if args.csv_files or subscribers:
+        csv_files = args.csv_files
     else:
         # Find the most recent EMG CSV file
-        csv_files = glob.glob("emg_data_*.csv")
-        if csv_files:
-            csv_file = max(csv_files, key=os.path.getctime)
-            print(f"Using most recent file: {csv_file}")
+        found = glob.glob("emg_data_*.csv")
+        if found:
+            csv_files = [max(found, key=os.path.getctime)]
+            print(f"Using most recent file: {csv_files[0]}")
         else:
             print("No CSV file specified and no emg_data_*.csv files found.")
-            print("Usage: python emg_visualizer.py <csv_filename>")
+            print("Usage: python emg_visualizer.py <csv_filename> [<csv_filename> ...]")
             sys.exit(1)
-    
-    print(f"CSV file: {csv_file}")
+
+    if csv_files:
+        print(f"CSV file(s): {', '.join(csv_files)}")
+    for subscriber in subscribers:
+        print(f"Subscribing to: {subscriber.name}")
     print("Close the plot window or press Ctrl+C to stop visualization...")
     print("=" * 60)
-    
-    visualizer = EMGVisualizer(csv_file)
-    visualizer.run()
\ No newline at end of file
+
+    sources = csv_files + subscribers
+    if args.spectrogram:
+        if len(sources) > 1:
+            print("--spectrogram shows one source; using the first")
+        visualizer = SpectrogramVisualizer(sources[0], args.model, args.normalization,
+                                           args.seconds or 20.0, args.fps)
+    else:
+        visualizer = EMGVisualizer(sources, args.seconds or 5.0, args.fps, args.pixels_per_bin)
+    visualizer.run()
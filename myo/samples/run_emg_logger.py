@@ -2,86 +2,123 @@
 """
 Python script to run emg-data-sample.exe, read its terminal output,
 parse the EMG data, save to CSV, and display live visualization.
+
+The output is read from the pipe in large chunks and every chunk's complete
+records are parsed at once (emg_console.py).
+
+Recording does not wait on the terminal: rows go through a large write buffer
+that is flushed (and fsync'ed) every FLUSH_INTERVAL seconds, and the bar
+display runs on its own thread at DISPLAY_HZ from the latest values.
 """
 
 import subprocess
+import threading
 import sys
 import os
-import re
 import csv
 import time
+import numpy as np
 from datetime import datetime
 
-def parse_emg_line(line):
-    """
-    Parse EMG data from a line like: [  12][  -5][   3][  -8][  15][  -2][   7][  -1]
-    Returns list of 8 integers or None if parsing fails.
-    """
-    # Match pattern: [value] repeated 8 times
-    pattern = r'\[([^\]]+)\]'
-    matches = re.findall(pattern, line)
-    
-    if len(matches) == 8:
-        try:
-            values = [int(match.strip()) for match in matches]
-            return values
-        except ValueError:
-            return None
-    return None
+from emg_console import ConsoleParser
 
-def display_emg_data(values, sample_count):
+WRITE_BUFFER_SIZE = 1 << 20  # Bytes buffered before the CSV is written out
+FLUSH_INTERVAL = 1.0         # Seconds between durable flushes (flush + fsync); tail readers lag by up to this
+DISPLAY_HZ = 10              # Bar display refresh rate cap
+READ_SIZE = 64 * 1024        # Max bytes taken from the pipe per read
+
+def format_emg_display(values, sample_count):
     """
-    Display EMG data with bar visualization from -100 to +100.
+    Render the bar visualization (-100 to +100) of one sample as a single string.
     """
     # Clear screen (ANSI escape codes)
-    print("\033[2J\033[H", end='')
+    out = ["\033[2J\033[H"]
     
-    # Print header
-    print("=== EMG Data Live Display (Range: -100 to +100) ===")
-    print(f"Samples recorded: {sample_count}")
-    print("=" * 70)
-    print()
+    # Header
+    out.append("=== EMG Data Live Display (Range: -100 to +100) ===\n")
+    out.append(f"Samples recorded: {sample_count}\n")
+    out.append("=" * 70 + "\n\n")
     
-    # Display each channel with bar visualization
+    # Each channel with bar visualization
     for channel in range(8):
         value = values[channel]
         
         # Clamp value to -100 to +100 range for display
         display_value = max(-100, min(100, value))
         
-        # Print channel number and value
-        print(f"Ch{channel}: {value:4d}  ", end='')
-        
-        # Create bar visualization (201 characters wide: -100 to +100)
+        # Bar visualization (201 characters wide: -100 to +100, center marker at 0)
         # Scale: -100 to +100 maps to 0 to 200
-        bar_position = display_value + 100  # Shift from -100..100 to 0..200
-        center = 100  # Center position (value 0)
-        
-        print("|", end='')
-        for i in range(201):
-            if i == center:
-                print("|", end='')  # Center marker at 0
-            elif value < 0 and i >= bar_position and i < center:
-                print("=", end='')  # Negative value bar
-            elif value > 0 and i > center and i <= bar_position:
-                print("=", end='')  # Positive value bar
-            elif value == 0 and i == center:
-                print("|", end='')  # Zero at center
-            else:
-                print(" ", end='')
-        print("|")
-    
-    print()
-    print("        -100        0        +100")
+        if display_value < 0:
+            bar = " " * (100 + display_value) + "=" * -display_value + "|" + " " * 100
+        else:
+            bar = " " * 100 + "|" + "=" * display_value + " " * (100 - display_value)
+        out.append(f"Ch{channel}: {value:4d}  |{bar}|\n")
+    
+    out.append("\n        -100        0        +100\n")
+    return "".join(out)
+
+def display_emg_data(values, sample_count):
+    """
+    Display EMG data with bar visualization from -100 to +100.
+    """
+    # One write per frame instead of one per character
+    sys.stdout.write(format_emg_display(values, sample_count))
     sys.stdout.flush()
 
-def run_emg_logger(executable_path=None, csv_filename=None):
+class BarDisplay(threading.Thread):
+    """
+    Redraws the bar display from the latest values at most `hz` times per second,
+    so a slow terminal never holds up the reader.
+    """
+
+    def __init__(self, hz=DISPLAY_HZ):
+        super().__init__(name="display", daemon=True)
+        self.interval = 1.0 / hz
+        self.values = None
+        self.sample_count = 0
+        self.frames = 0
+        self._stop_event = threading.Event()
+
+    def update(self, values, sample_count):
+        # Plain attribute assignment: the display thread only ever reads the latest pair
+        self.values, self.sample_count = values, sample_count
+
+    def run(self):
+        shown = None
+        while not self._stop_event.wait(self.interval):
+            values, sample_count = self.values, self.sample_count
+            if values is None or sample_count == shown:
+                continue
+            display_emg_data(values, sample_count)
+            shown = sample_count
+            self.frames += 1
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+CSV_ROW = ','.join(['%d'] * 9) + '\n'
+
+def format_rows(rows):
+    """(n, 9) integer array -> CSV text, formatted in one operation."""
+    return (CSV_ROW * len(rows)) % tuple(rows.ravel().tolist())
+
+def durable_flush(f):
+    """Write out Python's buffer and make the OS commit the data to disk."""
+    f.flush()
+    os.fsync(f.fileno())
+
+def run_emg_logger(executable_path=None, csv_filename=None, flush_interval=FLUSH_INTERVAL,
+                   display_hz=DISPLAY_HZ):
     """
     Run the EMG data sample executable, parse output, save to CSV, and display.
     
     Args:
         executable_path: Path to the compiled C++ executable (default: bin/emg-data-sample.exe)
         csv_filename: CSV output filename (default: auto-generated with timestamp)
+        flush_interval: Seconds between durable flushes of the CSV file
+        display_hz: Bar display refresh rate cap (0 disables the display)
     """
     # Default executable path
     if executable_path is None:
@@ -100,14 +137,14 @@ def run_emg_logger(executable_path=None, csv_filename=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         csv_filename = f"emg_data_{timestamp}.csv"
     
-    # Open CSV file for writing
-    csv_file = open(csv_filename, 'w', newline='')
+    # Open CSV file for writing, with a large buffer (flushed every flush_interval)
+    csv_file = open(csv_filename, 'w', newline='', buffering=WRITE_BUFFER_SIZE)
     csv_writer = csv.writer(csv_file)
     
     # Write CSV header
     csv_writer.writerow(['Timestamp_ms', 'Channel_0', 'Channel_1', 'Channel_2', 
                          'Channel_3', 'Channel_4', 'Channel_5', 'Channel_6', 'Channel_7'])
-    csv_file.flush()
+    durable_flush(csv_file)
     
     print(f"Running: {executable_path}")
     print(f"CSV file: {csv_filename}")
@@ -118,41 +155,48 @@ def run_emg_logger(executable_path=None, csv_filename=None):
     start_time = time.time()
     sample_count = 0
     last_values = [0] * 8
+    next_flush = time.monotonic() + flush_interval
+    display = BarDisplay(display_hz) if display_hz > 0 else None
     
     try:
-        # Run the executable and capture output in real-time
+        if display is not None:
+            display.start()
+        
+        # Run the executable and capture its raw output
         process = subprocess.Popen(
             executable_path,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1  # Line buffered
+            bufsize=0  # Unbuffered: each read returns whatever the pipe holds
         )
+        parser = ConsoleParser()
+        pipe = process.stdout.fileno()
         
         # Read and process output
         try:
             while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
+                chunk = os.read(pipe, READ_SIZE)
+                if not chunk:
+                    break  # Program exited
+                
+                # Parse all complete records of the chunk; timestamps in milliseconds
+                elapsed_ms = (time.time() - start_time) * 1000
+                timestamps, values = parser.parse(chunk, elapsed_ms)
                 
-                if output:
-                    # Parse EMG data from the line
-                    values = parse_emg_line(output)
+                if len(values):
+                    # Save to CSV (buffered), one block at a time
+                    rows = np.column_stack([np.round(timestamps).astype(np.int64), values])
+                    csv_file.write(format_rows(rows))
                     
-                    if values:
-                        # Calculate timestamp in milliseconds
-                        elapsed_ms = int((time.time() - start_time) * 1000)
-                        
-                        # Save to CSV
-                        row = [elapsed_ms] + values
-                        csv_writer.writerow(row)
-                        csv_file.flush()
-                        
-                        # Update display
-                        last_values = values
-                        sample_count += 1
-                        display_emg_data(values, sample_count)
+                    # Hand the latest values to the display thread
+                    last_values = values[-1].tolist()
+                    sample_count += len(values)
+                    if display is not None:
+                        display.update(last_values, sample_count)
+                
+                if time.monotonic() >= next_flush:
+                    durable_flush(csv_file)
+                    next_flush = time.monotonic() + flush_interval
                         
         except KeyboardInterrupt:
             print("\n\nInterrupted by user. Stopping...")
@@ -169,15 +213,18 @@ def run_emg_logger(executable_path=None, csv_filename=None):
         
     except FileNotFoundError:
         print(f"Error: Could not find executable at {executable_path}")
-        csv_file.close()
         return 1
     except Exception as e:
         print(f"Error running executable: {e}")
-        csv_file.close()
         return 1
     finally:
+        if display is not None:
+            display.stop()
+        durable_flush(csv_file)
         csv_file.close()
-        print(f"\nRecording stopped. Total samples: {sample_count}")
+        elapsed = time.time() - start_time
+        print(f"\nRecording stopped. Total samples: {sample_count} "
+              f"({sample_count / max(elapsed, 1e-9):.1f} samples/s)")
         print(f"Data saved to: {csv_filename}")
     
     return 0
@@ -198,12 +245,26 @@ if __name__ == "__main__":
         help="CSV output filename (default: auto-generated with timestamp)",
         default=None
     )
+    parser.add_argument(
+        "--flush-interval",
+        help=f"Seconds between durable flushes of the CSV file (default: {FLUSH_INTERVAL})",
+        type=float,
+        default=FLUSH_INTERVAL
+    )
+    parser.add_argument(
+        "--display-hz",
+        help=f"Bar display refresh rate cap, 0 to disable (default: {DISPLAY_HZ})",
+        type=float,
+        default=DISPLAY_HZ
+    )
     
     args = parser.parse_args()
     
     exit_code = run_emg_logger(
         executable_path=args.executable,
-        csv_filename=args.output
+        csv_filename=args.output,
+        flush_interval=args.flush_interval,
+        display_hz=args.display_hz
     )
     
     sys.exit(exit_code)
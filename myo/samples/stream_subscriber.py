@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Subscriber for the live EMG stream republished by ML/stream_broker.py.
+
+Same interface as CSVTailReader: read_new() returns the samples received since
+the last call as NumPy arrays, without blocking, so a viewer can poll it once
+per frame. No file is written or read.
+
+Wire format (one sample per line):
+    {"timestamp":12.345000,"sample":2469,"emg":[1,-2,3,0,5,-1,2,0]}
+
+If the broker is not running yet, or goes away, read_new() keeps returning
+empty arrays and reconnects at most once per RECONNECT_INTERVAL.
+"""
+
+import json
+import time
+import socket
+import numpy as np
+
+BROKER_HOST = '127.0.0.1'
+BROKER_PORT = 9003
+RECONNECT_INTERVAL = 1.0  # Seconds between connection attempts
+RECV_SIZE = 64 * 1024
+
+
+class StreamSubscriber:
+    def __init__(self, host=BROKER_HOST, port=BROKER_PORT, channels=8):
+        self.host = host
+        self.port = port
+        self.channels = channels
+        self.name = f'tcp://{host}:{port}'
+        self._sock = None
+        self._partial = b''
+        self._next_attempt = 0.0
+        self.rows_read = 0
+        self.bad_lines = 0
+        self.connects = 0
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self._partial = b''
+
+    def _empty(self):
+        return np.zeros(0, dtype=np.float64), np.zeros((0, self.channels), dtype=np.float32)
+
+    def _connect(self):
+        now = time.monotonic()
+        if now < self._next_attempt:
+            return False
+        self._next_attempt = now + RECONNECT_INTERVAL
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=RECONNECT_INTERVAL)
+        except OSError:
+            return False
+        sock.setblocking(False)
+        self._sock = sock
+        self.connects += 1
+        print(f"Subscribed to {self.name}")
+        return True
+
+    def _receive(self):
+        """Everything the socket has buffered right now (b'' if nothing)."""
+        parts = []
+        while True:
+            try:
+                data = self._sock.recv(RECV_SIZE)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                data = b''
+            if not data:
+                print(f"Broker {self.name} closed the connection")
+                self.close()
+                break
+            parts.append(data)
+        return b''.join(parts)
+
+    def _parse_lines(self, data):
+        """Complete JSON lines -> (timestamps in s, emg); malformed lines are skipped."""
+        lines = [line for line in data.split(b'\n') if line.strip()]
+        try:
+            # Fast path: all lines decoded with one json.loads call; a newline inside a
+            # record rejoins its halves, so it only counts with one object per line
+            records = json.loads(b'[' + b','.join(lines) + b']')
+            if len(records) != len(lines) or not all(isinstance(r, dict) for r in records):
+                raise ValueError("records do not match lines")
+        except ValueError:
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    self.bad_lines += 1
+
+        timestamps, emg = [], []
+        for record in records:
+            try:
+                values = record['emg']
+                if len(values) != self.channels:
+                    raise ValueError(values)
+                timestamps.append(float(record['timestamp']))
+                emg.append(values)
+            except (KeyError, TypeError, ValueError):
+                self.bad_lines += 1
+        return (np.array(timestamps, dtype=np.float64),
+                np.array(emg, dtype=np.float32).reshape(-1, self.channels))
+
+    def read_new(self):
+        """
+        Returns the samples received since the last call, without blocking.
+
+        Returns:
+            (timestamps in ms, float64 (n,)), (EMG values, float32 (n, channels))
+        """
+        if self._sock is None and not self._connect():
+            return self._empty()
+
+        data = self._partial + self._receive()
+        end = data.rfind(b'\n') + 1
+        self._partial = data[end:]
+        if not end:
+            return self._empty()
+
+        timestamps, emg = self._parse_lines(data[:end])
+        self.rows_read += len(timestamps)
+        return timestamps * 1000.0, emg